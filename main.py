@@ -1,14 +1,50 @@
 import sys
+import logging
+import argparse
 
-from PyQt5.QtWidgets import QApplication
-from open223Builder.app.window import DiagramApplication
+from open223Builder.app.instrumentation import (
+    Instrumentation, Profile, ImportTimer, STARTUP_KINDS, log, log_summary, print_profile
+)
 
 
-if __name__ == "__main__":
+def print_startup(profile: Profile):
+    """The startup breakdown, and later the first construction of each property panel."""
+
+    if profile.kind in STARTUP_KINDS:
+        print_profile(profile)
+
+
+def main(argv=None) -> int:
+    argv = sys.argv if argv is None else argv
+
+    parser = argparse.ArgumentParser(description="open223Builder")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="print how long imports, window setup and the first paint took")
+    args, qt_args = parser.parse_known_args(argv[1:])
+
+    # Per-entity load/save messages are DEBUG, pass summaries INFO; show the summaries but not the messages
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s: %(message)s")
+    log.setLevel(logging.INFO)
+    Instrumentation.add_sink(log_summary)
 
-    app = QApplication(sys.argv)
-    diagram_app = DiagramApplication()
+    startup = Profile('startup', 'application')
+    if args.profile_startup:
+        Instrumentation.add_sink(print_startup)
+
+    # Imported here so the import times of the application modules can be measured
+    with ImportTimer("open223Builder").timing() as imports:
+        from PyQt5.QtWidgets import QApplication
+        from open223Builder.app.window import DiagramApplication
+    imports.record(startup)
+
+    with startup.measure('create QApplication'):
+        app = QApplication(argv[:1] + qt_args)
+
+    diagram_app = DiagramApplication(startup)
     diagram_app.show()
 
-    sys.exit(app.exec_())
+    return app.exec_()
 
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,16 @@
-import open223Builder.app as app
-import open223Builder.ontology as ont
-import open223Builder.enumerations
-import open223Builder.library
+import importlib
+
+# Submodules are imported on first access, so importing a single module (e.g. the CLI or
+# the instrumentation before the timed startup imports) does not pull in Qt and rdflib.
+_submodules = {
+    'app': 'open223Builder.app',
+    'ont': 'open223Builder.ontology',
+    'enumerations': 'open223Builder.enumerations',
+    'library': 'open223Builder.library',
+}
+
+
+def __getattr__(name):
+    if name in _submodules:
+        return importlib.import_module(_submodules[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
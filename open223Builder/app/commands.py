@@ -1,12 +1,61 @@
+import json
+import time
+import statistics
+import contextlib
+
 from typing import Union
+from collections import deque, namedtuple
 
 from open223Builder.ontology.namespaces import S223
+from open223Builder.app.instrumentation import log
 
 from PyQt5.QtCore import (
     Qt, QPointF, QByteArray, QMimeData, QPoint, QTimer, QRectF, QRect
 )
 
 
+class DeferredUpdates:
+    """Context in which item refreshes (pen, path, appearance) are queued instead of run.
+
+    Items ask `DeferredUpdates.defer(self, 'method_name')` at the top of a refresh method; while
+    a context is open that queues the call and returns True. Leaving the outermost context runs
+    each queued refresh once, however often it was requested.
+    """
+
+    depth = 0
+    pending: dict = {}
+
+    @classmethod
+    def defer(cls, item, method_name: str) -> bool:
+        if not cls.depth:
+            return False
+        cls.pending[(item, method_name)] = None
+        return True
+
+    def __enter__(self):
+        DeferredUpdates.depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        DeferredUpdates.depth -= 1
+        if DeferredUpdates.depth == 0:
+            pending, DeferredUpdates.pending = DeferredUpdates.pending, {}
+            for item, method_name in pending:
+                getattr(item, method_name)()
+        return False
+
+
+def _runs(items, values):
+    """Compress parallel item/value lists into [(value, [items...]), ...] runs of equal values."""
+    runs = []
+    for item, value in zip(items, values):
+        if runs and runs[-1][0] == value:
+            runs[-1][1].append(item)
+        else:
+            runs.append((value, [item]))
+    return runs
+
+
 class Command:
     def execute(self):
         try:
@@ -28,6 +77,10 @@ class Command:
     def redo(self):
         return self.execute()
 
+    def item_count(self) -> int:
+        """How many items the command acts on; reported by CommandProfiler."""
+        return len(getattr(self, 'items', None) or ()) or 1
+
     def _execute(self):
         pass
 
@@ -61,12 +114,14 @@ class RotateCommand(Command):
         self.new_rotations = new_rotations
 
     def _execute(self):
-        for i, item in enumerate(self.items):
-            item.setRotation(self.new_rotations[i])
+        with DeferredUpdates():
+            for i, item in enumerate(self.items):
+                item.setRotation(self.new_rotations[i])
 
     def _undo(self):
-        for i, item in enumerate(self.items):
-            item.setRotation(self.old_rotations[i])
+        with DeferredUpdates():
+            for i, item in enumerate(self.items):
+                item.setRotation(self.old_rotations[i])
 
 
 class ResizeCommand(Command):
@@ -215,126 +270,156 @@ class RemoveContainedItemCommand(Command):
 
 
 class RemoveItemCommand(Command):
+    """Deletes a selection together with everything that cannot exist without it.
+
+    The closure (connection points, properties, connections, system memberships) is worked out
+    once from the item links and the scene index. Executing cuts those links and takes the
+    topmost deleted items out of the scene in one pass; undo puts both back.
+    """
+
+    child_lists = ('contained_items', 'connection_points', 'properties')
 
     def __init__(
             self,
             scene,
             selection,
     ):
+        from open223Builder.app.items import scene_index  # items imports this module
 
         self.scene = scene
 
         self.directly_selected = set(selection)
 
-        self.connectables_selected = set(selection.getConnectable)
-        self.cps_selected = set(selection.getConnectionPoint)
-        self.props_selected = set(selection.getProperty)
-        self.conns_selected = set(selection.getConnection)
-        self.systems_selected = set(selection.getSystem)
-        self.phys_spaces_selected = set(selection.getPhysicalSpace)
+        self.all_connectables = set(selection.getConnectable) | set(selection.getPhysicalSpace)
+        self.all_cps = set(selection.getConnectionPoint)
+        self.all_props = set(selection.getProperty)
+        self.all_conns = set(selection.getConnection)
+        self.all_systems = set(selection.getSystem)
 
-        self.cps_implicit = set()
-        self.props_implicit_from_connectable = set()
-        for conn in self.connectables_selected:
-            self.cps_implicit.update(conn.connection_points)
-            self.props_implicit_from_connectable.update(conn.properties)
+        for item in self.all_connectables:
+            self.all_cps.update(getattr(item, 'connection_points', ()))
+            self.all_props.update(getattr(item, 'properties', ()))
 
-        self.props_implicit_from_cp = set()
-        for cp in self.cps_selected | self.cps_implicit:
+        for cp in self.all_cps:
+            self.all_props.update(cp.properties)
+            if cp.connected_to:
+                self.all_conns.add(cp.connected_to)
 
-            if hasattr(cp, 'properties'):
-                self.props_implicit_from_cp.update(cp.properties)
+        deleted = self.all_connectables | self.all_cps | self.all_props
 
-        self.conns_implicit = set()
-        for cp in self.cps_selected | self.cps_implicit:
-            if cp.connected_to:
-                self.conns_implicit.add(cp.connected_to)
+        # Topmost deleted items -> (surviving parent, name of the parent's list that holds them)
+        self.roots = {}
+        for item in deleted:
+            parent = item.parentItem()
+            if parent in deleted:
+                continue
+            self.roots[item] = (parent, self._child_list(parent, item) if parent else None)
 
-        self.all_connectables = self.connectables_selected | self.phys_spaces_selected
-        self.all_cps = self.cps_selected | self.cps_implicit
-        self.all_props = self.props_selected | self.props_implicit_from_connectable | self.props_implicit_from_cp
-        self.all_conns = self.conns_selected | self.conns_implicit
-        self.all_systems = self.systems_selected
+        # Contained items that outlive their container are released onto the canvas
+        self.released = [(container, child) for container in self.all_connectables
+                         for child in container.contained_items if child not in deleted]
 
-        self.connection_details = {conn: {'source': conn.source, 'target': conn.target}
-                                   for conn in self.all_conns}
-        self.property_details = {prop: {'parent': prop.parent_item}
-                                 for prop in self.all_props}
-        self.cp_details = {cp: {'parent': cp.connectable}
-                           for cp in self.all_cps}
-        self.system_members = {sys: list(sys.members) for sys in self.all_systems}
+        self.memberships = [(system, member) for system in scene_index(scene).of('system')
+                            for member in system.members if member in self.all_connectables]
 
-        self.parent_details = {item: item.parentItem() for item in
-                               self.all_connectables | self.all_cps | self.all_props}
+    @classmethod
+    def _child_list(cls, parent, item):
+        for name in cls.child_lists:
+            if item in getattr(parent, name, ()):
+                return name
+        return None
+
+    def item_count(self) -> int:
+        return (len(self.all_connectables) + len(self.all_cps) + len(self.all_props) +
+                len(self.all_conns) + len(self.all_systems))
 
     def _execute(self):
 
-        for item in self.all_systems:
-            if item.scene(): self.scene.removeItem(item)
-        for item in self.all_conns:
-            if item.scene(): item.remove(self.scene)
-        for item in self.all_props:
-            if item.scene(): item.remove(self.scene)
-        for item in self.all_cps:
-            if item.scene(): item.remove(self.scene)
-        for item in self.all_connectables:
-            if item.scene(): item.remove(self.scene)
+        for conn in self.all_conns:
+            conn.source.connected_to = None
+            conn.target.connected_to = None
+
+        for container, child in self.released:
+            container.contained_items.discard(child)
+            child.setParentItem(None)
+
+        for item, (parent, child_list) in self.roots.items():
+            if parent is None:
+                continue
+            if child_list:
+                getattr(parent, child_list).remove(item)
+            item.setParentItem(None)
+
+        for system, member in self.memberships:
+            system.members.discard(member)
+
+        remove_items_from_scene(self.scene, [*self.all_conns, *self.all_systems, *self.roots])
+
+        for system in {system for system, _ in self.memberships}:
+            system.update_bounding_rect()
 
     def _undo(self):
 
-        restored_parents = set()
-        for item in self.all_connectables:
+        add_items_to_scene(self.scene, [item for item, (parent, _) in self.roots.items() if parent is None])
+
+        for item, (parent, child_list) in self.roots.items():
+            if parent is None:
+                continue
+            item.setParentItem(parent)
+            if child_list == 'contained_items':
+                parent.contained_items.add(item)
+            elif child_list:
+                getattr(parent, child_list).append(item)
+
+        for container, child in self.released:
+            container.contained_items.add(child)
+            child.setParentItem(container)
+
+        for conn in self.all_conns:
+            conn.source.connected_to = conn
+            conn.target.connected_to = conn
+        add_items_to_scene(self.scene, self.all_conns)
+        for conn in self.all_conns:
+            conn.update_path()
+
+        for system, member in self.memberships:
+            system.members.add(member)
+
+        add_items_to_scene(self.scene, self.all_systems)
+        for system in self.all_systems | {system for system, _ in self.memberships}:
+            system.update_bounding_rect()
+
+
+def add_items_to_scene(scene, items):
+    """Add top-level items in a single pass; child items (CPs, properties, contained items) come along."""
+    for item in items:
+        if item.scene() is None:
+            scene.addItem(item)
+
+
+def remove_items_from_scene(scene, items):
+    for item in items:
+        if item.scene() is scene:
+            scene.removeItem(item)
+
+
+class AddItemsCommand(Command):
+    """Adds a self-contained block of items that was built off-scene, e.g. by pasting.
+
+    Only the top-level items and the connections between them are recorded; everything
+    else is a child item and enters and leaves the scene together with its parent.
+    """
 
-            original_parent = self.parent_details.get(item)
-            if item.scene() is None:
-                self.scene.addItem(item)
-
-                if original_parent and original_parent.scene():
-                    item.setParentItem(original_parent)
-                    if hasattr(original_parent, 'add_item'):
-                        original_parent.add_item(item)
-            restored_parents.add(item)
-
-        for item in self.all_cps:
-            parent_connectable = self.cp_details.get(item, {}).get('parent')
-            if item.scene() is None and parent_connectable and parent_connectable.scene():
-                item.setParentItem(parent_connectable)
-                parent_connectable.add_connection_point(item)
-                self.scene.addItem(item)
-            restored_parents.add(item)
-
-        for item in self.all_props:
-            parent_item = self.property_details.get(item, {}).get('parent')
-            if item.scene() is None and parent_item and parent_item.scene():
-                item.setParentItem(parent_item)
-                parent_item.add_property(item)
-                self.scene.addItem(item)
-
-        for item, details in self.connection_details.items():
-            source = details['source']
-            target = details['target']
-
-            if item.scene() is None and source and source.scene() and target and target.scene():
-
-                if source.connected_to is None and target.connected_to is None:
-                    item.source = source
-                    item.target = target
-                    source.connected_to = item
-                    target.connected_to = item
-                    self.scene.addItem(item)
-                    item.update_path()
-                else:
-                    print(f"Undo Warning: Cannot restore connection {item.inst_uri}, points already connected.")
-
-        for item in self.all_systems:
-            if item.scene() is None:
-                self.scene.addItem(item)
-            item.members.clear()
-            original_members = self.system_members.get(item, [])
-            for member_item in original_members:
-                if member_item.scene():
-                    item.add_member(member_item)
-            item.update_bounding_rect()
+    def __init__(self, scene, items, name="Add Items"):
+        self.scene = scene
+        self.items = list(items)
+        self.name = name
+
+    def _execute(self):
+        add_items_to_scene(self.scene, self.items)
+
+    def _undo(self):
+        remove_items_from_scene(self.scene, self.items)
 
 
 class AddPropertyCommand(Command):
@@ -422,60 +507,64 @@ class AddConnectionPointCommand(Command):
 
 
 class ChangeAttributeCommand(Command):
+    """Sets one attribute to one value on any number of items as a single undo step.
+
+    Refreshes the setters trigger are deferred and run once per item at the end, and the
+    old values are kept as runs of equal values rather than one entry per item.
+    """
+
     def __init__(self, items, attribute_name, new_value, update_func=None):
-        self.items = items
+        self.items = list(items)
         self.attribute_name = attribute_name
         self.new_value = new_value
-        self.old_values = [getattr(item, attribute_name) for item in items]
+        self.old_values = _runs(self.items, (getattr(item, attribute_name) for item in self.items))
         self.update_func = update_func
 
+    def _apply(self, runs):
+        with DeferredUpdates():
+            for value, items in runs:
+                for item in items:
+                    setattr(item, self.attribute_name, value)
+                    if self.update_func:
+                        self.update_func(item)
+
     def _execute(self):
-        for i, item in enumerate(self.items):
-            setattr(item, self.attribute_name, self.new_value)
-            if self.update_func:
-                self.update_func(item)
+        self._apply([(self.new_value, self.items)])
 
     def _undo(self):
-        for i, item in enumerate(self.items):
-            setattr(item, self.attribute_name, self.old_values[i])
-            if self.update_func:
-                self.update_func(item)
+        self._apply(self.old_values)
 
 
-class ChangeConnectionTypeCommand(Command):
+class ChangeConnectionTypeCommand(ChangeAttributeCommand):
     def __init__(self, connections, new_type_uri):
-        self.connections = connections
-        self.new_type_uri = new_type_uri
-        self.old_type_uris = [conn.type_uri for conn in connections]
-
-    def _execute(self):
-        for conn in self.connections:
-            conn.type_uri = self.new_type_uri
-            conn.update_path()
-
-    def _undo(self):
-        for i, conn in enumerate(self.connections):
-            conn.type_uri = self.old_type_uris[i]
-            conn.update_path()
+        super().__init__(connections, 'type_uri', new_type_uri, update_func=lambda conn: conn.update_pen())
 
 
 class ChangeConnectionMediumCommand(Command):
+    """Sets the medium at both ends of many connections as a single undo step."""
+
     def __init__(self, connections, new_medium):
-        self.connections = connections
+        self.connections = list(connections)
         self.new_medium = new_medium
-        self.old_media = [(conn.source.medium, conn.target.medium) for conn in connections]
+
+        points = [point for conn in self.connections for point in (conn.source, conn.target)]
+        self.old_media = _runs(points, (point.medium for point in points))
+
+    def item_count(self) -> int:
+        return len(self.connections)
 
     def _execute(self):
-        for conn in self.connections:
-            conn.source.medium = self.new_medium
-            conn.target.medium = self.new_medium
-            conn.update_path()
+        with DeferredUpdates():
+            for conn in self.connections:
+                conn.medium = self.new_medium
 
     def _undo(self):
-        for i, conn in enumerate(self.connections):
-            conn.source.medium = self.old_media[i][0]
-            conn.target.medium = self.old_media[i][1]
-            conn.update_path()
+        with DeferredUpdates():
+            for medium, points in self.old_media:
+                for point in points:
+                    point.medium = medium
+            for conn in self.connections:
+                conn.update_pen()
 
 
 class AddContainedSpaceCommand(Command):
@@ -578,6 +667,9 @@ class CompoundCommand(Command):
     def add_command(self, command):
         self.commands.append(command)
 
+    def item_count(self) -> int:
+        return sum(command.item_count() for command in self.commands)
+
     def _execute(self):
         for command in self.commands:
             command.execute()
@@ -587,14 +679,113 @@ class CompoundCommand(Command):
             command.undo()
 
 
+CommandSample = namedtuple('CommandSample', 'seconds items scene_size scene_delta')
+
+
+class CommandProfiler:
+    """Rolling timings of the commands run through a CommandHistory, per command class and action.
+
+    Each push/undo/redo adds a CommandSample (wall time, item count, scene size before and its
+    change) to a window of the last `window` samples of that class and action. `budgets` maps
+    command class names to seconds; slower runs are reported and counted.
+    """
+
+    # Upper bounds (seconds) of the histogram buckets; the last bucket is open-ended
+    bucket_bounds = (0.0001, 0.0003, 0.001, 0.003, 0.01, 0.03, 0.1, 0.3, 1.0, 3.0)
+
+    def __init__(self, window: int = 500, scene_size=None, budgets: dict = None):
+        self.window = window
+        self.scene_size = scene_size or (lambda: 0)
+        self.budgets = dict(budgets or {})
+        self.samples = {}  # (command class name, action) -> deque of CommandSample
+        self.over_budget = {}  # (command class name, action) -> count
+
+    @contextlib.contextmanager
+    def record(self, command, action: str):
+        size = self.scene_size()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            name = type(command).__name__
+            key = (name, action)
+
+            sample = CommandSample(elapsed, command.item_count(), size, self.scene_size() - size)
+            self.samples.setdefault(key, deque(maxlen=self.window)).append(sample)
+
+            budget = self.budgets.get(name)
+            if budget is not None and elapsed > budget:
+                self.over_budget[key] = self.over_budget.get(key, 0) + 1
+                log.warning("%s %s took %.1f ms (budget %.1f ms, %d items, scene size %d)",
+                            name, action, elapsed * 1000, budget * 1000, sample.items, size)
+
+    def histogram(self, samples) -> list:
+        counts = [0] * (len(self.bucket_bounds) + 1)
+        for sample in samples:
+            bucket = 0
+            while bucket < len(self.bucket_bounds) and sample.seconds > self.bucket_bounds[bucket]:
+                bucket += 1
+            counts[bucket] += 1
+        return counts
+
+    def summary(self) -> dict:
+        """{'ClassName action': stats} over the current window."""
+
+        result = {}
+        for (name, action), samples in sorted(self.samples.items()):
+            seconds = sorted(sample.seconds for sample in samples)
+            result[f"{name} {action}"] = {
+                'count': len(seconds),
+                'mean': statistics.fmean(seconds),
+                'median': statistics.median(seconds),
+                'p95': seconds[min(len(seconds) - 1, int(len(seconds) * 0.95))],
+                'max': seconds[-1],
+                'mean_items': statistics.fmean(sample.items for sample in samples),
+                'max_scene_size': max(sample.scene_size for sample in samples),
+                'over_budget': self.over_budget.get((name, action), 0),
+                'histogram': self.histogram(samples),
+            }
+        return result
+
+    def export(self, filepath: str):
+        """Write the summary and the raw samples as JSON."""
+
+        data = {
+            'bucket_bounds': list(self.bucket_bounds),
+            'budgets': self.budgets,
+            'summary': self.summary(),
+            'samples': {
+                f"{name} {action}": [sample._asdict() for sample in samples]
+                for (name, action), samples in sorted(self.samples.items())
+            },
+        }
+        with open(filepath, 'w') as f:
+            json.dump(data, f, indent=2)
+
+    def clear(self):
+        self.samples.clear()
+        self.over_budget.clear()
+
+
 class CommandHistory:
-    def __init__(self, max_history=100):
+    def __init__(self, max_history=100, profiler: CommandProfiler = None):
         self.undo_stack = []
         self.redo_stack = []
         self.max_history = max_history
+        self.profiler = profiler  # optional CommandProfiler
+        self.revision = 0  # bumped whenever a command changed the model, e.g. to invalidate query results
+
+    def _run(self, command, action: str) -> bool:
+        method = command.undo if action == 'undo' else command.execute
+        self.revision += 1
+        if self.profiler is None:
+            return method()
+        with self.profiler.record(command, action):
+            return method()
 
     def push(self, command):
-        if command.execute():
+        if self._run(command, 'push'):
             self.undo_stack.append(command)
             self.redo_stack.clear()
 
@@ -608,7 +799,7 @@ class CommandHistory:
             return False
 
         command = self.undo_stack.pop()
-        if command.undo():
+        if self._run(command, 'undo'):
             self.redo_stack.append(command)
             return True
 
@@ -620,7 +811,7 @@ class CommandHistory:
             return False
 
         command = self.redo_stack.pop()
-        if command.execute():
+        if self._run(command, 'redo'):
             self.undo_stack.append(command)
             return True
 
@@ -1,17 +1,105 @@
 from typing import Union
+from collections import OrderedDict
 
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, QSortFilterProxyModel, pyqtSignal
 from PyQt5.QtWidgets import (
     QGraphicsScene, QWidget, QFormLayout, QLabel, QLineEdit, QPushButton, QVBoxLayout,
-    QHBoxLayout, QComboBox, QDialog, QDoubleSpinBox, QTabWidget, QGroupBox, QListWidget,
-    QListWidgetItem
+    QHBoxLayout, QComboBox, QDialog, QDoubleSpinBox, QTabWidget, QGroupBox, QListView,
+    QAbstractItemView, QTableWidget, QTableWidgetItem, QCompleter
 )
 
 from open223Builder.library import (
-    connection_point_library
+    connection_point_library, medium_library
 )
 
-import open223Builder.enumerations as enums
+from open223Builder.ontology.vocabulary import vocabulary
 from open223Builder.app.items import *
+from open223Builder.app.instrumentation import Profile
+
+
+class VocabularyModel(QAbstractListModel):
+    """Read-only list of vocabulary entries behind a placeholder row; display texts are formatted once.
+
+    Models are shared by all combo boxes offering the same entries (see `of`), so switching a
+    combo box between lists, e.g. the units of different quantity kinds, only swaps models.
+    """
+
+    _models: OrderedDict = OrderedDict()  # (placeholder, uris) -> model, least recently used first
+    max_models = 64
+
+    def __init__(self, placeholder: str, uris, parent=None):
+        super().__init__(parent)
+        self._texts = [placeholder] + [vocabulary.display(uri) for uri in uris]
+        self._data = [None] + [str(uri) for uri in uris]
+
+    @classmethod
+    def of(cls, placeholder: str, uris) -> 'VocabularyModel':
+        key = (placeholder, tuple(uris))
+        model = cls._models.get(key)
+        if model is None:
+            model = cls._models[key] = cls(placeholder, key[1])
+            if len(cls._models) > cls.max_models:
+                cls._models.popitem(last=False)  # combo boxes still showing it keep their own reference
+        else:
+            cls._models.move_to_end(key)
+        return model
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._texts)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return self._texts[index.row()]
+        if role == Qt.UserRole:
+            return self._data[index.row()]
+        return None
+
+    def row_of(self, data) -> int:
+        try:
+            return self._data.index(data)
+        except ValueError:
+            return -1
+
+
+class VocabularyComboBox(QComboBox):
+    """Dropdown over a vocabulary list that filters its entries as you type."""
+
+    def __init__(self, placeholder: str, uris, parent=None):
+        super().__init__(parent)
+        self.placeholder = placeholder
+
+        self.setEditable(True)
+        self.setInsertPolicy(QComboBox.NoInsert)
+        self.setMaxVisibleItems(20)
+
+        completer = self.completer()
+        completer.setCompletionMode(QCompleter.PopupCompletion)
+        completer.setFilterMode(Qt.MatchContains)
+        completer.setCaseSensitivity(Qt.CaseInsensitive)
+
+        self.set_uris(uris)
+
+    def set_uris(self, uris):
+        """Replace the entries, keeping the current one selected if it is still offered."""
+
+        model = VocabularyModel.of(self.placeholder, uris)
+        if model is self.model():
+            return
+
+        current = self.currentData()
+
+        self.blockSignals(True)
+        self._vocabulary_model = model  # the combo box does not own shared models
+        self.setModel(model)
+        self.setCurrentIndex(max(model.row_of(current), 0) if current is not None else 0)
+        self.blockSignals(False)
+
+    def focusOutEvent(self, event):
+        # Text typed without picking an entry does not change the value, so show the value again
+        self.setEditText(self.itemText(self.currentIndex()))
+        super().focusOutEvent(event)
 
 
 class AddPropertyDialog(QDialog):
@@ -38,24 +126,16 @@ class AddPropertyDialog(QDialog):
         self.identifier = QLineEdit("P")
         self.identifier.setMaxLength(1)
 
-        self.aspect = QComboBox()
-        self.aspect.addItem("Select aspect", userData=None)
-        for aspect in enums.aspects:
-            self.aspect.addItem(to_label(aspect), userData=aspect)
+        self.aspect = VocabularyComboBox("Select aspect", vocabulary.aspects)
 
         self.medium = QComboBox()
-        from src.library import medium_library
         for medium_uri in medium_library:
             self.medium.addItem(to_label(medium_uri), userData=medium_uri)
 
-        self.unit = QComboBox()
-        self.unit.addItem("Select Unit", userData=None)
-        for unit_uri in enums.units:
-            self.unit.addItem(to_label(unit_uri), userData=unit_uri)
+        self.unit = VocabularyComboBox("Select Unit", vocabulary.units)
 
-        self.quantity_kind = QComboBox()
-        self.quantity_kind.addItem("Select Quantity Kind", userData=None)
-        for qk_uri in enums.quantity_kinds: self.quantity_kind.addItem(to_label(qk_uri), userData=qk_uri)
+        self.quantity_kind = VocabularyComboBox("Select Quantity Kind", vocabulary.quantity_kinds)
+        self.quantity_kind.currentIndexChanged.connect(self._on_quantity_kind_changed)
 
         self.external_reference = QLineEdit()
         self.internal_reference = QLineEdit()
@@ -87,6 +167,16 @@ class AddPropertyDialog(QDialog):
         layout.addRow("", button_box)
         self.setLayout(layout)
 
+    def _on_quantity_kind_changed(self, index):
+        # Only offer the units that measure the chosen quantity kind
+        quantity_kind = self.quantity_kind.itemData(index)
+        self.unit.set_uris(vocabulary.units_for(quantity_kind and rdflib.URIRef(quantity_kind)))
+
+    @staticmethod
+    def _uri(combo: QComboBox):
+        data = combo.currentData()
+        return None if data is None else rdflib.URIRef(data)
+
     def get_property_data(self):
         """Return dictionary with property configuration."""
         return {
@@ -96,10 +186,10 @@ class AddPropertyDialog(QDialog):
             'position_y': 0,
             'label': self.label_edit.text(),
             'comment': self.comment_edit.text(),
-            'aspect': self.aspect.currentData(),
+            'aspect': self._uri(self.aspect),
             'medium': self.medium.currentData(),
-            'unit': self.unit.currentData(),
-            'quantity_kind': self.quantity_kind.currentData(),
+            'unit': self._uri(self.unit),
+            'quantity_kind': self._uri(self.quantity_kind),
             'external_reference': self.external_reference.text(),
             'internal_reference': self.internal_reference.text(),
             'value': self.value.text()
@@ -161,11 +251,141 @@ class AddConnectionPointDialog(QDialog):
         }
 
 
+class ItemListModel(QAbstractListModel):
+    """Flat list model over scene items. Labels are built when a row is first shown."""
+
+    def __init__(self, items=(), label_func=None, parent=None):
+        super().__init__(parent)
+        self._items = list(items)
+        self._label_func = label_func or (lambda item: item.label or to_label(item.inst_uri))
+        self._labels = {}
+
+    @property
+    def items(self) -> list:
+        return list(self._items)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._items)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        item = self._items[index.row()]
+
+        if role == Qt.DisplayRole:
+            label = self._labels.get(item)
+            if label is None:
+                label = self._labels[item] = self._label_func(item)
+            return label
+
+        if role == Qt.UserRole:
+            return item
+
+        return None
+
+    def row_of(self, item) -> int:
+        try:
+            return self._items.index(item)
+        except ValueError:
+            return -1
+
+    def add_items(self, items):
+        present = set(self._items)
+        items = [item for item in items if item not in present]
+        if not items:
+            return
+
+        first = len(self._items)
+        self.beginInsertRows(QModelIndex(), first, first + len(items) - 1)
+        self._items.extend(items)
+        self.endInsertRows()
+
+    def remove_items(self, items):
+        items = set(items)
+        if not items:
+            return
+
+        self.beginResetModel()
+        self._items = [item for item in self._items if item not in items]
+        self.endResetModel()
+
+
+class FilteredListView(QWidget):
+    """A virtualized list view over an ItemListModel with an incremental text filter on top."""
+
+    currentItemChanged = pyqtSignal(object)
+
+    def __init__(self, model: ItemListModel, selection_mode=QAbstractItemView.ExtendedSelection, parent=None):
+        super().__init__(parent)
+        self.model = model
+
+        self.proxy = QSortFilterProxyModel(self)
+        self.proxy.setSourceModel(model)
+        self.proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+
+        self.filter = QLineEdit()
+        self.filter.setPlaceholderText("Filter...")
+        self.filter.setClearButtonEnabled(True)
+        self.filter.textChanged.connect(self.proxy.setFilterFixedString)
+
+        self.view = QListView()
+        self.view.setModel(self.proxy)
+        self.view.setUniformItemSizes(True)
+        self.view.setSelectionMode(selection_mode)
+        self.view.selectionModel().currentChanged.connect(
+            lambda current, previous: self.currentItemChanged.emit(self.current_item()))
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.filter)
+        layout.addWidget(self.view)
+
+    def selected_items(self) -> list:
+        return [index.data(Qt.UserRole) for index in self.view.selectionModel().selectedIndexes()]
+
+    def current_item(self):
+        index = self.view.currentIndex()
+        return index.data(Qt.UserRole) if index.isValid() else None
+
+    def set_current_item(self, item):
+        row = self.model.row_of(item) if item is not None else -1
+        if row == -1:
+            self.view.setCurrentIndex(QModelIndex())
+            return
+        self.view.setCurrentIndex(self.proxy.mapFromSource(self.model.index(row)))
+
+
+def _observation_label(item) -> str:
+    if isinstance(item, ConnectableItem):
+        prefix = "Equip"
+    elif isinstance(item, Connection):
+        prefix = "Conn"
+    elif isinstance(item, ConnectionPoint):
+        prefix = "CP"
+    else:
+        prefix = "Item"  # Fallback
+    return f"[{prefix}] {to_label(item.type_uri)}: {item.label or to_label(item.inst_uri)}"
+
+
+def _contains_label(item) -> str:
+    return item.label or f"{to_label(item.type_uri)} ({to_label(item.inst_uri)})"
+
+
+def _domain_label(item) -> str:
+    return item.label or f"Domain ({to_label(item.inst_uri)})"
+
+
+def _space_label(item) -> str:
+    return item.label or f"Space ({to_label(item.inst_uri)})"
+
+
 class RelationshipDialog(QDialog):
     def __init__(self, item: Union[PhysicalSpace, ConnectableItem], scene: QGraphicsScene, parent=None):
         super().__init__(parent)
         self.item = item
         self.scene = scene
+        self.index = scene_index(scene)
         self.setWindowTitle(f"Manage Relationships for '{item.label or to_label(item.inst_uri)}'")
         self.setMinimumWidth(600)
         self.setMinimumHeight(400)
@@ -187,13 +407,13 @@ class RelationshipDialog(QDialog):
         # This will hold the URI selected *in the dialog* for observation location
         self.selected_observation_location_uri: Optional[rdflib.URIRef] = self.initial_observation_location_uri
 
-        # --- Maps for list widgets (used to map graphics items to list items) ---
-        self.available_contain_map = {}  # item -> list_item
-        self.contained_map = {}  # item -> list_item
-        self.available_domains_map = {}  # item -> list_item
-        self.enclosed_domains_map = {}  # item -> list_item
-        self.available_physical_spaces_map = {}  # item -> list_item
-        self.available_observation_locations_map = {}  # item -> list_item
+        # --- List models, filled from the scene's typed index in _populate_lists ---
+        self.available_contain_model = ItemListModel(label_func=_contains_label, parent=self)
+        self.contained_model = ItemListModel(label_func=_contains_label, parent=self)
+        self.available_domains_model = ItemListModel(label_func=_domain_label, parent=self)
+        self.enclosed_domains_model = ItemListModel(label_func=_domain_label, parent=self)
+        self.available_physical_spaces_model = ItemListModel(label_func=_space_label, parent=self)
+        self.available_observation_locations_model = ItemListModel(label_func=_observation_label, parent=self)
 
         # --- Setup UI ---
         self._setup_ui()
@@ -210,8 +430,7 @@ class RelationshipDialog(QDialog):
 
         available_group = QGroupBox("Available Items")
         available_layout = QVBoxLayout(available_group)
-        self.available_contain_list = QListWidget()
-        self.available_contain_list.setSelectionMode(QListWidget.ExtendedSelection)
+        self.available_contain_list = FilteredListView(self.available_contain_model)
         available_layout.addWidget(self.available_contain_list)
 
         button_layout_contains = QVBoxLayout()
@@ -224,8 +443,7 @@ class RelationshipDialog(QDialog):
 
         contained_group = QGroupBox("Contained Items")
         contained_layout = QVBoxLayout(contained_group)
-        self.contained_list = QListWidget()
-        self.contained_list.setSelectionMode(QListWidget.ExtendedSelection)
+        self.contained_list = FilteredListView(self.contained_model)
         contained_layout.addWidget(self.contained_list)
 
         contains_layout.addWidget(available_group)
@@ -244,8 +462,7 @@ class RelationshipDialog(QDialog):
 
             available_domains_group = QGroupBox("Available Domain Spaces")
             available_domains_layout = QVBoxLayout(available_domains_group)
-            self.available_domains_list = QListWidget()
-            self.available_domains_list.setSelectionMode(QListWidget.ExtendedSelection)
+            self.available_domains_list = FilteredListView(self.available_domains_model)
             available_domains_layout.addWidget(self.available_domains_list)
 
             domain_button_layout = QVBoxLayout()
@@ -258,8 +475,7 @@ class RelationshipDialog(QDialog):
 
             enclosed_group = QGroupBox("Enclosed Domain Spaces")
             enclosed_layout = QVBoxLayout(enclosed_group)
-            self.enclosed_domains_list = QListWidget()
-            self.enclosed_domains_list.setSelectionMode(QListWidget.ExtendedSelection)
+            self.enclosed_domains_list = FilteredListView(self.enclosed_domains_model)
             enclosed_layout.addWidget(self.enclosed_domains_list)
 
             encloses_layout.addWidget(available_domains_group)
@@ -282,8 +498,8 @@ class RelationshipDialog(QDialog):
             # Group for available spaces
             available_spaces_group = QGroupBox("Available Physical Spaces")
             available_spaces_layout = QVBoxLayout(available_spaces_group)
-            self.available_physical_spaces_list = QListWidget()
-            self.available_physical_spaces_list.setSelectionMode(QListWidget.SingleSelection)  # Single selection
+            self.available_physical_spaces_list = FilteredListView(
+                self.available_physical_spaces_model, QAbstractItemView.SingleSelection)
             available_spaces_layout.addWidget(self.available_physical_spaces_list)
             location_layout.addWidget(available_spaces_group)
 
@@ -315,8 +531,8 @@ class RelationshipDialog(QDialog):
             # Group for available locations
             available_obs_loc_group = QGroupBox("Available Observation Locations (Connectable, Connection, CP)")
             available_obs_loc_layout = QVBoxLayout(available_obs_loc_group)
-            self.available_observation_locations_list = QListWidget()
-            self.available_observation_locations_list.setSelectionMode(QListWidget.SingleSelection)  # Single selection
+            self.available_observation_locations_list = FilteredListView(
+                self.available_observation_locations_model, QAbstractItemView.SingleSelection)
             available_obs_loc_layout.addWidget(self.available_observation_locations_list)
             obs_loc_layout.addWidget(available_obs_loc_group)
 
@@ -358,239 +574,108 @@ class RelationshipDialog(QDialog):
         self.cancel_button.clicked.connect(self.reject)
 
     def _populate_lists(self):
-        # Clear all lists and maps first
-        self.available_contain_list.clear()
-        self.contained_list.clear()
-        self.available_contain_map.clear()
-        self.contained_map.clear()
-
-        if hasattr(self, 'available_domains_list'):
-            self.available_domains_list.clear()
-            self.enclosed_domains_list.clear()
-            self.available_domains_map.clear()
-            self.enclosed_domains_map.clear()
+        index = self.index
 
-        if hasattr(self, 'available_physical_spaces_list'):
-            self.available_physical_spaces_list.clear()
-            self.available_physical_spaces_map.clear()
-
-        if hasattr(self, 'available_observation_locations_list'):
-            self.available_observation_locations_list.clear()
-            self.available_observation_locations_map.clear()
+        # Walk up once; none of the item's ancestors may become its child
+        excluded = {self.item}
+        parent = self.item.parentItem()
+        while parent:
+            excluded.add(parent)
+            parent = parent.parentItem()
 
         # --- Populate Contains List ---
-        is_physical_container = isinstance(self.item, PhysicalSpace)
-        for scene_item in self.scene.items():
-            if scene_item == self.item: continue  # Skip self
-
-            valid_contain_candidate = False
-            # Check for valid containment relationship type and prevent cycles
-            if is_physical_container and isinstance(scene_item, PhysicalSpace):
-                parent = self.item.parentItem();
-                is_ancestor = False
-                while parent:
-                    if parent == scene_item: is_ancestor = True; break
-                    parent = parent.parentItem()
-                if not is_ancestor: valid_contain_candidate = True
-            elif not is_physical_container and isinstance(self.item, ConnectableItem) and \
-                    isinstance(scene_item, ConnectableItem) and not isinstance(scene_item,
-                                                                               (DomainSpace, PhysicalSpace)):
-                # Equipment containing Equipment (excluding Domain/Physical)
-                parent = self.item.parentItem();
-                is_ancestor = False
-                while parent:
-                    if parent == scene_item: is_ancestor = True; break
-                    parent = parent.parentItem()
-                if not is_ancestor: valid_contain_candidate = True
-
-            if valid_contain_candidate:
-                # Ensure item has necessary attributes before creating label
-                if hasattr(scene_item, 'label') and hasattr(scene_item, 'type_uri') and hasattr(scene_item, 'inst_uri'):
-                    label = scene_item.label or f"{to_label(scene_item.type_uri)} ({to_label(scene_item.inst_uri)})"
-                    list_item = QListWidgetItem(label)
-                    list_item.setData(Qt.UserRole, scene_item)  # Store the actual item
-
-                    if scene_item in self.initial_contained_items:
-                        self.contained_list.addItem(list_item)
-                        self.contained_map[scene_item] = list_item
-                    else:
-                        self.available_contain_list.addItem(list_item)
-                        self.available_contain_map[scene_item] = list_item
-                else:
-                    print(f"Warning: Skipping item {scene_item} in contains list population - missing attributes.")
+        if isinstance(self.item, PhysicalSpace):
+            candidates = index.of('physical_space')
+        elif isinstance(self.item, ConnectableItem):
+            # Equipment containing Equipment (excluding Domain/Physical)
+            candidates = index.of('equipment')
+        else:
+            candidates = []
+
+        candidates = [item for item in candidates if item not in excluded]
+        self.contained_model.add_items(item for item in candidates if item in self.initial_contained_items)
+        self.available_contain_model.add_items(item for item in candidates if item not in self.initial_contained_items)
 
         # --- Populate Encloses List (if PhysicalSpace) ---
-        if isinstance(self.item, PhysicalSpace) and hasattr(self, 'available_domains_list'):
-            for scene_item in self.scene.items():
-                # Ensure item has necessary attributes
-                if isinstance(scene_item, DomainSpace) and hasattr(scene_item, 'label') and hasattr(scene_item,
-                                                                                                    'inst_uri'):
-                    label = scene_item.label or f"Domain ({to_label(scene_item.inst_uri)})"
-                    list_item = QListWidgetItem(label)
-                    list_item.setData(Qt.UserRole, scene_item)
-                    if scene_item.inst_uri in self.initial_enclosed_uris:
-                        self.enclosed_domains_list.addItem(list_item)
-                        self.enclosed_domains_map[scene_item] = list_item
-                    else:
-                        self.available_domains_list.addItem(list_item)
-                        self.available_domains_map[scene_item] = list_item
-                elif isinstance(scene_item, DomainSpace):
-                    print(
-                        f"Warning: Skipping DomainSpace {scene_item} in encloses list population - missing attributes.")
+        if isinstance(self.item, PhysicalSpace):
+            domain_spaces = index.of('domain_space')
+            self.enclosed_domains_model.add_items(
+                item for item in domain_spaces if item.inst_uri in self.initial_enclosed_uris)
+            self.available_domains_model.add_items(
+                item for item in domain_spaces if item.inst_uri not in self.initial_enclosed_uris)
 
         # --- Populate Physical Location List (if Equipment) ---
         is_equipment = isinstance(self.item, ConnectableItem) and not isinstance(self.item, DomainSpace)
-        if is_equipment and hasattr(self, 'available_physical_spaces_list'):
-            current_location_item = None
-            for scene_item in self.scene.items():
-                # Ensure item has necessary attributes
-                if isinstance(scene_item, PhysicalSpace) and hasattr(scene_item, 'label') and hasattr(scene_item,
-                                                                                                      'inst_uri'):
-                    label = scene_item.label or f"Space ({to_label(scene_item.inst_uri)})"
-                    list_item = QListWidgetItem(label)
-                    list_item.setData(Qt.UserRole, scene_item)  # Store item
-                    self.available_physical_spaces_list.addItem(list_item)
-                    self.available_physical_spaces_map[scene_item] = list_item
-
-                    # Check if this is the currently assigned location (using the temporary selected_uri)
-                    if self.selected_physical_location_uri == scene_item.inst_uri:
-                        current_location_item = scene_item
-                        # We select based on the *current* selection in the dialog, not initial state
-                        self.available_physical_spaces_list.setCurrentItem(
-                            list_item)  # Use setCurrentItem for single selection
-                elif isinstance(scene_item, PhysicalSpace):
-                    print(
-                        f"Warning: Skipping PhysicalSpace {scene_item} in physical location list population - missing attributes.")
+        if is_equipment:
+            self.available_physical_spaces_model.add_items(index.of('physical_space'))
+
+            # Select based on the *current* selection in the dialog, not initial state
+            current_location_item = self._indexed(self.selected_physical_location_uri, PhysicalSpace)
+            self.available_physical_spaces_list.set_current_item(current_location_item)
 
             # Update the current location label based on the *current* selection in the dialog
             if current_location_item:
-                label = current_location_item.label or f"Space ({to_label(current_location_item.inst_uri)})"
-                self.current_location_label.setText(label)
+                self.current_location_label.setText(_space_label(current_location_item))
             else:
                 self.current_location_label.setText("None")
             self._update_location_button_state()  # Update button state after population
 
         # --- Populate Observation Location List (if Equipment) ---
-        if is_equipment and hasattr(self, 'available_observation_locations_list'):
-            current_obs_loc_item = None
-            for scene_item in self.scene.items():
-                # Target can be Connectable, Connection, or ConnectionPoint
-                if isinstance(scene_item, (ConnectableItem, Connection, ConnectionPoint)):
-                    # Skip self if it happens to be a target type (e.g., ConnectableItem)
-                    if scene_item == self.item:
-                        continue
-
-                    # Ensure item has necessary attributes before creating label
-                    if hasattr(scene_item, 'label') and hasattr(scene_item, 'type_uri') and hasattr(scene_item,
-                                                                                                    'inst_uri'):
-                        # Create a descriptive label
-                        label = f"{scene_item.label or to_label(scene_item.inst_uri)}"
-                        if isinstance(scene_item, ConnectableItem):
-                            prefix = "Equip"
-                        elif isinstance(scene_item, Connection):
-                            prefix = "Conn"
-                        elif isinstance(scene_item, ConnectionPoint):
-                            prefix = "CP"
-                        else:
-                            prefix = "Item"  # Fallback
-                        full_label = f"[{prefix}] {to_label(scene_item.type_uri)}: {label}"
-
-                        list_item = QListWidgetItem(full_label)
-                        list_item.setData(Qt.UserRole, scene_item)  # Store the actual graphics item
-
-                        self.available_observation_locations_list.addItem(list_item)
-                        self.available_observation_locations_map[scene_item] = list_item
-
-                        # Check if this is the currently assigned *selected* observation location
-                        if self.selected_observation_location_uri == scene_item.inst_uri:
-                            current_obs_loc_item = scene_item
-                            self.available_observation_locations_list.setCurrentItem(list_item)  # Select in list
-                    else:
-                        print(
-                            f"Warning: Skipping item {scene_item} in observation location list population - missing attributes.")
+        if is_equipment:
+            # Target can be Connectable, Connection, or ConnectionPoint
+            self.available_observation_locations_model.add_items(
+                item for kind in ('connectable', 'connection', 'connection_point')
+                for item in index.of(kind) if item is not self.item
+            )
+
+            current_obs_loc_item = self._indexed(
+                self.selected_observation_location_uri, (ConnectableItem, Connection, ConnectionPoint))
+            self.available_observation_locations_list.set_current_item(current_obs_loc_item)
 
             # Update the current location label based on the *current* selection in the dialog
             if current_obs_loc_item:
-                # Recreate the label for consistency
-                label = f"{current_obs_loc_item.label or to_label(current_obs_loc_item.inst_uri)}"
-                if isinstance(current_obs_loc_item, ConnectableItem):
-                    prefix = "Equip"
-                elif isinstance(current_obs_loc_item, Connection):
-                    prefix = "Conn"
-                elif isinstance(current_obs_loc_item, ConnectionPoint):
-                    prefix = "CP"
-                else:
-                    prefix = "Item"
-                full_label = f"[{prefix}] {to_label(current_obs_loc_item.type_uri)}: {label}"
-                self.current_observation_location_label.setText(full_label)
+                self.current_observation_location_label.setText(_observation_label(current_obs_loc_item))
             else:
                 self.current_observation_location_label.setText("None")
             self._update_observation_location_button_state()  # Update button state after population
 
-    def _move_items(self, source_list: QListWidget, target_list: QListWidget,
-                    source_map: dict, target_map: dict):
-        """Generic helper to move selected items between two QListWidgets and update tracking maps."""
-        items_to_move = source_list.selectedItems()
+    def _indexed(self, uri, types):
+        """The indexed scene item for `uri` if it is one of `types`, else None."""
+        item = self.index.by_uri(uri) if uri is not None else None
+        return item if isinstance(item, types) else None
+
+    def _move_items(self, source_list: FilteredListView, target_list: FilteredListView):
+        """Generic helper to move the selected items from one list to the other."""
+        items_to_move = source_list.selected_items()
         if not items_to_move:
             return
 
-        # Get the actual graphics items associated with the selected QListWidgetItems
-        graphics_items_to_move = [item.data(Qt.UserRole) for item in items_to_move if item.data(Qt.UserRole)]
-
-        # Remove items from source list *by ListWidgetItem reference*
-        for list_item in items_to_move:
-            source_list.takeItem(source_list.row(list_item))  # Removes item from source list
-
-        # Add items to target list and update maps
-        for item_data in graphics_items_to_move:
-            if item_data:
-                # Create a new QListWidgetItem for the target list (important!)
-                # Recreate the label based on the item type
-                label = item_data.label or f"{to_label(item_data.type_uri)} ({to_label(item_data.inst_uri)})"
-                if isinstance(item_data, PhysicalSpace):
-                    pass  # Label already good
-                elif isinstance(item_data, DomainSpace):
-                    label = f"Domain ({to_label(item_data.inst_uri)})"  # Adjust if needed
-                # Add more specific labels if needed
-
-                new_list_item = QListWidgetItem(label)
-                new_list_item.setData(Qt.UserRole, item_data)
-
-                target_list.addItem(new_list_item)  # Add QListWidgetItem to target list
-                target_map[item_data] = new_list_item  # Update target map (graphics_item -> list_item)
-                if item_data in source_map:
-                    del source_map[item_data]  # Remove from source map
+        source_list.model.remove_items(items_to_move)
+        target_list.model.add_items(items_to_move)
 
     # --- Specific Move Actions ---
     def _move_items_to_contained(self):
-        self._move_items(self.available_contain_list, self.contained_list,
-                         self.available_contain_map, self.contained_map)
+        self._move_items(self.available_contain_list, self.contained_list)
 
     def _move_items_to_available_contain(self):
-        self._move_items(self.contained_list, self.available_contain_list,
-                         self.contained_map, self.available_contain_map)
+        self._move_items(self.contained_list, self.available_contain_list)
 
     def _move_items_to_enclosed(self):
         if hasattr(self, 'available_domains_list'):
-            self._move_items(self.available_domains_list, self.enclosed_domains_list,
-                             self.available_domains_map, self.enclosed_domains_map)
+            self._move_items(self.available_domains_list, self.enclosed_domains_list)
 
     def _move_items_to_available_domains(self):
         if hasattr(self, 'enclosed_domains_list'):
-            self._move_items(self.enclosed_domains_list, self.available_domains_list,
-                             self.enclosed_domains_map, self.available_domains_map)
+            self._move_items(self.enclosed_domains_list, self.available_domains_list)
 
     # --- Physical Location Button Handlers ---
     def _update_location_button_state(self):
         """Enable/disable 'Set/Clear Location' button for Physical Location tab."""
         if hasattr(self, 'set_location_btn'):
-            selected_list_item = self.available_physical_spaces_list.currentItem()
-            is_selected = selected_list_item is not None
-            can_set = False
-            if is_selected:
-                selected_space_item = selected_list_item.data(Qt.UserRole)
-                # Enable set button only if selection exists and its URI is different from the current one
-                can_set = selected_space_item and (selected_space_item.inst_uri != self.selected_physical_location_uri)
+            selected_space_item = self.available_physical_spaces_list.current_item()
+            # Enable set button only if selection exists and its URI is different from the current one
+            can_set = selected_space_item is not None and \
+                selected_space_item.inst_uri != self.selected_physical_location_uri
             self.set_location_btn.setEnabled(can_set)
 
             # Enable clear button only if a location is currently set
@@ -599,14 +684,11 @@ class RelationshipDialog(QDialog):
     def _set_physical_location(self):
         """Sets the selected physical space as the current location for Physical Location tab."""
         if hasattr(self, 'available_physical_spaces_list'):
-            selected_list_item = self.available_physical_spaces_list.currentItem()
-            if selected_list_item:
-                selected_space_item = selected_list_item.data(Qt.UserRole)
-                if selected_space_item and hasattr(selected_space_item, 'inst_uri'):
-                    self.selected_physical_location_uri = selected_space_item.inst_uri
-                    label = selected_space_item.label or f"Space ({to_label(selected_space_item.inst_uri)})"
-                    self.current_location_label.setText(label)
-                    self._update_location_button_state()  # Update button states after setting
+            selected_space_item = self.available_physical_spaces_list.current_item()
+            if selected_space_item is not None:
+                self.selected_physical_location_uri = selected_space_item.inst_uri
+                self.current_location_label.setText(_space_label(selected_space_item))
+                self._update_location_button_state()  # Update button states after setting
 
     def _clear_physical_location(self):
         """Clears the currently set physical location for Physical Location tab."""
@@ -614,21 +696,17 @@ class RelationshipDialog(QDialog):
             self.selected_physical_location_uri = None
             self.current_location_label.setText("None")
             # Deselect item in the list
-            self.available_physical_spaces_list.setCurrentItem(None)
+            self.available_physical_spaces_list.set_current_item(None)
             self._update_location_button_state()  # Update button states after clearing
 
     # --- Observation Location Button Handlers ---
     def _update_observation_location_button_state(self):
         """Enable/disable 'Set/Clear Observation Location' buttons."""
         if hasattr(self, 'set_observation_location_btn'):
-            selected_list_item = self.available_observation_locations_list.currentItem()
-            is_selected = selected_list_item is not None
-            can_set = False
-            if is_selected:
-                selected_target_item = selected_list_item.data(Qt.UserRole)
-                # Enable set button only if selection exists and its URI is different from the current one
-                can_set = selected_target_item and (
-                            selected_target_item.inst_uri != self.selected_observation_location_uri)
+            selected_target_item = self.available_observation_locations_list.current_item()
+            # Enable set button only if selection exists and its URI is different from the current one
+            can_set = selected_target_item is not None and \
+                selected_target_item.inst_uri != self.selected_observation_location_uri
             self.set_observation_location_btn.setEnabled(can_set)
 
             # Enable clear button only if a location is currently set
@@ -637,24 +715,11 @@ class RelationshipDialog(QDialog):
     def _set_observation_location(self):
         """Sets the selected item as the current observation location."""
         if hasattr(self, 'available_observation_locations_list'):
-            selected_list_item = self.available_observation_locations_list.currentItem()
-            if selected_list_item:
-                selected_target_item = selected_list_item.data(Qt.UserRole)
-                if selected_target_item and hasattr(selected_target_item, 'inst_uri'):
-                    self.selected_observation_location_uri = selected_target_item.inst_uri
-                    # Recreate the label for consistency
-                    label = f"{selected_target_item.label or to_label(selected_target_item.inst_uri)}"
-                    if isinstance(selected_target_item, ConnectableItem):
-                        prefix = "Equip"
-                    elif isinstance(selected_target_item, Connection):
-                        prefix = "Conn"
-                    elif isinstance(selected_target_item, ConnectionPoint):
-                        prefix = "CP"
-                    else:
-                        prefix = "Item"
-                    full_label = f"[{prefix}] {to_label(selected_target_item.type_uri)}: {label}"
-                    self.current_observation_location_label.setText(full_label)
-                    self._update_observation_location_button_state()  # Update buttons
+            selected_target_item = self.available_observation_locations_list.current_item()
+            if selected_target_item is not None:
+                self.selected_observation_location_uri = selected_target_item.inst_uri
+                self.current_observation_location_label.setText(_observation_label(selected_target_item))
+                self._update_observation_location_button_state()  # Update buttons
 
     def _clear_observation_location(self):
         """Clears the currently set observation location."""
@@ -662,19 +727,19 @@ class RelationshipDialog(QDialog):
             self.selected_observation_location_uri = None
             self.current_observation_location_label.setText("None")
             # Deselect item in the list
-            self.available_observation_locations_list.setCurrentItem(None)
+            self.available_observation_locations_list.set_current_item(None)
             self._update_observation_location_button_state()  # Update buttons
 
     def get_commands(self) -> List[Command]:
         """
         Compare initial and final states of relationships based on the dialog's
-        current state (using the tracking maps) and generate appropriate commands.
+        current state (using the list models) and generate appropriate commands.
         """
         commands = []
 
         # 1. --- Contains relationship ---
-        # Determine the final set of contained items based on the right list's map
-        current_contained_items = set(self.contained_map.keys())
+        # Determine the final set of contained items based on the right list's model
+        current_contained_items = set(self.contained_model.items)
 
         # Find items added (in current set but not initial)
         added_items = current_contained_items - self.initial_contained_items
@@ -696,9 +761,9 @@ class RelationshipDialog(QDialog):
                 commands.append(RemoveContainedItemCommand(self.item, item_to_remove))
 
         # 2. --- Encloses relationship (Only if item is PhysicalSpace) ---
-        if isinstance(self.item, PhysicalSpace) and hasattr(self, 'enclosed_domains_map'):
-            # Determine the final set of enclosed domain space items from the map
-            current_enclosed_items = set(self.enclosed_domains_map.keys())
+        if isinstance(self.item, PhysicalSpace):
+            # Determine the final set of enclosed domain space items from the model
+            current_enclosed_items = set(self.enclosed_domains_model.items)
             # Get their URIs
             current_enclosed_uris = {item.inst_uri for item in current_enclosed_items}
 
@@ -714,7 +779,7 @@ class RelationshipDialog(QDialog):
 
             # Find initial items to generate remove commands
             initial_enclosed_items = {
-                item for item in self.available_domains_map.keys() | self.enclosed_domains_map.keys()  # Check both maps
+                item for item in self.available_domains_model.items + self.enclosed_domains_model.items  # Check both lists
                 if isinstance(item, DomainSpace) and item.inst_uri in self.initial_enclosed_uris
             }
             for domain_item in initial_enclosed_items:
@@ -747,3 +812,50 @@ class RelationshipDialog(QDialog):
                 commands.append(cmd)
 
         return commands
+
+
+class ProfileDialog(QDialog):
+    """Read-only table of the passes of a load/save Profile."""
+
+    columns = ("Pass", "Time (ms)", "Share", "Allocated blocks", "Counts")
+
+    def __init__(self, profile: Optional[Profile], title: str = "Profile", parent=None):
+        super().__init__(parent)
+        self.profile = profile
+        self.setWindowTitle(title)
+        self.setMinimumWidth(700)
+        self.setMinimumHeight(350)
+
+        layout = QVBoxLayout(self)
+
+        if profile is None:
+            layout.addWidget(QLabel("Nothing has been recorded yet."))
+        else:
+            total = profile.total_seconds
+            layout.addWidget(QLabel(
+                f"{profile.source or profile.kind}: {total * 1000:.1f} ms in {len(profile.passes)} passes"))
+
+            table = QTableWidget(len(profile.passes), len(self.columns))
+            table.setHorizontalHeaderLabels(self.columns)
+            table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+            table.verticalHeader().setVisible(False)
+
+            for row, record in enumerate(profile.passes):
+                share = record.seconds / total if total else 0.0
+                counts = ", ".join(f"{name}: {count}" for name, count in record.counts.items())
+                for column, text in enumerate((
+                        record.name, f"{record.seconds * 1000:.1f}", f"{share:.0%}",
+                        f"{record.allocated_blocks:+d}", counts,
+                )):
+                    cell = QTableWidgetItem(text)
+                    if 0 < column < 4:
+                        cell.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                    table.setItem(row, column, cell)
+
+            table.resizeColumnsToContents()
+            table.horizontalHeader().setStretchLastSection(True)
+            layout.addWidget(table)
+
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.accept)
+        layout.addWidget(close_button)
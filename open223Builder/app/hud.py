@@ -0,0 +1,240 @@
+"""Frame-time and paint-cost overlay for the canvas.
+
+While the overlay is on, PaintProbe swaps timing wrappers in for the Python paint methods
+of the model items, the scene's drawForeground (location lines), itemChange and
+Connection.update_path. Turning it off puts the original methods back, so an idle overlay
+costs nothing. Items painted by Qt itself (connections, connection points, grid lines)
+only show up in the frame time.
+"""
+
+import time
+
+from collections import defaultdict
+
+from PyQt5.QtCore import QObject, QEvent, QTimer, QRectF, Qt
+from PyQt5.QtGui import QPainter, QColor, QFont
+
+from open223Builder.app.items import *
+
+
+class PaintProbe:
+    """Process-wide counters, fed by method wrappers that are only installed while in use."""
+
+    paint_classes = (PhysicalSpace, Property, ConnectableItem, DomainSpace, SystemItem)
+    item_change_classes = (PhysicalSpace, Property, ConnectableItem, DomainSpace, ConnectionPoint, Connection,
+                           SystemItem)
+
+    users = 0
+    originals = {}  # (class, method name) -> original function
+
+    paint_time = defaultdict(float)  # item class name -> seconds, since the probe was installed
+    paint_calls = defaultdict(int)
+    frame_items = 0  # items painted in the current frame
+    item_changes = 0  # since the last HUD tick
+    path_updates = 0
+
+    @classmethod
+    def reset(cls):
+        cls.paint_time.clear()
+        cls.paint_calls.clear()
+        cls.frame_items = 0
+        cls.item_changes = 0
+        cls.path_updates = 0
+
+    @classmethod
+    def install(cls, scene_class):
+        cls.users += 1
+        if cls.users > 1:
+            return
+
+        cls.reset()
+        for item_class in cls.paint_classes:
+            cls._wrap(item_class, 'paint', _timed_paint)
+        for item_class in cls.item_change_classes:
+            cls._wrap(item_class, 'itemChange', _counted_item_change)
+        cls._wrap(Connection, 'update_path', _counted_path_update)
+        cls._wrap(scene_class, 'drawForeground', _timed_foreground)
+
+    @classmethod
+    def uninstall(cls):
+        cls.users = max(0, cls.users - 1)
+        if cls.users:
+            return
+
+        for (owner, name), original in cls.originals.items():
+            setattr(owner, name, original)
+        cls.originals.clear()
+
+    @classmethod
+    def _wrap(cls, owner, name: str, make_wrapper):
+        # Only methods implemented in Python on the class itself; sip does not pick up
+        # reimplementations that appear on a class after its first instance was painted.
+        original = owner.__dict__.get(name)
+        if original is None or (owner, name) in cls.originals:
+            return
+        cls.originals[(owner, name)] = original
+        setattr(owner, name, make_wrapper(owner, name, original))
+
+
+def _outermost(self, name: str, wrapper) -> bool:
+    """Whether `wrapper` is the most derived override, so super() chains count once."""
+    return getattr(type(self), name) is wrapper
+
+
+def _timed_paint(owner, name, original):
+    def paint(self, painter, option, widget=None):
+        if not _outermost(self, name, paint):
+            return original(self, painter, option, widget)
+
+        start = time.perf_counter()
+        try:
+            return original(self, painter, option, widget)
+        finally:
+            class_name = type(self).__name__
+            PaintProbe.paint_time[class_name] += time.perf_counter() - start
+            PaintProbe.paint_calls[class_name] += 1
+            PaintProbe.frame_items += 1
+
+    return paint
+
+
+def _timed_foreground(owner, name, original):
+    def drawForeground(self, painter, rect):
+        start = time.perf_counter()
+        try:
+            return original(self, painter, rect)
+        finally:
+            PaintProbe.paint_time["location lines"] += time.perf_counter() - start
+            PaintProbe.paint_calls["location lines"] += 1
+
+            for hud in CanvasHud.painting:
+                if hud.canvas.scene is self:
+                    hud.draw(painter)
+
+    return drawForeground
+
+
+def _counted_item_change(owner, name, original):
+    def itemChange(self, change, value):
+        if _outermost(self, name, itemChange):
+            PaintProbe.item_changes += 1
+        return original(self, change, value)
+
+    return itemChange
+
+
+def _counted_path_update(owner, name, original):
+    def update_path(self, *args, **kwargs):
+        PaintProbe.path_updates += 1
+        return original(self, *args, **kwargs)
+
+    return update_path
+
+
+class CanvasHud(QObject):
+    """Overlay in the top-left corner of a canvas with frame time, paint cost and call rates."""
+
+    painting = []  # HUDs whose canvas is in the middle of a frame
+
+    tick_interval = 1000  # ms between rate updates
+    margin = 8
+    background = QColor(0, 0, 0, 170)
+    foreground = QColor(240, 240, 240)
+
+    def __init__(self, canvas):
+        super().__init__(canvas)
+        self.canvas = canvas
+        self.enabled = False
+
+        self.frame_start = 0.0
+        self.frame_times = []  # seconds, frames since the last tick
+        self.last_frame = 0.0
+        self.last_frame_items = 0
+
+        self.lines = []
+        self.rates = (0.0, 0.0)  # itemChange, update_path per second
+        self.tick_start = 0.0
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(self.tick_interval)
+        self.timer.timeout.connect(self._tick)
+
+    def set_enabled(self, enabled: bool):
+        if enabled == self.enabled:
+            return
+        self.enabled = enabled
+
+        viewport = self.canvas.viewport()
+        if enabled:
+            PaintProbe.install(type(self.canvas.scene))
+            viewport.installEventFilter(self)
+            self.frame_times.clear()
+            self.tick_start = time.perf_counter()
+            self.timer.start()
+        else:
+            self.timer.stop()
+            viewport.removeEventFilter(self)
+            PaintProbe.uninstall()
+            if self in CanvasHud.painting:
+                CanvasHud.painting.remove(self)
+
+        viewport.update()
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Paint:
+            # The frame ends in the scene's drawForeground, see draw
+            self.frame_start = time.perf_counter()
+            PaintProbe.frame_items = 0
+            if self not in CanvasHud.painting:
+                CanvasHud.painting.append(self)
+        return False
+
+    def _tick(self):
+        elapsed = time.perf_counter() - self.tick_start or 1.0
+        self.rates = (PaintProbe.item_changes / elapsed, PaintProbe.path_updates / elapsed)
+        PaintProbe.item_changes = 0
+        PaintProbe.path_updates = 0
+        self.tick_start = time.perf_counter()
+
+        frames = self.frame_times or [self.last_frame]
+        self.lines = [
+            f"frame {self.last_frame * 1000:6.1f} ms  avg {sum(frames) / len(frames) * 1000:6.1f}"
+            f"  max {max(frames) * 1000:6.1f}  ({len(self.frame_times) / elapsed:.0f} fps)",
+            f"items painted/frame {self.last_frame_items}",
+            f"itemChange/s {self.rates[0]:8.0f}   update_path/s {self.rates[1]:8.0f}",
+            "paint time since on:",
+        ]
+        for name, seconds in sorted(PaintProbe.paint_time.items(), key=lambda entry: -entry[1]):
+            self.lines.append(f"  {name:<16} {seconds * 1000:9.1f} ms  {PaintProbe.paint_calls[name]:7d} calls")
+
+        self.frame_times.clear()
+        self.canvas.viewport().update()
+
+    def draw(self, painter: QPainter):
+        """Close the current frame and paint the overlay in viewport coordinates."""
+
+        if self in CanvasHud.painting:
+            CanvasHud.painting.remove(self)
+        self.last_frame = time.perf_counter() - self.frame_start
+        self.last_frame_items = PaintProbe.frame_items
+        self.frame_times.append(self.last_frame)
+
+        lines = self.lines or ["collecting..."]
+
+        painter.save()
+        painter.resetTransform()
+        painter.setFont(QFont("Monospace", 8))
+        metrics = painter.fontMetrics()
+        width = max(metrics.horizontalAdvance(line) for line in lines) + 2 * self.margin
+        height = metrics.height() * len(lines) + 2 * self.margin
+
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(self.background)
+        painter.drawRect(QRectF(self.margin, self.margin, width, height))
+
+        painter.setPen(self.foreground)
+        y = 2 * self.margin + metrics.ascent()
+        for line in lines:
+            painter.drawText(2 * self.margin, y, line)
+            y += metrics.height()
+        painter.restore()
@@ -0,0 +1,234 @@
+"""Per-pass timings of load, save, paste and startup, reported to pluggable sinks.
+
+A Profile is a list of passes; each pass records its wall time, item counts and the change in
+allocated memory blocks while it ran. Finished profiles are handed to every registered sink
+and the last one of each kind is kept for the UI.
+
+Per-entity messages of the load/save code go to the "open223Builder.io" logger at DEBUG level,
+pass summaries at INFO, problems at WARNING.
+"""
+
+import sys
+import time
+import logging
+import contextlib
+import importlib.abc
+
+from typing import Callable, Dict, List
+
+
+log = logging.getLogger("open223Builder.io")
+
+
+class PassRecord:
+    """Timing, counts and allocations of a single pass."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.seconds = 0.0
+        self.allocated_blocks = 0  # net change of sys.getallocatedblocks() over the pass
+        self.counts: Dict[str, int] = {}
+
+    def as_dict(self) -> dict:
+        return {
+            'name': self.name,
+            'seconds': self.seconds,
+            'allocated_blocks': self.allocated_blocks,
+            'counts': dict(self.counts),
+        }
+
+
+class Profile:
+    """The passes of one load, save or paste, in the order they ran."""
+
+    def __init__(self, kind: str, source: str = ''):
+        self.kind = kind
+        self.source = source
+        self.started = time.time()
+        self.passes: List[PassRecord] = []
+
+    @contextlib.contextmanager
+    def measure(self, name: str):
+        """Time the body as pass `name`; the body fills in the counts of the yielded record."""
+
+        record = PassRecord(name)
+        self.passes.append(record)
+
+        blocks = sys.getallocatedblocks()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.seconds = time.perf_counter() - start
+            record.allocated_blocks = sys.getallocatedblocks() - blocks
+
+    def add(self, name: str, seconds: float, **counts) -> PassRecord:
+        """Record a pass that was timed elsewhere, e.g. a module import."""
+
+        record = PassRecord(name)
+        record.seconds = seconds
+        record.counts.update(counts)
+        self.passes.append(record)
+        return record
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(record.seconds for record in self.passes)
+
+    def as_dict(self) -> dict:
+        return {
+            'kind': self.kind,
+            'source': self.source,
+            'started': self.started,
+            'total_seconds': self.total_seconds,
+            'passes': [record.as_dict() for record in self.passes],
+        }
+
+
+class Instrumentation:
+    """Registry of profile sinks; a sink is any callable taking a finished Profile."""
+
+    sinks: List[Callable[[Profile], None]] = []
+    last_profiles: Dict[str, Profile] = {}
+
+    @classmethod
+    def add_sink(cls, sink: Callable[[Profile], None]):
+        if sink not in cls.sinks:
+            cls.sinks.append(sink)
+
+    @classmethod
+    def remove_sink(cls, sink: Callable[[Profile], None]):
+        if sink in cls.sinks:
+            cls.sinks.remove(sink)
+
+    @classmethod
+    def publish(cls, profile: Profile):
+        cls.last_profiles[profile.kind] = profile
+        for sink in list(cls.sinks):
+            try:
+                sink(profile)
+            except Exception as e:
+                log.warning("Profile sink %r failed: %s", sink, e)
+
+    @classmethod
+    def last(cls, kind: str):
+        return cls.last_profiles.get(kind)
+
+    @classmethod
+    @contextlib.contextmanager
+    def profile(cls, kind: str, source: str = ''):
+        """Collect a Profile over the body and publish it afterwards, also if the body failed."""
+
+        profile = Profile(kind, source)
+        try:
+            yield profile
+        finally:
+            cls.publish(profile)
+
+
+# Reported by print_profile with --profile-startup only
+STARTUP_KINDS = ('startup', 'panel')
+
+
+def log_summary(profile: Profile):
+    """Sink writing one line per pass to the io logger; startup profiles are left to print_profile."""
+
+    if profile.kind in STARTUP_KINDS:
+        return
+
+    log.info("%s %s: %.1f ms in %d passes", profile.kind, profile.source, profile.total_seconds * 1000,
+             len(profile.passes))
+    for record in profile.passes:
+        log.info("  %-20s %9.1f ms %+9d blocks %s", record.name, record.seconds * 1000, record.allocated_blocks,
+                 record.counts)
+
+
+def print_profile(profile: Profile, file=None):
+    """Sink printing a table of the passes, for --profile-startup."""
+
+    file = file or sys.stdout
+    total = profile.total_seconds
+    print(f"{profile.kind} {profile.source}: {total * 1000:.1f} ms", file=file)
+    for record in profile.passes:
+        share = record.seconds / total if total else 0.0
+        counts = " ".join(f"{name}={count}" for name, count in record.counts.items())
+        print(f"  {record.name:<42} {record.seconds * 1000:8.1f} ms {share:5.0%}  {counts}", file=file)
+
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+    """Times the imports made while installed (see `timing`), broken down by a package's modules.
+
+    Each module of the package gets its own time, without the modules it imports in turn; all
+    other imports (Qt, rdflib, the standard library) are summed up as one entry.
+    """
+
+    def __init__(self, package: str):
+        self.package = package
+        self.own_times: Dict[str, float] = {}  # package module -> seconds, excluding nested imports
+        self.total = 0.0
+        self._stack: List[list] = []  # [module, start, seconds spent in nested imports]
+
+    def find_spec(self, fullname, path=None, target=None):
+        # Let the other finders locate the module, then time its loader
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _TimedLoader(spec.loader, self)
+                return spec
+        return None
+
+    def enter(self, module: str):
+        self._stack.append([module, time.perf_counter(), 0.0])
+
+    def leave(self):
+        module, start, nested = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        if module == self.package or module.startswith(self.package + "."):
+            self.own_times[module] = self.own_times.get(module, 0.0) + elapsed - nested
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+    @contextlib.contextmanager
+    def timing(self):
+        sys.meta_path.insert(0, self)
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.total = time.perf_counter() - start
+            sys.meta_path.remove(self)
+
+    def record(self, profile: Profile):
+        """Add one pass per module, slowest first, and one for everything else imported meanwhile."""
+
+        for module, seconds in sorted(self.own_times.items(), key=lambda entry: -entry[1]):
+            profile.add(f"import {module}", seconds)
+        profile.add("import other packages", max(0.0, self.total - sum(self.own_times.values())))
+
+
+class _TimedLoader(importlib.abc.Loader):
+
+    def __init__(self, loader, timer: ImportTimer):
+        self.loader = loader
+        self.timer = timer
+
+    def create_module(self, spec):
+        # Extension modules (e.g. the Qt bindings) do most of their work here
+        self.timer.enter(spec.name)
+        try:
+            return self.loader.create_module(spec)
+        finally:
+            self.timer.leave()
+
+    def exec_module(self, module):
+        self.timer.enter(module.__name__)
+        try:
+            self.loader.exec_module(module)
+        finally:
+            self.timer.leave()
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
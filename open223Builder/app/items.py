@@ -19,8 +19,10 @@ from open223Builder.ontology.namespaces import (
 )
 
 from open223Builder.library import (
-    port_library, svg_library, medium_library, connection_library
+    port_library, svg_library, medium_library, connection_library, connection_point_library, property_library
 )
+from open223Builder.ontology.resolver import type_resolver
+from open223Builder.app.instrumentation import log
 
 from open223Builder.app.commands import *
 
@@ -32,7 +34,99 @@ def push_command_to_scene(scene, command: 'Command'):
     return None
 
 
+def _invalidates(method):
+    """Wrap a list mutator so it drops the cached type buckets of a Selection."""
+
+    def wrapper(self, *args, **kwargs):
+        self._buckets = None
+        return method(self, *args, **kwargs)
+
+    wrapper.__name__ = method.__name__
+    return wrapper
+
+
 class Selection(list):
+
+    # concrete item type -> names of the buckets it belongs to, filled lazily
+    _kinds: dict = {}
+
+    _MIXED = object()
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._buckets = None
+
+    append = _invalidates(list.append)
+    extend = _invalidates(list.extend)
+    insert = _invalidates(list.insert)
+    remove = _invalidates(list.remove)
+    pop = _invalidates(list.pop)
+    clear = _invalidates(list.clear)
+    sort = _invalidates(list.sort)
+    reverse = _invalidates(list.reverse)
+    __setitem__ = _invalidates(list.__setitem__)
+    __delitem__ = _invalidates(list.__delitem__)
+    __iadd__ = _invalidates(list.__iadd__)
+    __imul__ = _invalidates(list.__imul__)
+
+    @classmethod
+    def _kinds_of(cls, item_type) -> tuple:
+        kinds = cls._kinds.get(item_type)
+
+        if kinds is None:
+            kinds = tuple(name for name, base in (
+                ('connectable', ConnectableItem),
+                ('connection', Connection),
+                ('connection_point', ConnectionPoint),
+                ('system', SystemItem),
+                ('physical_space', PhysicalSpace),
+                ('domain_space', DomainSpace),
+                ('property', Property),
+            ) if issubclass(item_type, base))
+
+            if 'connectable' in kinds and 'domain_space' not in kinds and 'physical_space' not in kinds:
+                kinds += ('equipment',)
+
+            cls._kinds[item_type] = kinds
+
+        return kinds
+
+    def _bucket(self, name: str) -> 'Selection':
+        """Classify all members in one pass and return the (cached) bucket; callers must not modify it."""
+
+        if self._buckets is None:
+            buckets = {}
+            for item in self:
+                for kind in self._kinds_of(type(item)):
+                    bucket = buckets.get(kind)
+                    if bucket is None:
+                        bucket = buckets[kind] = Selection()
+                    list.append(bucket, item)
+            self._buckets = buckets
+
+        bucket = self._buckets.get(name)
+        if bucket is None:
+            bucket = self._buckets[name] = Selection()
+        return bucket
+
+    def _only(self, name: str) -> bool:
+        return len(self._bucket(name)) == len(self)
+
+    def common(self, attribute: str, default=None):
+        """Value of `attribute` shared by all members, or `default` if they differ.
+
+        Not cached: the members' attributes change under commands while the Selection lives on.
+        """
+
+        value = self._MIXED
+        for index, item in enumerate(self):
+            current = getattr(item, attribute, None)
+            if index == 0:
+                value = current
+            elif current != value:
+                return default
+        return default if value is self._MIXED else value
+
     @property
     def last(self):
         return self[0] if len(self) > 0 else None
@@ -43,55 +137,231 @@ class Selection(list):
 
     @property
     def getConnectable(self) -> 'Selection':
-        return Selection(item for item in self if isinstance(item, ConnectableItem))
+        return Selection(self._bucket('connectable'))
+
+    @property
+    def getEquipment(self) -> 'Selection':
+        """Connectables that are neither domain spaces nor physical spaces."""
+        return Selection(self._bucket('equipment'))
 
     @property
     def getConnection(self) -> 'Selection':
-        return Selection(item for item in self if isinstance(item, Connection))
+        return Selection(self._bucket('connection'))
 
     @property
     def getConnectionPoint(self) -> 'Selection':
-        return Selection(item for item in self if isinstance(item, ConnectionPoint))
+        return Selection(self._bucket('connection_point'))
 
     @property
     def getSystem(self) -> 'Selection':
-        return Selection(item for item in self if isinstance(item, SystemItem))
+        return Selection(self._bucket('system'))
 
     @property
     def getPhysicalSpace(self) -> 'Selection':
-        return Selection(item for item in self if isinstance(item, PhysicalSpace))
+        return Selection(self._bucket('physical_space'))
 
     @property
     def getDomainSpace(self) -> 'Selection':
-        return Selection(item for item in self if isinstance(item, DomainSpace))
+        return Selection(self._bucket('domain_space'))
 
     @property
     def getProperty(self) -> 'Selection':
-        return Selection(item for item in self if isinstance(item, Property))
+        return Selection(self._bucket('property'))
 
     @property
     def onlyConnectable(self) -> bool:
-        return all(isinstance(item, ConnectableItem) for item in self)
+        return self._only('connectable')
 
     @property
     def onlyConnection(self) -> bool:
-        return all(isinstance(item, Connection) for item in self)
+        return self._only('connection')
 
     @property
     def onlyConnectionPoint(self) -> bool:
-        return all(isinstance(item, ConnectionPoint) for item in self)
+        return self._only('connection_point')
+
+    @property
+    def onlySystem(self) -> bool:
+        return self._only('system')
 
     @property
     def onlyPhysicalSpace(self) -> bool:
-        return all(isinstance(item, PhysicalSpace) for item in self)
+        return self._only('physical_space')
 
     @property
     def onlyDomainSpace(self) -> bool:
-        return all(isinstance(item, DomainSpace) for item in self)
+        return self._only('domain_space')
 
     @property
     def onlyProperty(self) -> bool:
-        return all(isinstance(item, Property) for item in self)
+        return self._only('property')
+
+
+class SceneIndex:
+
+    """Typed index of the model items in a scene, kept current from the items' itemChange."""
+
+    def __init__(self):
+        self.revision = 0  # bumped on every add/discard, e.g. to invalidate caches built from the index
+        self.edits = 0  # bumped when indexed items move or rotate, see touch
+        self._all: dict = {}
+        self._kinds: dict = {}
+        self._by_uri: dict = {}
+
+    @classmethod
+    def from_items(cls, items) -> 'SceneIndex':
+        index = cls()
+        for item in items:
+            index.add(item)
+        return index
+
+    def __len__(self):
+        return len(self._all)
+
+    def __contains__(self, item):
+        return item in self._all
+
+    def add(self, item):
+        kinds = Selection._kinds_of(type(item))
+        if not kinds:
+            return
+
+        self._all[item] = None
+        for kind in kinds:
+            self._kinds.setdefault(kind, {})[item] = None
+
+        uri = getattr(item, 'inst_uri', None)
+        if uri is not None:
+            self._by_uri[uri] = item
+
+        self.revision += 1
+
+    def discard(self, item):
+        if self._all.pop(item, False) is False:
+            return
+
+        for kind in Selection._kinds_of(type(item)):
+            self._kinds.get(kind, {}).pop(item, None)
+
+        uri = getattr(item, 'inst_uri', None)
+        if self._by_uri.get(uri) is item:
+            del self._by_uri[uri]
+
+        self.revision += 1
+
+    def touch(self):
+        """Note a change of the model that leaves the indexed items as they are."""
+        self.edits += 1
+
+    def clear(self):
+        self._all.clear()
+        self._kinds.clear()
+        self._by_uri.clear()
+        self.revision += 1
+
+    def of(self, kind: str) -> Selection:
+        """All indexed items of a Selection bucket kind, e.g. 'physical_space' or 'equipment'."""
+        return Selection(self._kinds.get(kind, ()))
+
+    def by_uri(self, uri):
+        item = self._by_uri.get(uri)
+        if item is not None and item.inst_uri == uri:
+            return item
+        return None
+
+
+def scene_index(scene) -> SceneIndex:
+    """The scene's live index, or a one-off index for scenes that don't keep one."""
+
+    index = getattr(scene, 'item_index', None)
+    if index is None:
+        index = SceneIndex.from_items(scene.items())
+    return index
+
+
+def track_scene_membership(item, change, value):
+    """Called first thing in itemChange so the item's scene index follows it between scenes."""
+
+    if change == QGraphicsItem.ItemSceneChange:
+        index = getattr(item.scene(), 'item_index', None)
+        if index is not None:
+            index.discard(item)
+
+    elif change == QGraphicsItem.ItemSceneHasChanged:
+        index = getattr(value, 'item_index', None)
+        if index is not None:
+            index.add(item)
+
+    elif change == QGraphicsItem.ItemPositionHasChanged or change == QGraphicsItem.ItemRotationHasChanged:
+        index = getattr(item.scene(), 'item_index', None)
+        if index is not None:
+            index.touch()
+
+
+class ConnectionPointGrid:
+    """Grid hash of connection point centres in scene coordinates.
+
+    Points file themselves under their cell as they join, leave or move in the scene, so
+    hit-testing and snapping only look at the few cells around the cursor. Medium and
+    direction are read from the points when a query runs, so they never go stale.
+    """
+
+    def __init__(self, cell_size: float = 50.0):
+        self.cell_size = cell_size
+        self._cells: dict = {}  # (column, row) -> {point: (x, y)}
+        self._where: dict = {}  # point -> (column, row)
+
+    def __len__(self):
+        return len(self._where)
+
+    def __contains__(self, point):
+        return point in self._where
+
+    def _cell(self, x: float, y: float) -> tuple:
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def move(self, point):
+        """Insert `point` or update its position."""
+        center = point.scene_center()
+        x, y = center.x(), center.y()
+        cell = self._cell(x, y)
+
+        old_cell = self._where.get(point)
+        if old_cell is not None and old_cell != cell:
+            self._drop(point, old_cell)
+
+        self._cells.setdefault(cell, {})[point] = (x, y)
+        self._where[point] = cell
+
+    def discard(self, point):
+        cell = self._where.pop(point, None)
+        if cell is not None:
+            self._drop(point, cell)
+
+    def _drop(self, point, cell):
+        bucket = self._cells[cell]
+        del bucket[point]
+        if not bucket:
+            del self._cells[cell]
+
+    def clear(self):
+        self._cells.clear()
+        self._where.clear()
+
+    def nearest(self, scene_pos: QPointF, radius: float, accept=None):
+        """The closest point within `radius` of `scene_pos` for which `accept(point)` holds, or None."""
+        x, y = scene_pos.x(), scene_pos.y()
+        first_column, first_row = self._cell(x - radius, y - radius)
+        last_column, last_row = self._cell(x + radius, y + radius)
+
+        best, best_distance = None, radius * radius
+        for column in range(first_column, last_column + 1):
+            for row in range(first_row, last_row + 1):
+                for point, (px, py) in self._cells.get((column, row), {}).items():
+                    distance = (px - x) ** 2 + (py - y) ** 2
+                    if distance <= best_distance and (accept is None or accept(point)):
+                        best, best_distance = point, distance
+        return best
 
 
 class CanvasProperties:
@@ -114,6 +384,70 @@ class CanvasProperties:
         return QPointF(snapped_x, snapped_y)
 
 
+class ConnectionStyles:
+    """Shared pens and brushes for connections and connection points.
+
+    Pens are keyed by (medium, connection type, hovered) and brushes by medium, built from
+    medium_library and connection_library on first use. Change the palette at runtime with
+    set_medium_color, or call clear() after editing the libraries and restyle() the scene.
+    """
+
+    hover_extra_width = 2
+    fallback_color = (200, 200, 200)
+
+    _pens: dict = {}
+    _brushes: dict = {}
+
+    @classmethod
+    def color(cls, medium) -> QColor:
+        try:
+            color = medium_library[medium].get('color', cls.fallback_color)
+        except KeyError:
+            log.warning("Unknown medium %s, using default color", medium)
+            color = cls.fallback_color
+        return QColor(*color)
+
+    @classmethod
+    def pen(cls, medium, type_uri, hovered: bool = False) -> QPen:
+        key = (medium, type_uri, hovered)
+        pen = cls._pens.get(key)
+        if pen is None:
+            width = connection_library[type_uri].get('width')
+            if hovered:
+                width += cls.hover_extra_width
+            pen = cls._pens[key] = QPen(cls.color(medium), width)
+        return pen
+
+    @classmethod
+    def brush(cls, medium) -> QBrush:
+        brush = cls._brushes.get(medium)
+        if brush is None:
+            brush = cls._brushes[medium] = QBrush(cls.color(medium))
+        return brush
+
+    @classmethod
+    def clear(cls):
+        cls._pens.clear()
+        cls._brushes.clear()
+
+    @classmethod
+    def set_medium_color(cls, medium, color: tuple, scene=None):
+        medium_library.setdefault(medium, {})['color'] = tuple(color)
+        cls.clear()
+        if scene is not None:
+            cls.restyle(scene)
+
+    @classmethod
+    def restyle(cls, scene):
+        """Re-apply the current styles to every connection and connection point of `scene`."""
+        index = scene_index(scene)
+        with DeferredUpdates():
+            for point in index.of('connection_point'):
+                point.update_appearance()
+            for connection in index.of('connection'):
+                connection.update_pen()
+
+
 class PhysicalSpace(QGraphicsItem):
     HANDLE_SIZE = 10
     MIN_SIZE = 50
@@ -259,6 +593,7 @@ class PhysicalSpace(QGraphicsItem):
         return path
 
     def itemChange(self, change, value):
+        track_scene_membership(self, change, value)
         if change == QGraphicsItem.ItemPositionChange and self.scene() and not self.resizing:
             if CanvasProperties.enable_grid:
                 return CanvasProperties.snap_to_grid(value)
@@ -421,19 +756,15 @@ class Property(QGraphicsItem):
     hover_size = 12
     offset_scale = 15
 
-    allowed_types = [
-        S223.Property, S223.ObservableProperty, S223.ActuatableProperty,
-        S223.EnumerableProperty, S223.QuantifiableProperty,
-        S223.QuantifiableObservableProperty, S223.QuantifiableActuatableProperty,
-        S223.EnumeratedObservableProperty, S223.EnumeratedActuatableProperty,
-    ]
+    allowed_types = list(property_library)
 
     @classmethod
-    def new(cls, parent, prop_data) -> 'Property':
+    def new(cls, parent, prop_data, inst_uri: rdflib.URIRef = None) -> 'Property':
 
         property = Property(
             parent_item=parent,
             property_type=prop_data['property_type'],
+            inst_uri=inst_uri,
             identifier=prop_data['identifier'],
         )
 
@@ -443,15 +774,19 @@ class Property(QGraphicsItem):
         except KeyError:
             raise KeyError(prop_data)
 
-        prop_data.aspect = prop_data.get('aspect')
-        prop_data.external_reference = prop_data.get('external_reference', "")
-        prop_data.internal_reference = prop_data.get('internal_reference')
+        property.label = prop_data.get('label', "")
+        property.comment = prop_data.get('comment', "")
 
-        prop_data.unit = prop_data.get('unit')
-        prop_data.quantity_kind = prop_data.get('quantity_kind')
+        property.aspect = prop_data.get('aspect')
+        property.external_reference = prop_data.get('external_reference', "")
+        if prop_data.get('internal_reference'):
+            property.internal_reference = prop_data['internal_reference']
 
-        prop_data.value = prop_data.get('value', "")
-        prop_data.medium = prop_data.get('medium')
+        property.unit = prop_data.get('unit')
+        property.quantity_kind = prop_data.get('quantity_kind')
+
+        property.value = prop_data.get('value', "")
+        property.medium = prop_data.get('medium')
 
         return property
 
@@ -497,6 +832,9 @@ class Property(QGraphicsItem):
 
         self.initial_position: QPointF = QPointF(0, 0)
 
+        # Parented in the constructor, so no itemChange was delivered for joining the parent's scene
+        track_scene_membership(self, QGraphicsItem.ItemSceneHasChanged, self.scene())
+
     @property
     def property_type(self):
         return self._property_type
@@ -650,6 +988,7 @@ class Property(QGraphicsItem):
         painter.drawText(ellipse_rect, Qt.AlignCenter, self.identifier)
 
     def itemChange(self, change, value):
+        track_scene_membership(self, change, value)
 
         if change == QGraphicsItem.ItemPositionChange and self.scene() and self.parent_item:
             if CanvasProperties.enable_grid:
@@ -727,9 +1066,9 @@ class ConnectableItem(QGraphicsSvgItem):
 
         super().__init__()
 
-        svg_data = svg_library.get(self.type_uri)
+        svg_data = type_resolver.symbol_for(self.type_uri)
         if not svg_data:
-            print(f"Warning: No SVG data found for {self.type_uri}. Using fallback.")
+            log.warning("No SVG data found for %s, using the fallback symbol", self.type_uri)
 
             self.renderer = None
             self.width = 50
@@ -778,9 +1117,9 @@ class ConnectableItem(QGraphicsSvgItem):
             painter.drawText(rect, Qt.AlignCenter, self.label or to_label(self.type_uri))
 
     def load_default_connection_points(self):
-        print('Loading default connection points for', self.inst_uri)
+        log.debug("Loading default connection points for %s", self.inst_uri)
 
-        ports_data = port_library.get(self.type_uri, [])
+        ports_data = type_resolver.ports_for(self.type_uri)
 
         for cp in list(self.connection_points):
             self.remove_connection_point(cp)
@@ -893,6 +1232,7 @@ class ConnectableItem(QGraphicsSvgItem):
         return False
 
     def itemChange(self, change, value):
+        track_scene_membership(self, change, value)
         scene = self.scene()
 
         if change == QGraphicsItem.ItemPositionChange and scene and not getattr(self, 'resizing', False):
@@ -913,12 +1253,23 @@ class ConnectableItem(QGraphicsSvgItem):
 
             QTimer.singleShot(0, self.update_connection_points)
 
-            for sys_item in scene.items():
-                if isinstance(sys_item, SystemItem) and self in sys_item.members:
+            for sys_item in scene_index(scene).of('system'):
+                if self in sys_item.members:
                     QTimer.singleShot(0, sys_item.update_bounding_rect)
 
+        elif change == QGraphicsItem.ItemRotationHasChanged:
+            # Turning an item doesn't notify its connection points the way moving it does
+            self.connection_points_moved()
+
         return super().itemChange(change, value)
 
+    def connection_points_moved(self):
+        """Bring connections and the point grid up to date for this item's points and those it contains."""
+        for cp in self.connection_points:
+            cp.scene_position_changed()
+        for item in self.contained_items:
+            item.connection_points_moved()
+
     def remove(self, scene):
         """Removes the item, its children (contained items, CPs, properties), and cleans up."""
 
@@ -939,8 +1290,8 @@ class ConnectableItem(QGraphicsSvgItem):
         for connection_point in list(self.connection_points):
             connection_point.remove(scene)
 
-        for item in scene.items():
-            if isinstance(item, SystemItem) and self in item.members:
+        for item in scene_index(scene).of('system'):
+            if self in item.members:
                 item.remove_member(self)
 
         if self.scene():
@@ -1106,6 +1457,7 @@ class DomainSpace(ConnectableItem):
         super().hoverLeaveEvent(event)
 
     def itemChange(self, change, value):
+        track_scene_membership(self, change, value)
         if change == QGraphicsItem.ItemPositionChange and not self.resizing:
 
             return super().itemChange(change, value)
@@ -1134,11 +1486,10 @@ class DomainSpace(ConnectableItem):
 class ConnectionPoint(QGraphicsEllipseItem):
     default_size = 5
     hover_size = 7
-    allowed_types = [
-        S223.InletConnectionPoint,
-        S223.OutletConnectionPoint,
-        S223.BidirectionalConnectionPoint,
-    ]
+    snap_radius = 20  # how close a dragged connection has to come to a point to snap onto it
+    default_pen = QPen(Qt.black, 1)
+    highlight_pen = QPen(Qt.darkGreen, 2)
+    allowed_types = list(connection_point_library)
 
     def __init__(
             self,
@@ -1169,7 +1520,7 @@ class ConnectionPoint(QGraphicsEllipseItem):
             parent=connectable,
         )
 
-        self.setPen(QPen(Qt.black, 1))
+        self.setPen(self.default_pen)
         self.setBrush(QBrush(Qt.gray))
         self.setZValue(4)
         self.medium = medium
@@ -1178,9 +1529,14 @@ class ConnectionPoint(QGraphicsEllipseItem):
         self.setAcceptedMouseButtons(Qt.LeftButton)
         self.connected_to = None
         self.temp_connection = None
+        self.snap_target: Optional['ConnectionPoint'] = None
 
         connectable.add_connection_point(connection_point=self)
 
+        # Parented in the constructor, so no itemChange was delivered for joining the parent's scene
+        track_scene_membership(self, QGraphicsItem.ItemSceneHasChanged, self.scene())
+        self.update_grid()
+
     def __str__(self):
         return f"{self.__class__.__name__}(medium={self.medium}, pos_x={self.pos_x}, pos_y={self.pos_y})"
 
@@ -1229,16 +1585,31 @@ class ConnectionPoint(QGraphicsEllipseItem):
             self.default_size * 2,
             self.default_size * 2
         )
+        self.update_grid()
+
+    def scene_center(self) -> QPointF:
+        return self.mapToScene(QPointF(self.pos_x, self.pos_y))
+
+    def update_grid(self):
+        """Re-file this point in its scene's connection point grid."""
+        grid = getattr(self.scene(), 'connection_point_grid', None)
+        if grid is not None:
+            grid.move(self)
+
+    def scene_position_changed(self):
+        self.update_grid()
+        if self.connected_to is not None:
+            self.connected_to.update_path()
+
+    def set_highlighted(self, highlighted: bool):
+        self.setPen(self.highlight_pen if highlighted else self.default_pen)
+        self.setSize(self.hover_size if highlighted else self.default_size)
 
     def update_appearance(self):
-        try:
-            color = medium_library[self.medium].get('color')
-        except KeyError:
-            print(f'Did not find medium {self.medium} in medium_library')
-            color = (200, 200, 200)
-        medium_color = QColor(*color)
-        self.setBrush(QBrush(medium_color))
-        self.update()
+        if DeferredUpdates.defer(self, 'update_appearance'):
+            return
+
+        self.setBrush(ConnectionStyles.brush(self.medium))
 
     def setSize(self, radius: float):
         self.setRect(
@@ -1276,7 +1647,7 @@ class ConnectionPoint(QGraphicsEllipseItem):
     def mouseReleaseEvent(self, event):
         if event.button() == Qt.LeftButton and self.temp_connection:
             scene_pos = self.mapToScene(event.pos())
-            target = self.find_connection_point_at(scene_pos)
+            target = self.snap_target or self.find_connection_point_at(scene_pos)
 
             if target and target is not self:
                 self.finalize_connection(target)
@@ -1287,6 +1658,21 @@ class ConnectionPoint(QGraphicsEllipseItem):
         else:
             super().mouseReleaseEvent(event)
 
+    def itemChange(self, change, value):
+        track_scene_membership(self, change, value)
+
+        if change == QGraphicsItem.ItemSceneChange:
+            grid = getattr(self.scene(), 'connection_point_grid', None)
+            if grid is not None:
+                grid.discard(self)
+
+        # Sent whenever this point or any of its ancestors moves, so the connection and the
+        # grid follow the point without watching the parents
+        elif change in (QGraphicsItem.ItemSceneHasChanged, QGraphicsItem.ItemScenePositionHasChanged):
+            self.scene_position_changed()
+
+        return super().itemChange(change, value)
+
     def add_property(self, property_item: Property):
         """Add a property to this connection point."""
         if property_item not in self.properties:
@@ -1326,13 +1712,38 @@ class ConnectionPoint(QGraphicsEllipseItem):
 
     def update_temp_connection(self, scene_pos):
         if self.temp_connection:
-            start_pos = self.mapToScene(QPointF(self.pos_x, self.pos_y))
-            self.temp_connection.setLine(start_pos.x(), start_pos.y(), scene_pos.x(), scene_pos.y())
+            target = self.find_snap_target(scene_pos)
+            if target is not self.snap_target:
+                if self.snap_target is not None:
+                    self.snap_target.set_highlighted(False)
+                if target is not None:
+                    target.set_highlighted(True)
+                self.snap_target = target
+
+            # Magnetic: the line ends on the highlighted point rather than on the cursor
+            end_pos = target.scene_center() if target is not None else scene_pos
+            start_pos = self.scene_center()
+            self.temp_connection.setLine(start_pos.x(), start_pos.y(), end_pos.x(), end_pos.y())
+
+    def can_connect_to(self, target_point) -> bool:
+        return target_point is not self and target_point.connected_to is None and \
+            bool(self._connection_is_possible(target_point))
+
+    def find_snap_target(self, scene_pos):
+        """The nearest free, compatible point within snap_radius of `scene_pos`."""
+        grid = getattr(self.scene(), 'connection_point_grid', None)
+        if grid is None:
+            return None
+        return grid.nearest(scene_pos, self.snap_radius, self.can_connect_to)
 
     def find_connection_point_at(self, scene_pos):
         if not self.scene():
             return None
 
+        grid = getattr(self.scene(), 'connection_point_grid', None)
+        if grid is not None:
+            return grid.nearest(scene_pos, self.default_size, lambda point: point is not self)
+
         items = self.scene().items(scene_pos)
 
         for item in items:
@@ -1375,6 +1786,10 @@ class ConnectionPoint(QGraphicsEllipseItem):
         push_command_to_scene(scene, command)
 
     def cancel_connection(self):
+        if self.snap_target is not None:
+            self.snap_target.set_highlighted(False)
+            self.snap_target = None
+
         if self.temp_connection:
             self.scene().removeItem(self.temp_connection)
             self.temp_connection = None
@@ -1388,7 +1803,7 @@ class ConnectionPoint(QGraphicsEllipseItem):
 
 
 class Connection(QGraphicsPathItem):
-    allowed_types = [S223.Connection, S223.Pipe, S223.Duct, S223.Conductor]
+    allowed_types = list(connection_library)
 
     def __init__(
             self,
@@ -1408,6 +1823,8 @@ class Connection(QGraphicsPathItem):
         self.comment: str = ""
         self.source = source
         self.target = target
+        self.hovered = False
+        self._geometry = None  # endpoints and point types the current path was built from
 
         self.setFlag(QGraphicsItem.ItemIsSelectable)
         self.setZValue(1)
@@ -1429,34 +1846,44 @@ class Connection(QGraphicsPathItem):
     def medium(self, new_medium):
         self.source.medium = new_medium
         self.target.medium = new_medium
-        self.update_path()
+        self.update_pen()
 
-    def update_path(self, width: Optional[int] = None):
-        try:
-            color = medium_library[self.source.medium].get('color', None)
-        except KeyError:
-            print(f'Unknown medium {self.source.medium} using default color')
-            color = (200, 200, 200)
-        if width is None:
-            width = connection_library[self.type_uri].get('width')
+    def update_pen(self):
+        """Colour and width from medium, connection type and hover state; the geometry is left alone."""
+        if DeferredUpdates.defer(self, 'update_pen'):
+            return
+
+        self.setPen(ConnectionStyles.pen(self.source.medium, self.type_uri, self.hovered))
 
-        self.setPen(QPen(QColor(*color), width))
+    def update_path(self):
+        if DeferredUpdates.defer(self, 'update_path'):
+            return
+
+        self.update_pen()
 
         source_pos = self.source.mapToScene(QPointF(self.source.pos_x, self.source.pos_y))
         target_pos = self.target.mapToScene(QPointF(self.target.pos_x, self.target.pos_y))
 
+        # The path only depends on the endpoints and on which way the arrow points
+        geometry = (source_pos.x(), source_pos.y(), target_pos.x(), target_pos.y(),
+                    self.source.type_uri, self.target.type_uri)
+        if geometry == self._geometry:
+            return
+
         path = QPainterPath(source_pos)
         path.lineTo(target_pos)
 
         self._draw_arrow(path, source_pos, target_pos)
         self.setPath(path)
+        self._geometry = geometry
 
     def hoverEnterEvent(self, event):
-        width = connection_library[self.type_uri].get('width') + 2
-        self.update_path(width)
+        self.hovered = True
+        self.update_pen()
 
     def hoverLeaveEvent(self, event):
-        self.update_path()
+        self.hovered = False
+        self.update_pen()
 
     def _draw_arrow(self, path, source_pos, target_pos):
         source_is_outlet = self.source.type_uri == S223.OutletConnectionPoint
@@ -1510,21 +1937,9 @@ class Connection(QGraphicsPathItem):
         path.lineTo(arrow_point2)
 
     def itemChange(self, change, value):
-        if change == QGraphicsItem.ItemSceneHasChanged and self.scene():
-            for item in [self.source.parentItem(), self.target.parentItem()]:
-                if item:
-                    item.itemChange = self._monitor_parent_changes(item.itemChange)
+        track_scene_membership(self, change, value)
         return super().itemChange(change, value)
 
-    def _monitor_parent_changes(self, original_itemChange):
-        def wrapped_itemChange(change, value):
-            result = original_itemChange(change, value)
-            if change == QGraphicsItem.ItemPositionHasChanged:
-                self.update_path()
-            return result
-
-        return wrapped_itemChange
-
     def remove(self, scene):
         self.source.connected_to = None
         self.target.connected_to = None
@@ -1649,6 +2064,7 @@ class SystemItem(QGraphicsItem):
         painter.drawText(label_rect, Qt.AlignLeft | Qt.AlignVCenter, self.label)
 
     def itemChange(self, change, value):
+        track_scene_membership(self, change, value)
         if change == QGraphicsItem.ItemChildAddedChange or \
                 change == QGraphicsItem.ItemChildRemovedChange or \
                 change == QGraphicsItem.ItemSceneHasChanged:
@@ -0,0 +1,328 @@
+"""SPARQL console over the open model.
+
+Queries run on a worker thread against a snapshot: a copy of the scene's triples (see
+store.scene_graph) taken on the GUI thread, so the model can be edited while a query runs.
+The snapshot also carries an rdfs:subClassOf triple from each type in use to each of its
+superclasses, so `?x a/rdfs:subClassOf* s223:Valve` finds every kind of valve. Snapshots
+and results are kept until the model changes (see model_version); repeating a query is a
+dictionary lookup.
+
+rdflib cannot interrupt a running query, so the timeout is checked by the snapshot's store
+whenever the query engine reads triples from it.
+"""
+
+import time
+
+from collections import OrderedDict
+
+import rdflib
+
+from rdflib.plugins.stores.memory import Memory
+
+from PyQt5.QtCore import QThread, pyqtSignal
+from PyQt5.QtGui import QFont
+from PyQt5.QtWidgets import (
+    QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPlainTextEdit, QPushButton, QLabel, QDoubleSpinBox, QTableWidget,
+    QTableWidgetItem, QAbstractItemView, QHeaderView, QShortcut,
+)
+
+from open223Builder.ontology.namespaces import RDF, RDFS, bind_namespaces, to_label
+from open223Builder.ontology.resolver import type_resolver
+from open223Builder.app.store import scene_graph
+from open223Builder.app.items import *
+
+
+EXAMPLE_QUERY = """\
+# Valves on hot water circuits without a setpoint property
+SELECT DISTINCT ?valve WHERE {
+    ?valve a/rdfs:subClassOf* s223:Valve ;
+           s223:hasConnectionPoint/s223:hasMedium s223:Water-HotWater .
+    FILTER NOT EXISTS { ?valve s223:hasProperty/s223:hasAspect s223:Aspect-Setpoint }
+}
+"""
+
+
+class QueryTimeout(Exception):
+    pass
+
+
+class DeadlineStore(Memory):
+    """Memory store that raises QueryTimeout once `deadline` (time.monotonic) has passed."""
+
+    check_every = 1024  # triples yielded between clock checks
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.deadline = None
+
+    def _check(self):
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise QueryTimeout()
+
+    def triples(self, triple_pattern, context=None):
+        self._check()
+        for count, result in enumerate(super().triples(triple_pattern, context), 1):
+            if count % self.check_every == 0:
+                self._check()
+            yield result
+
+
+def model_version(scene) -> tuple:
+    """Changes whenever the model in `scene` does: items added or removed, moved, or edited by a command."""
+
+    index = scene.item_index
+    history = getattr(scene, 'command_history', None)
+    return index.revision, index.edits, history.revision if history is not None else 0
+
+
+def snapshot(scene) -> rdflib.Graph:
+    """Copy of the model in `scene`, plus rdfs:subClassOf triples from its types to all their superclasses."""
+
+    g = rdflib.Graph(store=DeadlineStore())
+    bind_namespaces(g)
+    g.addN((s, p, o, g) for s, p, o in scene_graph(scene))
+
+    # The ancestors are listed breadth-first, not as a chain, so only type -> ancestor edges are true
+    for type_uri in set(g.objects(None, RDF.type)):
+        for ancestor in type_resolver.ancestors(type_uri)[1:]:
+            g.add((type_uri, RDFS.subClassOf, ancestor))
+    return g
+
+
+class QueryResult:
+    """Column names and rows of a query result, read out completely on the worker thread."""
+
+    def __init__(self, columns: list, rows: list, seconds: float):
+        self.columns = columns
+        self.rows = rows
+        self.seconds = seconds
+
+    @classmethod
+    def of(cls, result, seconds: float) -> 'QueryResult':
+        if result.type == 'ASK':
+            return cls(['ask'], [(rdflib.Literal(result.askAnswer),)], seconds)
+        if result.type == 'SELECT':
+            return cls([str(var) for var in result.vars], [tuple(row) for row in result], seconds)
+        return cls(['subject', 'predicate', 'object'], list(result), seconds)  # CONSTRUCT / DESCRIBE
+
+    def uris(self, rows=None) -> list:
+        """The URIs in `rows` (default: all rows), in order and without repeats."""
+
+        rows = self.rows if rows is None else rows
+        return list(dict.fromkeys(node for row in rows for node in row if isinstance(node, rdflib.URIRef)))
+
+
+class QueryCache:
+    """The snapshot of the current model version and the results of queries run against it."""
+
+    def __init__(self, max_results: int = 64):
+        self.max_results = max_results
+        self.version = None
+        self.graph = None
+        self.results = OrderedDict()  # (version, query text) -> QueryResult, least recently used first
+
+    def snapshot(self, scene) -> tuple:
+        """(version, graph) of the model in `scene`; the copy is only made when the model has changed."""
+
+        version = model_version(scene)
+        if version != self.version:
+            self.version, self.graph = version, snapshot(scene)
+            self.results.clear()
+        return self.version, self.graph
+
+    def get(self, scene, query: str):
+        key = (model_version(scene), query.strip())
+        result = self.results.get(key)
+        if result is not None:
+            self.results.move_to_end(key)
+        return result
+
+    def put(self, version, query: str, result: QueryResult):
+        if version != self.version:
+            return  # the model changed while the query ran
+        self.results[(version, query.strip())] = result
+        while len(self.results) > self.max_results:
+            self.results.popitem(last=False)
+
+
+class QueryWorker(QThread):
+    """Runs one query against a snapshot; emits `done` with a QueryResult or `failed` with a message."""
+
+    done = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, graph: rdflib.Graph, query: str, timeout: float, parent=None):
+        super().__init__(parent)
+        self.graph = graph
+        self.query = query
+        self.timeout = timeout
+        self.cancelled = False
+
+    def cancel(self):
+        """Make the query give up the next time it reads from the snapshot."""
+
+        self.cancelled = True
+        self.graph.store.deadline = 0.0
+
+    def run(self):
+        store = self.graph.store
+        start = time.perf_counter()
+        store.deadline = 0.0 if self.cancelled else time.monotonic() + self.timeout
+        try:
+            result = QueryResult.of(self.graph.query(self.query), 0.0)
+            result.seconds = time.perf_counter() - start
+            self.done.emit(result)
+        except QueryTimeout:
+            self.failed.emit("Query cancelled" if self.cancelled else f"Query timed out after {self.timeout:g} s")
+        except Exception as e:
+            self.failed.emit(f"{type(e).__name__}: {e}")
+        finally:
+            store.deadline = None
+
+
+class QueryConsole(QWidget):
+    """Query editor and result table; matching items can be selected on the canvas."""
+
+    def __init__(self, canvas, parent=None):
+        super().__init__(parent)
+        self.canvas = canvas
+        self.cache = QueryCache()
+        self.worker = None
+        self.result = None
+
+        # A QThread must not be destroyed while it runs, and the timeout can be long
+        QApplication.instance().aboutToQuit.connect(self.stop)
+
+        self.editor = QPlainTextEdit()
+        self.editor.setPlainText(EXAMPLE_QUERY)
+        font = QFont("Monospace")
+        font.setStyleHint(QFont.TypeWriter)
+        self.editor.setFont(font)
+
+        self.run_button = QPushButton("Run")
+        self.run_button.setToolTip("Run the query (Ctrl+Return)")
+        self.run_button.clicked.connect(self.run_query)
+        QShortcut("Ctrl+Return", self.editor, activated=self.run_query)
+
+        self.timeout = QDoubleSpinBox()
+        self.timeout.setRange(0.5, 600)
+        self.timeout.setValue(10)
+        self.timeout.setSuffix(" s")
+        self.timeout.setToolTip("Timeout")
+
+        self.select_button = QPushButton("Select Matches")
+        self.select_button.setToolTip("Select the items of all result rows; double-click a row for its items only")
+        self.select_button.setEnabled(False)
+        self.select_button.clicked.connect(lambda: self.select_matches())
+
+        self.status = QLabel()
+
+        self.table = QTableWidget()
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.itemDoubleClicked.connect(lambda cell: self.select_matches([cell.row()]))
+
+        buttons = QHBoxLayout()
+        buttons.addWidget(self.run_button)
+        buttons.addWidget(self.timeout)
+        buttons.addWidget(self.select_button)
+        buttons.addWidget(self.status, 1)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.editor, 1)
+        layout.addLayout(buttons)
+        layout.addWidget(self.table, 2)
+
+    @property
+    def scene(self):
+        return self.canvas.scene
+
+    def run_query(self):
+        if self.worker is not None:
+            return  # one query at a time; the running one ends at its timeout at the latest
+
+        query = self.editor.toPlainText()
+        if not query.strip():
+            return
+
+        cached = self.cache.get(self.scene, query)
+        if cached is not None:
+            self._show(cached, "cached")
+            return
+
+        start = time.perf_counter()
+        version, graph = self.cache.snapshot(self.scene)
+        copied = time.perf_counter() - start
+
+        self.worker = QueryWorker(graph, query, self.timeout.value(), self)
+        self.worker.done.connect(lambda result: self._finished(version, query, result))
+        self.worker.failed.connect(self._failed)
+        self.worker.finished.connect(self._worker_finished)
+
+        self.run_button.setEnabled(False)
+        self.status.setText(f"Running on {len(graph)} triples (snapshot {copied * 1000:.0f} ms)...")
+        self.worker.start()
+
+    def stop(self):
+        """Cancel the running query, if any, and wait until its thread has ended."""
+
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker.wait()
+
+    def _worker_finished(self):
+        self.worker.deleteLater()
+        self.worker = None
+        self.run_button.setEnabled(True)
+
+    def _finished(self, version, query: str, result: QueryResult):
+        self.cache.put(version, query, result)
+        self._show(result, f"{result.seconds * 1000:.0f} ms")
+
+    def _failed(self, message: str):
+        self.status.setText(message)
+
+    def _show(self, result: QueryResult, timing: str):
+        self.result = result
+
+        self.table.setUpdatesEnabled(False)
+        try:
+            self.table.clear()
+            self.table.setColumnCount(len(result.columns))
+            self.table.setHorizontalHeaderLabels(result.columns)
+            self.table.setRowCount(len(result.rows))
+            for row, values in enumerate(result.rows):
+                for column, value in enumerate(values):
+                    if value is None:
+                        continue
+                    cell = QTableWidgetItem(to_label(value) if isinstance(value, rdflib.URIRef) else str(value))
+                    cell.setToolTip(str(value))
+                    self.table.setItem(row, column, cell)
+        finally:
+            self.table.setUpdatesEnabled(True)
+
+        matches = len(self.items_of(result.uris()))
+        self.select_button.setEnabled(matches > 0)
+        self.status.setText(f"{len(result.rows)} rows, {matches} items on the canvas ({timing})")
+
+    def items_of(self, uris) -> list:
+        index = self.scene.item_index
+        return [item for item in map(index.by_uri, uris) if item is not None]
+
+    def select_matches(self, rows=None) -> int:
+        """Select the canvas items of the given result rows (default: all) and scroll to them."""
+
+        if self.result is None:
+            return 0
+
+        items = self.items_of(self.result.uris(None if rows is None else [self.result.rows[row] for row in rows]))
+        selected = self.canvas.select_items(items, "{count} query matches selected")
+
+        if items:
+            bounds = items[0].sceneBoundingRect()
+            for item in items[1:]:
+                bounds = bounds.united(item.sceneBoundingRect())
+            self.canvas.ensureVisible(bounds)
+        return selected
@@ -0,0 +1,370 @@
+"""The model as RDF: the triples of the scene items, generated on demand.
+
+SceneTriples holds the rules that turn items into triples, one subject at a time; both
+items_to_graph (copy, paste, export) and SceneStore use them. SceneStore is a read-only
+rdflib Store over a scene, so the live model can be queried or serialized without first
+copying it into a Graph:
+
+    g = scene_graph(scene)
+    g.query("SELECT ?e WHERE { ?e a s223:Pump }")
+
+Lookups by subject go through a URI index and lookups by predicate only visit the kinds of
+items that can have it; the index is rebuilt when items join or leave the scene.
+"""
+
+from typing import Callable
+
+from rdflib import Literal, XSD
+from rdflib.graph import ModificationException
+from rdflib.store import Store
+from rdflib.plugins.stores.memory import Memory
+
+from open223Builder.ontology.namespaces import S223, VISU, QUDT, RDF, RDFS, bind_namespaces
+from open223Builder.app.items import *
+
+
+# Kinds of items (Selection buckets) whose triples can have the predicate as subject
+PREDICATE_KINDS = {
+    VISU.positionX: ('connectable', 'physical_space', 'property'),
+    VISU.positionY: ('connectable', 'physical_space', 'property'),
+    VISU.rotation: ('connectable',),
+    VISU.width: ('domain_space', 'physical_space'),
+    VISU.height: ('domain_space', 'physical_space'),
+    VISU.relativeX: ('connection_point',),
+    VISU.relativeY: ('connection_point',),
+    VISU.identifier: ('property',),
+    S223.contains: ('connectable', 'physical_space'),
+    S223.encloses: ('physical_space',),
+    S223.hasConnectionPoint: ('connectable',),
+    S223.hasProperty: ('connectable', 'connection_point'),
+    S223.hasObservationLocation: ('connectable',),
+    S223.hasPhysicalLocation: ('connectable',),
+    S223.isConnectionPointOf: ('connection_point',),
+    S223.connectsThrough: ('connection_point',),
+    S223.connectsAt: ('connection',),
+    S223.hasMember: ('system',),
+    S223.hasMedium: ('connection_point', 'property'),
+    S223.hasAspect: ('property',),
+    S223.hasExternalReference: ('property',),
+    S223.hasInternalReference: ('property',),
+    S223.hasValue: ('property',),
+    QUDT.hasUnit: ('property',),
+    QUDT.hasQuantityKind: ('property',),
+}
+
+# Predicates every kind of item can have
+COMMON_PREDICATES = (RDF.type, RDFS.label, RDFS.comment, S223.hasRole)
+
+ALL_KINDS = ('connectable', 'physical_space', 'connection', 'connection_point', 'system', 'property')
+
+
+class SceneTriples:
+    """Per-subject triples of the items in a SceneIndex, following the rules of the saved file.
+
+    Relationships are only generated when their target is part of the model (see `included`),
+    so a subset of a scene yields a self-contained graph. `report` receives the problems that
+    items_to_graph logs as warnings.
+    """
+
+    def __init__(self, index: SceneIndex, report: Callable[[str], None] = None):
+        self.index = index
+        self.report = report or (lambda message: None)
+
+        self._revision = None
+        self._subjects = {}  # URI -> item, including the connection points and properties of indexed items
+        self._kinds = {}  # kind -> [item]
+        self._included = set()
+        self._connections_at = {}  # connection point -> connections that are written
+
+    def _refresh(self):
+        """Rebuild the subject index if items joined or left since it was built."""
+
+        if self._revision == self.index.revision:
+            return
+        self._revision = self.index.revision
+
+        subjects, kinds = {}, {}
+
+        def add(item):
+            if item.inst_uri in subjects:
+                return
+            subjects[item.inst_uri] = item
+            for kind in Selection._kinds_of(type(item)):
+                kinds.setdefault(kind, []).append(item)
+
+        # Children of written items are written even if they are not indexed themselves
+        for item in list(self.index.of('connectable')) + list(self.index.of('connection_point')):
+            add(item)
+            for cp in getattr(item, 'connection_points', ()):
+                add(cp)
+                for prop in cp.properties:
+                    add(prop)
+            for prop in getattr(item, 'properties', ()):
+                add(prop)
+        for kind in ('physical_space', 'connection', 'system', 'property'):
+            for item in self.index.of(kind):
+                add(item)
+
+        self._subjects, self._kinds = subjects, kinds
+
+        self._included = {item.inst_uri for item in self.index.of('connectable')} | \
+                         {item.inst_uri for item in self.index.of('physical_space')} | \
+                         {item.inst_uri for item in self.index.of('connection')} | \
+                         {cp.inst_uri for item in self.index.of('connectable') for cp in item.connection_points}
+
+        self._connections_at = {}
+        for connection in self.index.of('connection'):
+            if self.is_written(connection):
+                self._connections_at.setdefault(connection.source, []).append(connection)
+                self._connections_at.setdefault(connection.target, []).append(connection)
+
+    def included(self, uri) -> bool:
+        """Whether relationships to `uri` are written."""
+        self._refresh()
+        return uri in self._included
+
+    def is_written(self, connection: Connection) -> bool:
+        """A connection is only written if both of its connection points are."""
+        return bool(connection.source and connection.target and connection.source.inst_uri in self._included
+                    and connection.target.inst_uri in self._included)
+
+    def item(self, uri):
+        """The item with subject `uri`, or None."""
+
+        self._refresh()
+        item = self._subjects.get(uri)
+        if item is not None and item.inst_uri != uri:
+            # The item was given a new URI since the index was built
+            self._revision = None
+            self._refresh()
+            item = self._subjects.get(uri)
+        return item
+
+    def items(self, kinds=ALL_KINDS) -> list:
+        """The subjects of the given kinds, each once."""
+
+        self._refresh()
+        if len(kinds) == 1:
+            return self._kinds.get(kinds[0], [])
+        return list({item: None for kind in kinds for item in self._kinds.get(kind, ())})
+
+    def triples_of(self, item) -> list:
+        """All (s, p, o) triples with `item` as subject, without duplicates."""
+
+        self._refresh()
+        kinds = Selection._kinds_of(type(item))
+        if 'connection' in kinds:
+            if not self.is_written(item):
+                self.report(f"Skipping Connection {item.inst_uri}: an end point is not part of the saved items.")
+                return []
+            pairs = self._common(item) + self._connection(item)
+        elif 'connection_point' in kinds:
+            pairs = self._connection_point(item)
+        elif 'property' in kinds:
+            pairs = self._property(item)
+        elif 'physical_space' in kinds:
+            pairs = self._common(item) + self._physical_space(item)
+        elif 'connectable' in kinds:
+            pairs = self._common(item) + self._connectable(item)
+        elif 'system' in kinds:
+            pairs = self._common(item) + self._system(item)
+        else:
+            return []
+
+        uri = item.inst_uri
+        return [(uri, p, o) for p, o in dict.fromkeys(pairs)]
+
+    # --- Rules, as (predicate, object) pairs of one subject ---
+
+    @staticmethod
+    def _common(item) -> list:
+        pairs = []
+        if getattr(item, 'label', None):
+            pairs.append((RDFS.label, Literal(item.label, datatype=XSD.string)))
+        if getattr(item, 'comment', None):
+            pairs.append((RDFS.comment, Literal(item.comment, datatype=XSD.string)))
+        if getattr(item, 'role', None):
+            pairs.append((S223.hasRole, item.role))
+        if getattr(item, 'type_uri', None):
+            pairs.append((RDF.type, item.type_uri))
+        elif isinstance(item, PhysicalSpace):
+            pairs.append((RDF.type, S223.PhysicalSpace))
+        elif isinstance(item, SystemItem):
+            pairs.append((RDF.type, S223.System))
+        return pairs
+
+    def _connectable(self, item: ConnectableItem) -> list:
+        pairs = [
+            (VISU.positionX, Literal(item.x(), datatype=XSD.float)),
+            (VISU.positionY, Literal(item.y(), datatype=XSD.float)),
+            (VISU.rotation, Literal(item.rotation(), datatype=XSD.integer)),
+        ]
+        if isinstance(item, DomainSpace):
+            pairs.append((VISU.width, Literal(item.width, datatype=XSD.float)))
+            pairs.append((VISU.height, Literal(item.height, datatype=XSD.float)))
+
+        for contained in item.contained_items:
+            if isinstance(contained, ConnectableItem) and not isinstance(contained, (DomainSpace, PhysicalSpace)) \
+                    and contained.inst_uri in self._included:
+                pairs.append((S223.contains, contained.inst_uri))
+
+        for cp in item.connection_points:
+            pairs.append((S223.hasConnectionPoint, cp.inst_uri))
+        for prop in item.properties:
+            pairs.append((S223.hasProperty, prop.inst_uri))
+
+        if item.observation_location_uri:
+            if item.observation_location_uri in self._included:
+                pairs.append((S223.hasObservationLocation, item.observation_location_uri))
+            else:
+                self.report(f"Observation location target {item.observation_location_uri} for {item.inst_uri} "
+                            f"not found in scene. Relationship not saved.")
+
+        if item.physical_location_uri and item.physical_location_uri in self._included:
+            pairs.append((S223.hasPhysicalLocation, item.physical_location_uri))
+        return pairs
+
+    def _physical_space(self, item: PhysicalSpace) -> list:
+        pairs = [
+            (VISU.positionX, Literal(item.x(), datatype=XSD.float)),
+            (VISU.positionY, Literal(item.y(), datatype=XSD.float)),
+            (VISU.width, Literal(item.width, datatype=XSD.float)),
+            (VISU.height, Literal(item.height, datatype=XSD.float)),
+        ]
+        for contained in item.contained_items:
+            if isinstance(contained, PhysicalSpace) and contained.inst_uri in self._included:
+                pairs.append((S223.contains, contained.inst_uri))
+        for domain_space_uri in item.enclosed_domain_spaces:
+            if domain_space_uri in self._included:
+                pairs.append((S223.encloses, domain_space_uri))
+        return pairs
+
+    @staticmethod
+    def _connection(item: Connection) -> list:
+        return [(S223.connectsAt, item.source.inst_uri), (S223.connectsAt, item.target.inst_uri)]
+
+    def _system(self, item: SystemItem) -> list:
+        pairs = []
+        for member in item.members:
+            if isinstance(member, ConnectableItem) and not isinstance(member, (DomainSpace, PhysicalSpace)):
+                if member.inst_uri in self._included:
+                    pairs.append((S223.hasMember, member.inst_uri))
+            else:
+                self.report(f"System {item.inst_uri} contains invalid member type {type(member)} "
+                            f"({member.inst_uri}). Link not saved.")
+        return pairs
+
+    def _connection_point(self, cp: ConnectionPoint) -> list:
+        pairs = [(RDF.type, cp.type_uri)] + self._common(cp)
+        if cp.connectable:
+            pairs.append((S223.isConnectionPointOf, cp.connectable.inst_uri))
+        if cp.medium:
+            pairs.append((S223.hasMedium, cp.medium))
+        pairs.append((VISU.relativeX, Literal(cp.relative_x, datatype=XSD.float)))
+        pairs.append((VISU.relativeY, Literal(cp.relative_y, datatype=XSD.float)))
+        for prop in cp.properties:
+            pairs.append((S223.hasProperty, prop.inst_uri))
+        for connection in self._connections_at.get(cp, ()):
+            pairs.append((S223.connectsThrough, connection.inst_uri))
+        return pairs
+
+    def _property(self, prop: Property) -> list:
+        pairs = [(RDF.type, prop.property_type)] + self._common(prop) + [
+            (VISU.positionX, Literal(prop.x(), datatype=XSD.float)),
+            (VISU.positionY, Literal(prop.y(), datatype=XSD.float)),
+            (VISU.identifier, Literal(prop.identifier, datatype=XSD.string)),
+        ]
+        if prop.aspect:
+            pairs.append((S223.hasAspect, prop.aspect))
+        if prop.external_reference:
+            pairs.append((S223.hasExternalReference, Literal(prop.external_reference, datatype=XSD.string)))
+        if prop.internal_reference:
+            pairs.append((S223.hasInternalReference, Literal(prop.internal_reference, datatype=XSD.string)))
+        if prop.value:
+            pairs.append((S223.hasValue, Literal(prop.value, datatype=XSD.float)))
+        if prop.medium:
+            pairs.append((S223.hasMedium, rdflib.URIRef(prop.medium)))
+        if prop.unit:
+            pairs.append((QUDT.hasUnit, rdflib.URIRef(prop.unit)))
+        if prop.quantity_kind:
+            pairs.append((QUDT.hasQuantityKind, rdflib.URIRef(prop.quantity_kind)))
+        return pairs
+
+
+class SceneStore(Store):
+    """Read-only rdflib Store presenting the items of a scene index as triples, generated on demand."""
+
+    context_aware = False
+    formula_aware = False
+    transaction_aware = False
+    graph_aware = False
+
+    def __init__(self, index: SceneIndex, report: Callable[[str], None] = None):
+        super().__init__()
+        self.rules = SceneTriples(index, report)
+        self._namespaces = Memory()  # prefix bindings only
+        self.scanned = None  # triples yielded by the last complete (None, None, None) scan, see triples
+
+    def _candidates(self, subject, predicate) -> list:
+        if subject is not None:
+            item = self.rules.item(subject)
+            return [] if item is None else [item]
+        if predicate is None or predicate in COMMON_PREDICATES:
+            return self.rules.items()
+        kinds = PREDICATE_KINDS.get(predicate)
+        return self.rules.items(kinds) if kinds else []
+
+    def triples(self, triple_pattern, context=None):
+        subject, predicate, obj = triple_pattern
+        if subject is None and predicate is None and obj is None:
+            yield from self._scan()
+            return
+
+        for item in self._candidates(subject, predicate):
+            for triple in self.rules.triples_of(item):
+                if (predicate is None or triple[1] == predicate) and (obj is None or triple[2] == obj):
+                    yield triple, iter(())
+
+    def _scan(self):
+        # Counted on the way, so e.g. a serializer's size is known without generating everything again
+        count = 0
+        for item in self.rules.items():
+            for triple in self.rules.triples_of(item):
+                count += 1
+                yield triple, iter(())
+        self.scanned = count
+
+    def __len__(self, context=None) -> int:
+        return sum(len(self.rules.triples_of(item)) for item in self.rules.items())
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    def add(self, triple, context=None, quoted=False):
+        raise ModificationException()
+
+    def addN(self, quads):
+        raise ModificationException()
+
+    def remove(self, triple, context=None):
+        raise ModificationException()
+
+    def bind(self, prefix, namespace, override=True):
+        self._namespaces.bind(prefix, namespace, override=override)
+
+    def namespace(self, prefix):
+        return self._namespaces.namespace(prefix)
+
+    def prefix(self, namespace):
+        return self._namespaces.prefix(namespace)
+
+    def namespaces(self):
+        return self._namespaces.namespaces()
+
+
+def scene_graph(scene) -> rdflib.Graph:
+    """A read-only Graph over the live model in `scene`; it reflects later edits without being rebuilt."""
+
+    g = rdflib.Graph(store=SceneStore(scene_index(scene)))
+    bind_namespaces(g)
+    return g
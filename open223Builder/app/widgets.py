@@ -2,9 +2,9 @@ from PyQt5.QtWidgets import (
     QFormLayout, QLabel, QLineEdit, QPushButton, QComboBox, QDialog, QDoubleSpinBox,
 )
 
-import open223Builder.enumerations as enums
 from open223Builder.library import connection_point_library
-from open223Builder.app.dialogs import RelationshipDialog, AddPropertyDialog, AddConnectionPointDialog
+from open223Builder.ontology.vocabulary import vocabulary
+from open223Builder.app.dialogs import RelationshipDialog, AddPropertyDialog, AddConnectionPointDialog, VocabularyComboBox
 from open223Builder.app.items import *
 
 
@@ -40,6 +40,17 @@ class BasePropertyPanel(QFormLayout):
         command = ChangeAttributeCommand(self.selected_items, 'comment', new_comment)
         push_command_to_scene(scene, command)
 
+    @staticmethod
+    def _select_common(combo: QComboBox, items: Selection, attribute: str, fallback: int = -1):
+        """Point the combo box at the value all items share, or at `fallback` if they differ."""
+
+        value = items.common(attribute)
+        index = combo.findData(str(value)) if value is not None else -1
+
+        combo.blockSignals(True)
+        combo.setCurrentIndex(index if index != -1 else fallback)
+        combo.blockSignals(False)
+
     def _hide(self):
         for i in range(self.rowCount()):
             row_widget = self.itemAt(i, QFormLayout.SpanningRole)
@@ -105,10 +116,7 @@ class ConnectableProperties(BasePropertyPanel):
 
     def update_properties(self, selection: Selection):
 
-        equipment_selection = Selection([
-            item for item in selection.getConnectable
-            if not isinstance(item, (DomainSpace, PhysicalSpace))
-        ])
+        equipment_selection = selection.getEquipment
 
         if equipment_selection.isEmpty:
             self._hide()
@@ -160,9 +168,7 @@ class ConnectableProperties(BasePropertyPanel):
         self.label.clear();
         self.label.setPlaceholderText("Multiselection")
 
-        self.role.blockSignals(True);
-        self.role.setCurrentIndex(0);
-        self.role.blockSignals(False)
+        self._select_common(self.role, items, 'role', fallback=0)
         self.role.setEnabled(True)
 
         self.add_connection_button.setEnabled(False)
@@ -210,10 +216,7 @@ class ConnectableProperties(BasePropertyPanel):
         self._setup_role_selector()
 
     def _setup_role_selector(self):
-        self.role = QComboBox()
-        self.role.addItem("Please select role", userData=None)
-        for role_uri in enums.roles:
-            self.role.addItem(to_label(role_uri), userData=str(role_uri))
+        self.role = VocabularyComboBox("Please select role", vocabulary.roles)
         self.role.currentIndexChanged.connect(self._on_role_changed)
         self.addRow(QLabel("<b>s223.hasRole:</b>"), self.role)
 
@@ -317,10 +320,7 @@ class PropertyProperties(BasePropertyPanel):
         self.identifier.editingFinished.connect(self.on_identifier_changed)
         self.addRow(QLabel("<b>Identifier (Letter):</b>"), self.identifier)
 
-        self.aspect = QComboBox()
-        self.aspect.addItem("Select aspect", userData=None)
-        for aspect_uri in enums.aspects:
-            self.aspect.addItem(to_label(aspect_uri), userData=str(aspect_uri))
+        self.aspect = VocabularyComboBox("Select aspect", vocabulary.aspects)
         self.aspect.currentIndexChanged.connect(self.on_aspect_changed)
         self.addRow(QLabel("<b>Aspect:</b>"), self.aspect)
 
@@ -331,17 +331,11 @@ class PropertyProperties(BasePropertyPanel):
         self.medium.currentIndexChanged.connect(self.on_medium_changed)
         self.addRow(QLabel("<b>Medium:</b>"), self.medium)
 
-        self.unit = QComboBox()
-        self.unit.addItem("Select Unit", userData=None)
-        for unit_uri in enums.units:
-            self.unit.addItem(to_label(unit_uri), userData=str(unit_uri))
+        self.unit = VocabularyComboBox("Select Unit", vocabulary.units)
         self.unit.currentIndexChanged.connect(self.on_unit_changed)
         self.addRow(QLabel("<b>QUDT Unit:</b>"), self.unit)
 
-        self.quantity_kind = QComboBox()
-        self.quantity_kind.addItem("Select Quantity Kind", userData=None)
-        for qk_uri in enums.quantity_kinds:
-            self.quantity_kind.addItem(to_label(qk_uri), userData=str(qk_uri))
+        self.quantity_kind = VocabularyComboBox("Select Quantity Kind", vocabulary.quantity_kinds)
         self.quantity_kind.currentIndexChanged.connect(self.on_quantity_kind_changed)
         self.addRow(QLabel("<b>QUDT Quantity Kind:</b>"), self.quantity_kind)
 
@@ -405,6 +399,7 @@ class PropertyProperties(BasePropertyPanel):
         self.medium.setEnabled(True)
         self.medium.blockSignals(False)
 
+        self._offer_units(item.quantity_kind, item.unit)
         self.unit.blockSignals(True)
         index = self.unit.findData(str(item.unit))
         self.unit.setCurrentIndex(index if index != -1 else 0)
@@ -432,34 +427,25 @@ class PropertyProperties(BasePropertyPanel):
         self.comment.setText("")
         self.comment.setPlaceholderText("Multiselection")
 
-        self.property_type.blockSignals(True)
-        self.property_type.setCurrentIndex(-1)
+        self._select_common(self.property_type, items, 'property_type')
         self.property_type.setEnabled(True)
-        self.property_type.blockSignals(False)
 
         self.identifier.setText("")
         self.identifier.setPlaceholderText("Multi")
         self.identifier.setEnabled(True)
 
-        self.aspect.blockSignals(True)
-        self.aspect.setCurrentIndex(-1)
+        self._select_common(self.aspect, items, 'aspect')
         self.aspect.setEnabled(True)
-        self.aspect.blockSignals(False)
 
-        self.medium.blockSignals(True)
-        self.medium.setCurrentIndex(-1)
+        self._select_common(self.medium, items, 'medium')
         self.medium.setEnabled(True)
-        self.medium.blockSignals(False)
 
-        self.unit.blockSignals(True)
-        self.unit.setCurrentIndex(-1)
+        self._offer_units(items.common('quantity_kind'), items.common('unit'))
+        self._select_common(self.unit, items, 'unit')
         self.unit.setEnabled(True)
-        self.unit.blockSignals(False)
 
-        self.quantity_kind.blockSignals(True)
-        self.quantity_kind.setCurrentIndex(-1)
+        self._select_common(self.quantity_kind, items, 'quantity_kind')
         self.quantity_kind.setEnabled(True)
-        self.quantity_kind.blockSignals(False)
 
         self.external_reference.setText("")
         self.external_reference.setPlaceholderText("Multiselection")
@@ -487,6 +473,17 @@ class PropertyProperties(BasePropertyPanel):
         command = ChangeAttributeCommand(self.selected_items, 'quantity_kind', rdflib.URIRef(new_qk))
         push_command_to_scene(scene, command)
 
+        unit = self.unit.currentData()
+        self._offer_units(rdflib.URIRef(new_qk), unit and rdflib.URIRef(unit))
+
+    def _offer_units(self, quantity_kind, unit=None):
+        """Offer the units that measure `quantity_kind`, plus `unit` so an incompatible value still shows."""
+
+        units = vocabulary.units_for(quantity_kind)
+        if unit is not None and unit not in units:
+            units = [*units, unit]
+        self.unit.set_uris(units)
+
     def on_property_type_changed(self, index):
 
         if not self.selected_items:
@@ -571,10 +568,7 @@ class DomainSpaceProperties(BasePropertyPanel):
         self.height_spin.valueChanged.connect(self._on_size_changed)
         self.addRow(QLabel("<b>Height:</b>"), self.height_spin)
 
-        self.domain = QComboBox()
-        self.domain.addItem("Please select domain", userData=None)
-        for domain_uri in enums.domains:
-            self.domain.addItem(to_label(domain_uri), userData=str(domain_uri))
+        self.domain = VocabularyComboBox("Please select domain", vocabulary.domains)
         self.domain.currentIndexChanged.connect(self._on_domain_changed)
         self.addRow(QLabel("<b>s223.hasDomain:</b>"), self.domain)
 
@@ -633,10 +627,8 @@ class DomainSpaceProperties(BasePropertyPanel):
         self.height_spin.setEnabled(False)
         self.height_spin.blockSignals(False)
 
-        self.domain.blockSignals(True)
-        self.domain.setCurrentIndex(-1)
+        self._select_common(self.domain, items, 'role')
         self.domain.setEnabled(True)
-        self.domain.blockSignals(False)
 
     def _on_size_changed(self):
 
@@ -760,13 +752,8 @@ class ConnectionProperties(BasePropertyPanel):
         self.source_uri.setText("Multiselection")
         self.target_uri.setText("Multiselection")
 
-        self.type_uri.blockSignals(True)
-        self.type_uri.setCurrentIndex(-1)
-        self.type_uri.blockSignals(False)
-
-        self.medium.blockSignals(True)
-        self.medium.setCurrentIndex(-1)
-        self.medium.blockSignals(False)
+        self._select_common(self.type_uri, connections, 'type_uri')
+        self._select_common(self.medium, connections, 'medium')
 
 
 class ConnectionPointProperties(BasePropertyPanel):
@@ -879,14 +866,10 @@ class ConnectionPointProperties(BasePropertyPanel):
         self.comment.setText("")
         self.comment.setPlaceholderText("Multiselection")
 
-        self.type_uri.blockSignals(True)
-        self.type_uri.setCurrentIndex(-1)
-        self.type_uri.blockSignals(False)
+        self._select_common(self.type_uri, connection_points, 'type_uri')
         self.type_uri.setDisabled(False)
 
-        self.medium.blockSignals(True)
-        self.medium.setCurrentIndex(-1)
-        self.medium.blockSignals(False)
+        self._select_common(self.medium, connection_points, 'medium')
         self.medium.setDisabled(False)
 
         self.position_x.blockSignals(True)
@@ -1018,17 +1001,14 @@ class SystemProperties(BasePropertyPanel):
         self.member_count = QLabel("0")
         self.addRow(QLabel("<b>s223:hasMember (Count):</b>"), self.member_count)
 
-        self.role = QComboBox()
-        self.role.addItem("Please select role", userData=None)
-        for role_uri in enums.roles:
-            self.role.addItem(to_label(role_uri), userData=str(role_uri))
+        self.role = VocabularyComboBox("Please select role", vocabulary.roles)
         self.role.currentIndexChanged.connect(self._on_role_changed)
         self.addRow(QLabel("<b>s223.hasDomain:</b>"), self.role)
 
         self._hide()
 
     def update_properties(self, selection: Selection):
-        if selection.isEmpty or not all(isinstance(item, SystemItem) for item in selection):
+        if selection.isEmpty or not selection.onlySystem:
             self._hide()
             self.selected_items = []
             return
@@ -1109,10 +1089,7 @@ class PhysicalSpaceProperties(BasePropertyPanel):
         self.contained_count = QLabel("0")
         self.addRow(QLabel("<b>s223:contains (Count):</b>"), self.contained_count)
 
-        self.role = QComboBox()
-        self.role.addItem("Please select role", userData=None)
-        for role_uri in enums.roles:
-            self.role.addItem(to_label(role_uri), userData=str(role_uri))
+        self.role = VocabularyComboBox("Please select role", vocabulary.roles)
         self.role.currentIndexChanged.connect(self._on_role_changed)
         self.addRow(QLabel("<b>s223.hasRole:</b>"), self.role)
 
@@ -1184,10 +1161,8 @@ class PhysicalSpaceProperties(BasePropertyPanel):
         self.height_spin.setEnabled(False)
         self.height_spin.blockSignals(False)
 
-        self.role.blockSignals(True)
-        self.role.setCurrentIndex(0)
+        self._select_common(self.role, items, 'role', fallback=0)
         self.role.setEnabled(True)
-        self.role.blockSignals(False)
 
         self.manage_relationships_btn.setEnabled(False)
 
@@ -1,12 +1,13 @@
 import os
-import traceback
+import time
+import logging
 
 from typing import  Dict
 from rdflib import Literal
 
 from PyQt5.QtWidgets import (
     QGraphicsItem, QGraphicsEllipseItem, QGraphicsPathItem, QGraphicsScene, QGraphicsView,
-    QGraphicsLineItem, QGraphicsRectItem, QTreeWidgetItem, QWidget, QTreeWidget, QFormLayout,
+    QGraphicsLineItem, QGraphicsRectItem, QTreeWidgetItem, QTreeWidgetItemIterator, QWidget, QTreeWidget, QFormLayout,
     QLabel, QLineEdit, QPushButton, QVBoxLayout, QHBoxLayout, QComboBox, QMainWindow, QDockWidget,
     QApplication, QDialog, QDoubleSpinBox, QMessageBox, QTabWidget, QStyle, QMenu, QFileDialog,
 )
@@ -14,18 +15,29 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtGui import (
     QPixmap, QDrag, QDragMoveEvent, QDragEnterEvent
 )
+from PyQt5.QtCore import QEvent
 
 from open223Builder.ontology.namespaces import (
-    S223, VISU, BLDG, RDF, RDFS, QUDT, QUDTQK
+    S223, VISU, BLDG, RDF, RDFS, QUDT, QUDTQK, UriAllocator, default_allocator, split_uri, to_labels,
 )
 
 from open223Builder.library import connectable_library
-
-from open223Builder.app.dialogs import RelationshipDialog, AddPropertyDialog, AddConnectionPointDialog
+from open223Builder.enumerations import corrected
+from open223Builder.ontology.vocabulary import vocabulary
+
+from open223Builder.app.dialogs import RelationshipDialog, AddPropertyDialog, AddConnectionPointDialog, ProfileDialog
+from open223Builder.app.instrumentation import Instrumentation, Profile, log
+from open223Builder.app.hud import CanvasHud
+from open223Builder.app.store import SceneTriples, SceneStore
+from open223Builder.app.query import QueryConsole
 import open223Builder.app.widgets as properties
 from open223Builder.app.items import *
 
 
+# MIME type of the Turtle payload that copy puts on the system clipboard
+CLIPBOARD_MIME_TYPE = "application/x-open223-turtle"
+
+
 def popup(window_title: str, text: str):
     msg = QMessageBox()
     msg.setWindowTitle(window_title)
@@ -49,8 +61,7 @@ def find_status_bar(item):
         return find_status_bar(item.parent())
 
 
-def save_to_turtle(scene: QGraphicsScene, filepath: str):
-    g = rdflib.Graph()
+def bind_graph_namespaces(g: rdflib.Graph):
     g.bind("s223", S223)
     g.bind("visu", VISU)
     g.bind("bldg", BLDG)
@@ -59,282 +70,149 @@ def save_to_turtle(scene: QGraphicsScene, filepath: str):
     g.bind("qudt", QUDT)  # Bind QUDT namespace
     g.bind("qudtqk", QUDTQK)  # Bind QuantityKind if used explicitly
 
-    processed_uris = set()  # Keep track of URIs whose details have been fully saved
 
-    def add_common_properties(item_uri, item):
+def items_to_graph(items, g: rdflib.Graph = None, profile: Profile = None) -> rdflib.Graph:
+    """Serialize the given scene items (with their connection points and properties) into a graph.
 
-        if hasattr(item, "label") and item.label:
-            g.add((item_uri, RDFS.label, Literal(item.label, datatype=rdflib.XSD.string)))
-        if hasattr(item, "comment") and item.comment:
-            g.add((item_uri, RDFS.comment, Literal(item.comment, datatype=rdflib.XSD.string)))
-        if hasattr(item, "role") and item.role:
-            g.add((item_uri, S223.hasRole, item.role))
-        # Add type triple here as well for consistency
-        if hasattr(item, "type_uri") and item.type_uri:
-            g.add((item_uri, RDF.type, item.type_uri))
-        elif isinstance(item, PhysicalSpace):
-            g.add((item_uri, RDF.type, S223.PhysicalSpace))
-        elif isinstance(item, SystemItem):
-            g.add((item_uri, RDF.type, S223.System))
-
-    def save_property_details(prop: Property):
-        prop_uri = prop.inst_uri
-        if prop_uri in processed_uris:
-            return  # Already processed
-
-        g.add((prop_uri, RDF.type, prop.property_type))  # Ensure type is saved
-        add_common_properties(prop_uri, prop)
-
-        # Add Property-specific details
-        g.add((prop_uri, VISU.positionX, Literal(prop.x(), datatype=rdflib.XSD.float)))
-        g.add((prop_uri, VISU.positionY, Literal(prop.y(), datatype=rdflib.XSD.float)))
-        g.add((prop_uri, VISU.identifier, Literal(prop.identifier, datatype=rdflib.XSD.string)))
-
-        if prop.aspect:
-            g.add((prop_uri, S223.hasAspect, prop.aspect))
-        if prop.external_reference:
-            g.add((prop_uri, S223.hasExternalReference, Literal(prop.external_reference, datatype=rdflib.XSD.string)))
-        if prop.internal_reference:
-            g.add((prop_uri, S223.hasInternalReference, Literal(prop.internal_reference, datatype=rdflib.XSD.string)))
-        if prop.value:
-            g.add((prop_uri, S223.hasValue, Literal(prop.value, datatype=rdflib.XSD.float)))
-        if prop.medium:
-            g.add((prop_uri, S223.hasMedium, rdflib.URIRef(prop.medium)))
-        if prop.unit:
-            g.add((prop_uri, QUDT.hasUnit, rdflib.URIRef(prop.unit)))
-        if prop.quantity_kind:
-            g.add((prop_uri, QUDT.hasQuantityKind, rdflib.URIRef(prop.quantity_kind)))
-
-        processed_uris.add(prop_uri)
-
-    def save_connection_point_details(cp: ConnectionPoint):
-        cp_uri = cp.inst_uri
-        if cp_uri in processed_uris:
-            return  # Already processed
-
-        g.add((cp_uri, RDF.type, cp.type_uri))  # Ensure type is saved
-        add_common_properties(cp_uri, cp)  # Save label, comment, role if they exist
-
-        # Link back to parent (ConnectableItem) - Essential relationship
-        if cp.connectable:
-            g.add((cp_uri, S223.isConnectionPointOf, cp.connectable.inst_uri))
-
-        # Add ConnectionPoint-specific details
-        if cp.medium:
-            g.add((cp_uri, S223.hasMedium, cp.medium))
-
-        g.add((cp_uri, VISU.relativeX, Literal(cp.relative_x, datatype=rdflib.XSD.float)))
-        g.add((cp_uri, VISU.relativeY, Literal(cp.relative_y, datatype=rdflib.XSD.float)))
-
-        # Process properties belonging to this connection point
-        if hasattr(cp, "properties"):
-            for prop in cp.properties:
-                # Add the link from CP to Property
-                g.add((cp_uri, S223.hasProperty, prop.inst_uri))
-                # Save the property details (will check processed_uris internally)
-                save_property_details(prop)
-
-        processed_uris.add(cp_uri)  # Mark as processed
-
-    # --- Main Saving Logic ---
-
-    # Pass 1: Process ConnectableItems (Equipment and DomainSpaces)
-    print("Saving: Processing ConnectableItems...")
-    for item in scene.items():
-        if isinstance(item, ConnectableItem) and item.inst_uri not in processed_uris:
-            item_uri = item.inst_uri
-            print(f"  Saving ConnectableItem: {item_uri}")
-            add_common_properties(item_uri, item)  # Adds RDF.type, label, comment, role
-
-            # Add visual properties
-            g.add((item_uri, VISU.positionX, Literal(item.x(), datatype=rdflib.XSD.float)))
-            g.add((item_uri, VISU.positionY, Literal(item.y(), datatype=rdflib.XSD.float)))
-            g.add((item_uri, VISU.rotation, Literal(item.rotation(), datatype=rdflib.XSD.integer)))
-            if isinstance(item, DomainSpace):
-                g.add((item_uri, VISU.width, Literal(item.width, datatype=rdflib.XSD.float)))
-                g.add((item_uri, VISU.height, Literal(item.height, datatype=rdflib.XSD.float)))
-
-            # Add link to contained items (ConnectableItem -> ConnectableItem)
-            if hasattr(item, "contained_items"):
-                # Ensure contained items are ConnectableItems (not Domain/Physical)
-                valid_contained = [ci for ci in item.contained_items if
-                                   isinstance(ci, ConnectableItem) and not isinstance(ci, (DomainSpace, PhysicalSpace))]
-                for contained_item in valid_contained:
-                    g.add((item_uri, S223.contains, contained_item.inst_uri))
-
-            # Process Connection Points belonging to this item
-            if hasattr(item, "connection_points"):
-                for cp in item.connection_points:
-                    # Add the link from ConnectableItem to ConnectionPoint
-                    g.add((item_uri, S223.hasConnectionPoint, cp.inst_uri))
-                    # Save the connection point details (checks processed_uris internally)
-                    save_connection_point_details(cp)
-
-            # Process Properties belonging directly to this item
-            if hasattr(item, "properties"):
-                for prop in item.properties:
-                    # Add the link from ConnectableItem to Property
-                    g.add((item_uri, S223.hasProperty, prop.inst_uri))
-                    # Save the property details (checks processed_uris internally)
-                    save_property_details(prop)
-
-            processed_uris.add(item_uri)
-
-            if hasattr(item, 'observation_location_uri') and item.observation_location_uri:
-                # Check if the target exists in the scene (optional but good practice)
-                target_exists = False
-                for potential_target in scene.items():
-                    if hasattr(potential_target,
-                               'inst_uri') and potential_target.inst_uri == item.observation_location_uri:
-                        if isinstance(potential_target, (ConnectableItem, Connection, ConnectionPoint)):
-                            target_exists = True
-                            break
-                if target_exists:
-                    g.add((item_uri, S223.hasObservationLocation, item.observation_location_uri))
-                    print(f"    Added s223:hasObservationLocation: {item_uri} -> {item.observation_location_uri}")
-                else:
-                    print(f"    Warning: Observation location target {item.observation_location_uri} for {item_uri} not found in scene. Relationship not saved.")
-
-    # Pass 2: Process PhysicalSpaces
-    print("Saving: Processing PhysicalSpaces...")
-    for item in scene.items():
-        if isinstance(item, PhysicalSpace) and item.inst_uri not in processed_uris:
-            item_uri = item.inst_uri
-            print(f"  Saving PhysicalSpace: {item_uri}")
-            add_common_properties(item_uri, item)  # Adds RDF.type, label, comment, role
-
-            # Add visual properties
-            g.add((item_uri, VISU.positionX, Literal(item.x(), datatype=rdflib.XSD.float)))
-            g.add((item_uri, VISU.positionY, Literal(item.y(), datatype=rdflib.XSD.float)))
-            g.add((item_uri, VISU.width, Literal(item.width, datatype=rdflib.XSD.float)))
-            g.add((item_uri, VISU.height, Literal(item.height, datatype=rdflib.XSD.float)))
-
-            # Add link to contained items (PhysicalSpace -> PhysicalSpace)
-            if hasattr(item, "contained_items"):
-                # Ensure contained items are PhysicalSpaces
-                valid_contained = [ci for ci in item.contained_items if isinstance(ci, PhysicalSpace)]
-                for contained_item in valid_contained:
-                    g.add((item_uri, S223.contains, contained_item.inst_uri))
-
-            # Add link to enclosed DomainSpaces
-            if hasattr(item, "enclosed_domain_spaces"):
-                for domain_space_uri in item.enclosed_domain_spaces:
-                    # Ensure the target URI exists and is a DomainSpace? Optional check.
-                    g.add((item_uri, S223.encloses, domain_space_uri))
-
-            processed_uris.add(item_uri)  # Mark PhysicalSpace as processed
-
-    # Pass 3: Process Connections
-    print("Saving: Processing Connections...")
-    for item in scene.items():
-        if isinstance(item, Connection) and item.inst_uri not in processed_uris:
-            conn_uri = item.inst_uri
-            print(f"  Saving Connection: {conn_uri}")
-            add_common_properties(conn_uri, item)  # Adds RDF.type, label, comment, role
-
-            # Add connection-specific links
-            if item.source and item.target:
-                g.add((conn_uri, S223.connectsAt, item.source.inst_uri))
-                g.add((conn_uri, S223.connectsAt, item.target.inst_uri))
-                # Also add the inverse connectsThrough properties
-                g.add((item.source.inst_uri, S223.connectsThrough, conn_uri))
-                g.add((item.target.inst_uri, S223.connectsThrough, conn_uri))
-            else:
-                print(f"Warning: Connection {conn_uri} is missing source or target. Links not saved.")
-
-            processed_uris.add(conn_uri)  # Mark Connection as processed
-
-    # Pass 4: Process Systems
-    print("Saving: Processing Systems...")
-    for item in scene.items():
-        if isinstance(item, SystemItem) and item.inst_uri not in processed_uris:
-            sys_uri = item.inst_uri
-            print(f"  Saving System: {sys_uri}")
-            add_common_properties(sys_uri, item)  # Adds RDF.type, label, comment, role
-
-            # Add links to members
-            if hasattr(item, "members"):
-                for member in item.members:
-                    # Ensure member is a valid type before linking
-                    if isinstance(member, ConnectableItem) and not isinstance(member, (DomainSpace, PhysicalSpace)):
-                        g.add((sys_uri, S223.hasMember, member.inst_uri))
-                    else:
-                        print(
-                            f"Warning: System {sys_uri} contains invalid member type {type(member)} ({member.inst_uri}). Link not saved.")
+    Relationships are only written when both ends are part of `items`, so any subset of a
+    scene, such as the current selection, yields a self-contained graph. The passes are
+    timed into `profile` if one is given.
+    """
 
-            processed_uris.add(sys_uri)  # Mark System as processed
+    profile = profile or Profile('serialize')
 
-    # Final check: Ensure all CPs and Properties were processed (e.g., if orphaned)
-    # This shouldn't be necessary with the current logic but can be a safety check.
-    print("Saving: Final check for orphaned CPs/Properties...")
-    for item in scene.items():
-        if isinstance(item, ConnectionPoint):
-            save_connection_point_details(item)  # Will do nothing if already processed
-        elif isinstance(item, Property):
-            save_property_details(item)  # Will do nothing if already processed
+    if g is None:
+        g = rdflib.Graph()
+        bind_graph_namespaces(g)
 
-    # --- Serialize the graph ---
-    try:
-        g.serialize(destination=filepath, format="turtle")
-        print(f"Canvas saved successfully to {filepath} with {len(g)} triples.")
-    except Exception as e:
-        print(f"Error saving canvas to {filepath}: {e}")
-        traceback.print_exc()  # Add traceback
+    index = SceneIndex.from_items(items)
+    rules = SceneTriples(index, report=lambda message: log.warning("%s", message))
 
+    written = set()  # URIs whose triples have been added
+
+    def write(item):
+        if item.inst_uri not in written:
+            written.add(item.inst_uri)
+            g.addN((s, p, o, g) for s, p, o in rules.triples_of(item))
+
+    def write_with_children(item):
+        write(item)
+        for cp in getattr(item, 'connection_points', ()):
+            write_with_children(cp)
+        for prop in getattr(item, 'properties', ()):
+            write(prop)
+
+    # Pass 1: ConnectableItems (equipment and domain spaces) with their connection points and properties
+    with profile.measure('connectables') as record:
+        record.counts['items'] = len(index.of('connectable'))
+        for item in index.of('connectable'):
+            log.debug("Saving ConnectableItem: %s", item.inst_uri)
+            write_with_children(item)
+
+    with profile.measure('physical_spaces') as record:
+        record.counts['items'] = len(index.of('physical_space'))
+        for item in index.of('physical_space'):
+            log.debug("Saving PhysicalSpace: %s", item.inst_uri)
+            write(item)
+
+    # Connections are skipped (with a warning) unless both connection points are written
+    with profile.measure('connections') as record:
+        record.counts['items'] = len(index.of('connection'))
+        for item in index.of('connection'):
+            log.debug("Saving Connection: %s", item.inst_uri)
+            write(item)
+
+    with profile.measure('systems') as record:
+        record.counts['items'] = len(index.of('system'))
+        for item in index.of('system'):
+            log.debug("Saving System: %s", item.inst_uri)
+            write(item)
+
+    # Connection points and properties whose parent is not among the items
+    with profile.measure('orphans') as record:
+        record.counts['connection_points'] = len(index.of('connection_point'))
+        record.counts['properties'] = len(index.of('property'))
+        for item in index.of('connection_point'):
+            write_with_children(item)
+        for item in index.of('property'):
+            write(item)
+
+    return g
+
+
+def save_to_turtle(scene: QGraphicsScene, filepath: str):
+    with Instrumentation.profile('save', filepath) as profile:
+        # Serialize a view of the scene; the triples are generated while writing, not copied first
+        with profile.measure('index') as record:
+            index = scene_index(scene)
+            reported = set()  # the serializer visits subjects more than once
+
+            def report(message):
+                if message not in reported:
+                    reported.add(message)
+                    log.warning("%s", message)
+
+            g = rdflib.Graph(store=SceneStore(index, report))
+            bind_graph_namespaces(g)
+            record.counts['items'] = len(index)
+
+        try:
+            with profile.measure('write') as record:
+                g.serialize(destination=filepath, format="turtle")
+                # Counted while the serializer read the triples; len(g) would generate them all again
+                record.counts['triples'] = g.store.scanned
+            log.info("Canvas saved successfully to %s with %s triples.", filepath, record.counts['triples'])
+        except Exception as e:
+            log.exception("Error saving canvas to %s: %s", filepath, e)
 
-def load_from_turtle(scene: QGraphicsScene, filepath: str):
-    def replace_uris_in_namespace(graph, namespace_uri):
-        namespace_uri = str(namespace_uri)
-        new_graph = rdflib.Graph()
-        uri_map = {}
 
-        print(f"Replacing URIs in namespace: {namespace_uri}")
+def replace_uris_in_namespace(graph, namespace_uri, allocator: UriAllocator = default_allocator):
+    """Give every instance URI in `namespace_uri` a fresh one, so loaded or pasted items never clash."""
 
-        # First pass: build mapping dictionary
-        for s, p, o in graph:
-            for node in (s, p, o):
-                if isinstance(node, rdflib.URIRef) and str(node).startswith(namespace_uri):
-                    if node not in uri_map:
-                        uri_map[node] = rdflib.URIRef(f"{namespace_uri}{short_uuid()}")
-                        print(f"Mapping: {node} -> {uri_map[node]}")
+    namespace_uri = str(namespace_uri)
+    new_graph = rdflib.Graph()
+    uri_map = {}
 
-        print(f"Found {len(uri_map)} URIs to replace")
 
-        # Second pass: construct new graph with replaced URIs
-        for s, p, o in graph:
-            new_graph.add((uri_map.get(s, s), uri_map.get(p, p), uri_map.get(o, o)))
+    # First pass: collect the URIs to replace
+    for s, p, o in graph:
+        for node in (s, p, o):
+            if isinstance(node, rdflib.URIRef) and str(node).startswith(namespace_uri):
+                uri_map[node] = None
 
-        # Print all replacements
+    # Allocate all new URIs in one block from the scene's allocator
+    uri_map = dict(zip(uri_map, allocator.allocate_block(len(uri_map))))
+    if log.isEnabledFor(logging.DEBUG):
         for k, v in uri_map.items():
-            print(f"Replaced {k} with {v}")
+            log.debug("Replacing %s with %s", k, v)
 
-        return new_graph
+    # Second pass: construct new graph with replaced URIs
+    for s, p, o in graph:
+        new_graph.add((uri_map.get(s, s), uri_map.get(p, p), uri_map.get(o, o)))
 
-    g = rdflib.Graph()
+    return new_graph
 
-    try:
-        print("Parsing Turtle file...")
-        g.parse(filepath, format="turtle")
-        print(f"Parsed graph with {len(g)} triples")
 
-        # Replace URIs in the specified namespace
-        g = replace_uris_in_namespace(g, BLDG)
+def graph_to_items(g: rdflib.Graph, profile: Profile = None):
+    """Build the items described by `g` off-scene, timing each pass into `profile` if given.
 
-        # Re-draw the grid/frame if needed (assuming _draw_grid exists in your Canvas/MainWindow)
-        view = scene.views()[0] if scene.views() else None
-        if view and hasattr(view, '_draw_grid'):
-            QTimer.singleShot(0, view._draw_grid)  # Delay slightly to ensure scene is ready
+    Returns the created items and connection points (each keyed by URI) and the connections.
+    Nothing is added to a scene; see top_level_items and finish_items.
+    """
 
-        created_items = {}  # Stores URI -> QGraphicsItem instance mapping
-        connection_points = {}  # Stores URI -> ConnectionPoint instance mapping
-        domain_spaces = {}  # Stores URI -> DomainSpace instance mapping (subset of created_items)
+    profile = profile or Profile('build')
 
-        print("First pass: Creating PhysicalSpace and ConnectableItems...")
+    created_items = {}  # Stores URI -> QGraphicsItem instance mapping
+    connection_points = {}  # Stores URI -> ConnectionPoint instance mapping
+    created_connections = []
+    domain_spaces = {}  # Stores URI -> DomainSpace instance mapping (subset of created_items)
+
+    with profile.measure('spaces') as record:
         components_created = 0
 
         # --- Pass 1: Create Physical Spaces ---
         for subject, p, o in g.triples((None, RDF.type, S223.PhysicalSpace)):
-            print(f"Creating PhysicalSpace: {subject}")
+            log.debug("Creating PhysicalSpace: %s", subject)
             physical_space = PhysicalSpace(inst_uri=subject)
             x = g.value(subject, VISU.positionX)
             y = g.value(subject, VISU.positionY)
@@ -349,10 +227,14 @@ def load_from_turtle(scene: QGraphicsScene, filepath: str):
             if label: physical_space.label = str(label)
             if comment: physical_space.comment = str(comment)
             if role: physical_space.role = role
-            scene.addItem(physical_space)
             created_items[subject] = physical_space
             components_created += 1
 
+        record.counts['items'] = components_created
+
+    with profile.measure('connectables') as record:
+        components_created = 0
+
         # --- Pass 1b: Create Connectable Items (Equipment & Domain Spaces) ---
         for subject, p, o in g.triples((None, RDF.type, None)):
             item_type = o
@@ -366,7 +248,7 @@ def load_from_turtle(scene: QGraphicsScene, filepath: str):
                 continue
 
             if item_type == S223.DomainSpace:
-                print(f"Creating DomainSpace: {subject}")
+                log.debug("Creating DomainSpace: %s", subject)
                 connectable = DomainSpace(inst_uri=subject)
                 domain_spaces[subject] = connectable  # Keep track specifically
                 width = g.value(subject, VISU.width)
@@ -375,8 +257,8 @@ def load_from_turtle(scene: QGraphicsScene, filepath: str):
                 if height: connectable.height = float(height)
                 # DomainSpace doesn't load default CPs
 
-            elif item_type in svg_library:  # Assume other connectables are equipment with SVGs
-                print(f"Creating ConnectableItem (Equipment): {subject} of type {item_type}")
+            elif type_resolver.is_equipment(item_type):  # Equipment, resolved along the class hierarchy
+                log.debug("Creating ConnectableItem (Equipment): %s of type %s", subject, item_type)
                 connectable = ConnectableItem(type_uri=item_type, inst_uri=subject)
                 # Load default CPs first, then remove them before adding saved ones
                 default_cps = connectable.connection_points.copy()
@@ -385,7 +267,7 @@ def load_from_turtle(scene: QGraphicsScene, filepath: str):
                     connectable.connection_points.remove(cp)
                     # We don't add default CPs to the scene initially when loading
             else:
-                print(f"Skipping unknown item type: {item_type} for subject {subject}")
+                log.warning("Skipping unknown item type: %s for subject %s", item_type, subject)
                 continue  # Skip to next triple if type is not recognized
 
             # --- Common setup for created ConnectableItem ---
@@ -394,12 +276,12 @@ def load_from_turtle(scene: QGraphicsScene, filepath: str):
                 obs_loc_uri = g.value(subject, S223.hasObservationLocation)
                 if obs_loc_uri and isinstance(obs_loc_uri, rdflib.URIRef):
                     connectable.observation_location_uri = obs_loc_uri
-                    print(f"  Found observation location link: {subject} -> {obs_loc_uri}")
+                    log.debug("Found observation location link: %s -> %s", subject, obs_loc_uri)
 
                 location_uri = g.value(subject, S223.hasPhysicalLocation)
                 if location_uri and isinstance(location_uri, rdflib.URIRef):
                     connectable.physical_location_uri = location_uri
-                    print(f"  Found physical location link: {subject} -> {location_uri}")
+                    log.debug("Found physical location link: %s -> %s", subject, location_uri)
 
                 x = g.value(subject, VISU.positionX)
                 y = g.value(subject, VISU.positionY)
@@ -419,13 +301,12 @@ def load_from_turtle(scene: QGraphicsScene, filepath: str):
                 if role:
                     connectable.role = role
 
-                scene.addItem(connectable)
                 created_items[subject] = connectable
                 components_created += 1
 
-        print(f"Created {components_created} component items (PhysicalSpace, ConnectableItem, DomainSpace)")
+        record.counts['items'] = components_created
 
-        print("Second pass: Processing container relationships (contains, encloses)...")
+    with profile.measure('relationships') as record:
         relationships_processed = 0
         # --- Pass 2: Process 'contains' (Physical->Physical, Equipment->Equipment) ---
         for subject, p, o in g.triples((None, S223.contains, None)):
@@ -446,7 +327,8 @@ def load_from_turtle(scene: QGraphicsScene, filepath: str):
                     # Use the item's add_item method which handles parenting
                     if hasattr(container, 'add_item') and container.add_item(
                             contained):  # Calls contained.setParentItem(container)
-                        print(f"Creating 'contains' relationship: {container.inst_uri} contains {contained.inst_uri}")
+                        log.debug(
+                            "Creating 'contains' relationship: %s contains %s", container.inst_uri, contained.inst_uri)
 
                         # --- CHANGE ---
                         # REMOVE the explicit position mapping and setting below.
@@ -462,13 +344,13 @@ def load_from_turtle(scene: QGraphicsScene, filepath: str):
 
                         relationships_processed += 1
                     else:
-                        print(f"Warning: Failed to add {contained.inst_uri} to {container.inst_uri} via add_item.")
+                        log.warning("Failed to add %s to %s via add_item.", contained.inst_uri, container.inst_uri)
                 else:
-                    print(
-                        f"Warning: Invalid 'contains' relationship between {type(container)} ({subject}) and {type(contained)} ({o})")
+                    log.warning(
+                        "Invalid 'contains' relationship between %s (%s) and %s (%s)", type(container), subject, type(contained), o)
             else:
                 missing = [str(i) for i in (subject, o) if i not in created_items]
-                print(f"Warning: Items not found for 'contains': {missing}")
+                log.warning("Items not found for 'contains': %s", missing)
 
         # --- Pass 2b: Process 'encloses' (Physical -> Domain) ---
         for subject, p, o in g.triples((None, S223.encloses, None)):
@@ -481,19 +363,20 @@ def load_from_turtle(scene: QGraphicsScene, filepath: str):
                         container.encloses_domain_space(domain_space)
                     else:
                         container.enclosed_domain_spaces.add(domain_space.inst_uri)  # Fallback
-                    print(f"Creating 'encloses' relationship: {container.inst_uri} encloses {domain_space.inst_uri}")
+                    log.debug(
+                        "Creating 'encloses' relationship: %s encloses %s", container.inst_uri, domain_space.inst_uri)
                     container.update()  # Update visual if needed
                     relationships_processed += 1
                 else:
-                    print(f"Warning: 'encloses' subject {container.inst_uri} is not a PhysicalSpace")
+                    log.warning("'encloses' subject %s is not a PhysicalSpace", container.inst_uri)
             else:
                 missing = []
                 if subject not in created_items: missing.append(f"container {subject}")
                 if o not in domain_spaces: missing.append(f"domain space {o}")
-                print(f"Warning: Items not found for 'encloses': {missing}")
-        print(f"Processed {relationships_processed} container relationships")
+                log.warning("Items not found for 'encloses': %s", missing)
+        record.counts['relationships'] = relationships_processed
 
-        print("Third pass: Processing connection points...")
+    with profile.measure('connection_points') as record:
         connection_points_processed = 0
         cp_data = {}  # Temporarily store CP data before creating objects
         # Gather all CP data first
@@ -513,7 +396,7 @@ def load_from_turtle(scene: QGraphicsScene, filepath: str):
                         'role': g.value(subject, S223.hasRole)  # Added role
                     }
                 else:
-                    print(f"Warning: Connection point {subject} is missing 's223:isConnectionPointOf' parent link.")
+                    log.warning("Connection point %s is missing 's223:isConnectionPointOf' parent link.", subject)
 
         # Now create the CP objects
         for cp_uri, data in cp_data.items():
@@ -527,7 +410,7 @@ def load_from_turtle(scene: QGraphicsScene, filepath: str):
                     rel_x = float(data['rel_x']) if data['rel_x'] is not None else 0.5
                     rel_y = float(data['rel_y']) if data['rel_y'] is not None else 0.5
 
-                    print(f"Creating connection point {cp_uri} for {parent_uri} at ({rel_x}, {rel_y})")
+                    log.debug("Creating connection point %s for %s at (%s, %s)", cp_uri, parent_uri, rel_x, rel_y)
                     try:
                         cp = ConnectionPoint(
                             connectable=parent,  # Parent is the ConnectableItem instance
@@ -541,27 +424,21 @@ def load_from_turtle(scene: QGraphicsScene, filepath: str):
                         if data['comment']: cp.comment = str(data['comment'])
                         if data['role']: cp.role = data['role']  # Assuming role is stored directly
 
-                        print(f"Adding connection point {cp_uri} to parent {parent_uri}")
-
-                        if not cp.scene():
-                            scene.addItem(cp)
-
                         cp.update_position()  # Ensure visual position is correct
 
                         connection_points[cp_uri] = cp  # Store for connection pass
                         connection_points_processed += 1
                     except Exception as e:
-                        print(f"Error creating ConnectionPoint {cp_uri}: {e}")
-                        traceback.print_exc()
+                        log.exception("Error creating ConnectionPoint %s: %s", cp_uri, e)
                 else:
-                    print(
-                        f"Parent component {parent_uri} for CP {cp_uri} is not a ConnectableItem (it's a {type(parent)}). Skipping CP.")
+                    log.warning(
+                        "Parent component %s for CP %s is not a ConnectableItem (it's a %s). Skipping CP.", parent_uri, cp_uri, type(parent))
             else:
-                print(
-                    f"Parent component {parent_uri} not found in created_items for connection point {cp_uri}. Skipping CP.")
-        print(f"Processed {connection_points_processed} connection points")
+                log.warning(
+                    "Parent component %s not found in created_items for connection point %s. Skipping CP.", parent_uri, cp_uri)
+        record.counts['connection_points'] = connection_points_processed
 
-        print("Fourth pass: Creating connections...")
+    with profile.measure('connections') as record:
         connections_created = 0
         # Iterate through connection types
         for subject, p, o in g.triples((None, RDF.type, None)):
@@ -581,7 +458,7 @@ def load_from_turtle(scene: QGraphicsScene, filepath: str):
                             # Check if connection is possible (optional, but good practice)
                             if source_cp._connection_is_possible(target_cp):
                                 try:
-                                    print(f"Creating connection {subject} between {cp_uri1} and {cp_uri2}")
+                                    log.debug("Creating connection %s between %s and %s", subject, cp_uri1, cp_uri2)
                                     connection = Connection(source=source_cp, target=target_cp, type_uri=o,
                                                             inst_uri=subject)
 
@@ -593,32 +470,31 @@ def load_from_turtle(scene: QGraphicsScene, filepath: str):
                                     if comment: connection.comment = str(comment)
                                     if role: connection.role = role  # Assuming role is stored
 
-                                    scene.addItem(connection)
+                                    created_connections.append(connection)
                                     connections_created += 1
                                 except ValueError as ve:
-                                    print(
-                                        f"Error creating connection {subject}: Invalid connection type or setup - {ve}")
+                                    log.error(
+                                        "Error creating connection %s: Invalid connection type or setup - %s", subject, ve)
                                 except Exception as e:
-                                    print(f"Error creating connection {subject}: {e}")
-                                    traceback.print_exc()
+                                    log.exception("Error creating connection %s: %s", subject, e)
                             else:
-                                print(
-                                    f"Warning: Skipping connection {subject}. Connection between {cp_uri1} ({source_cp.type_uri}, {source_cp.medium}) and {cp_uri2} ({target_cp.type_uri}, {target_cp.medium}) is not allowed.")
+                                log.warning(
+                                    "Skipping connection %s. Connection between %s (%s, %s) and %s (%s, %s) is not allowed.", subject, cp_uri1, source_cp.type_uri, source_cp.medium, cp_uri2, target_cp.type_uri, target_cp.medium)
                         else:
                             connected_uris = []
                             if source_cp.connected_to: connected_uris.append(str(cp_uri1))
                             if target_cp.connected_to: connected_uris.append(str(cp_uri2))
-                            print(
-                                f"Warning: Cannot create connection {subject} - one or both points ({', '.join(connected_uris)}) already connected.")
+                            log.warning(
+                                "Cannot create connection %s - one or both points (%s) already connected.", subject, ', '.join(connected_uris))
                     else:
                         missing_cps = [str(cp) for cp in [cp_uri1, cp_uri2] if cp not in connection_points]
-                        print(
-                            f"Warning: Skipping connection {subject}. Required connection points not found: {missing_cps}")
+                        log.warning(
+                            "Skipping connection %s. Required connection points not found: %s", subject, missing_cps)
                 else:
-                    print(f"Warning: Connection {subject} has fewer than two 's223:connectsAt' points.")
-        print(f"Created {connections_created} connections")
+                    log.warning("Connection %s has fewer than two 's223:connectsAt' points.", subject)
+        record.counts['connections'] = connections_created
 
-        print("Fifth pass: Mapping all properties and their parent relationships...")
+    with profile.measure('properties') as record:
         property_map = {}  # Stores URI -> property data dict
         property_parent_map = {}  # Stores prop_uri -> parent_uri
 
@@ -631,21 +507,19 @@ def load_from_turtle(scene: QGraphicsScene, filepath: str):
                     'label': g.value(prop_uri, RDFS.label),
                     'comment': g.value(prop_uri, RDFS.comment),
                     'role': g.value(prop_uri, S223.hasRole),  # Added role
-                    'aspect': g.value(prop_uri, S223.hasAspect),
+                    'aspect': corrected(g.value(prop_uri, S223.hasAspect)),
                     'external_reference': g.value(prop_uri, S223.hasExternalReference),
                     'internal_reference': g.value(prop_uri, S223.hasInternalReference),
                     'value': g.value(prop_uri, S223.hasValue),
                     'medium': g.value(prop_uri, S223.hasMedium),
-                    'unit': g.value(prop_uri, QUDT.hasUnit),
-                    'quantity_kind': g.value(prop_uri, QUDT.hasQuantityKind),
+                    'unit': corrected(g.value(prop_uri, QUDT.hasUnit)),
+                    'quantity_kind': corrected(g.value(prop_uri, QUDT.hasQuantityKind)),
                     'position_x': g.value(prop_uri, VISU.positionX),
                     'position_y': g.value(prop_uri, VISU.positionY),
                     'identifier': g.value(prop_uri, VISU.identifier),
                     'parent_found': False,  # Flag to track if parent link exists
                     'parent_uri': None
                 }
-                print('positionX', g.value(prop_uri, VISU.positionX))
-                print('positionY', g.value(prop_uri, VISU.positionY))
 
                 # Provide defaults for visual properties if missing
                 if property_map[prop_uri]['position_x'] is None:
@@ -662,16 +536,15 @@ def load_from_turtle(scene: QGraphicsScene, filepath: str):
                 property_map[prop_uri]['parent_uri'] = parent_uri
                 property_map[prop_uri]['parent_found'] = True
 
-        print(
-            f"Found {len(property_map)} potential properties, {len(property_parent_map)} with direct s223:hasProperty links.")
+        record.counts['found'] = len(property_map)
+        record.counts['linked'] = len(property_parent_map)
 
-        print("Sixth pass: Creating Property instances...")
         properties_created = 0
 
         # Create Property objects and attach them
         for prop_uri, prop_data in property_map.items():
             if not prop_data['parent_found']:
-                print(f"Warning: Property {prop_uri} has no parent with s223:hasProperty relationship. Skipping.")
+                log.warning("Property %s has no parent with s223:hasProperty relationship. Skipping.", prop_uri)
                 continue
 
             parent_uri = prop_data['parent_uri']
@@ -688,14 +561,14 @@ def load_from_turtle(scene: QGraphicsScene, filepath: str):
                 parent_object = connection_points[parent_uri]
 
             if not parent_object:
-                print(
-                    f"Error: Parent object instance for URI {parent_uri} not found for property {prop_uri}. Skipping.")
+                log.error(
+                    "Parent object instance for URI %s not found for property %s. Skipping.", parent_uri, prop_uri)
                 continue
 
             # Parent object must be ConnectableItem or ConnectionPoint
             if not isinstance(parent_object, (ConnectableItem, ConnectionPoint)):
-                print(
-                    f"Error: Parent {parent_uri} (type: {type(parent_object)}) is not a valid type (ConnectableItem or ConnectionPoint) for property {prop_uri}. Skipping.")
+                log.error(
+                    "Parent %s (type: %s) is not a valid type (ConnectableItem or ConnectionPoint) for property %s. Skipping.", parent_uri, type(parent_object), prop_uri)
                 continue
 
             try:
@@ -733,10 +606,6 @@ def load_from_turtle(scene: QGraphicsScene, filepath: str):
                 # print(f'    - comment: {prop.comment}')
                 # ... etc ...
 
-                # Add to scene if not already added by parenting
-                if parent_object.scene() and not prop.scene():
-                    scene.addItem(prop)
-
                 # Ensure position is calculated correctly after adding to scene/parent
                 # prop.update_position()
 
@@ -748,21 +617,20 @@ def load_from_turtle(scene: QGraphicsScene, filepath: str):
                 properties_created += 1
 
             except Exception as e:
-                print(f"Error creating Property instance {prop_uri}: {e}")
-                traceback.print_exc()
+                log.exception("Error creating Property instance %s: %s", prop_uri, e)
 
-        print(f"Created {properties_created} properties")
+        record.counts['properties'] = properties_created
 
+    with profile.measure('systems') as record:
         # --- Pass 7: Create System Items ---
-        print("Seventh pass: Creating System items...")
         systems_created = 0
         for subject, p, o in g.triples((None, RDF.type, S223.System)):
             if subject in created_items:  # Should not happen if logic is correct, but check anyway
-                print(
-                    f"Warning: System {subject} seems to be already created as another type ({type(created_items[subject])}). Skipping.")
+                log.warning(
+                    "System %s seems to be already created as another type (%s). Skipping.", subject, type(created_items[subject]))
                 continue
 
-            print(f"Creating System: {subject}")
+            log.debug("Creating System: %s", subject)
             # Create SystemItem instance, initially with no members
             system_item = SystemItem(members=[], inst_uri=subject)
 
@@ -786,53 +654,88 @@ def load_from_turtle(scene: QGraphicsScene, filepath: str):
                             # print(f"  Added member {member_uri} to system {subject}")
                             members_added_count += 1
                         else:
-                            print(f"Warning: Failed to add member {member_uri} to system {subject} (already member?).")
+                            log.warning("Failed to add member %s to system %s (already member?).", member_uri, subject)
                     else:
-                        print(
-                            f"Warning: Member {member_uri} for system {subject} is not a valid ConnectableItem type (it's {type(member_item)}). Skipping member.")
+                        log.warning(
+                            "Member %s for system %s is not a valid ConnectableItem type (it's %s). Skipping member.", member_uri, subject, type(member_item))
                 else:
-                    print(
-                        f"Warning: Member item {member_uri} not found in created_items for system {subject}. Skipping member.")
+                    log.warning(
+                        "Member item %s not found in created_items for system %s. Skipping member.", member_uri, subject)
 
-            print(f"  Added {members_added_count} members to system {subject}")
+            log.debug("Added %s members to system %s", members_added_count, subject)
 
-            # Add the system item to the scene
-            scene.addItem(system_item)
             created_items[subject] = system_item  # Add to lookup map
 
-            # Update the bounding rectangle *after* all members are potentially added
-            system_item.update_bounding_rect()
-
             systems_created += 1
 
-        print(f"Created {systems_created} systems")
-
-        print("Performing final updates...")
-        # Final updates for items that might depend on others being fully loaded
-        for item_uri, item in created_items.items():
-            if isinstance(item, ConnectableItem):
-                # Ensure CPs and their properties are positioned correctly relative to the final parent state
-                item.update_connection_points()
-                item.update_properties()  # Update properties attached directly to the connectable
-                item.update()  # General Qt update
-            elif isinstance(item, PhysicalSpace):
-                item.update()  # Update visual state if needed (e.g., for contained/enclosed counts)
-            elif isinstance(item, SystemItem):
-                item.update_bounding_rect()  # Ensure bounding box is correct
-
-        # Update connections as parent positions might have shifted
-        for item in scene.items():
-            if isinstance(item, Connection):
-                item.update_path()
-
-        scene.update()  # Force a full scene redraw
-
-        print(f"Loading completed successfully")
+        record.counts['systems'] = systems_created
+
+    return created_items, connection_points, created_connections
+
+
+def top_level_items(created_items: dict, created_connections: list) -> list:
+    """The items to add to a scene for a block built by graph_to_items; all others are their children."""
+    return [item for item in created_items.values() if item.parentItem() is None] + list(created_connections)
+
+
+def finish_items(created_items: dict, created_connections: list):
+    """Final geometry updates for a block built by graph_to_items, once it is in its scene."""
+
+    # Final updates for items that might depend on others being fully loaded
+    for item_uri, item in created_items.items():
+        if isinstance(item, ConnectableItem):
+            # Ensure CPs and their properties are positioned correctly relative to the final parent state
+            item.update_connection_points()
+            item.update_properties()  # Update properties attached directly to the connectable
+            item.update()  # General Qt update
+        elif isinstance(item, PhysicalSpace):
+            item.update()  # Update visual state if needed (e.g., for contained/enclosed counts)
+        elif isinstance(item, SystemItem):
+            item.update_bounding_rect()  # Ensure bounding box is correct
+
+    # Update connections as parent positions might have shifted
+    for item in created_connections:
+        item.update_path()
+
+
+def load_from_turtle(scene: QGraphicsScene, filepath: str):
+    allocator = getattr(scene, 'uri_allocator', default_allocator)
+
+    g = rdflib.Graph()
+
+    try:
+        with Instrumentation.profile('load', filepath) as profile:
+            with profile.measure('parse') as record:
+                g.parse(filepath, format="turtle")
+                record.counts['triples'] = len(g)
+
+            # Replace URIs in the specified namespace
+            with profile.measure('uri_remap') as record:
+                g = replace_uris_in_namespace(g, BLDG, allocator)
+                record.counts['triples'] = len(g)
+
+            # Re-draw the grid/frame if needed (assuming _draw_grid exists in your Canvas/MainWindow)
+            view = scene.views()[0] if scene.views() else None
+            if view and hasattr(view, '_draw_grid'):
+                QTimer.singleShot(0, view._draw_grid)  # Delay slightly to ensure scene is ready
+
+            created_items, _, created_connections = graph_to_items(g, profile)
+
+            with profile.measure('add_to_scene') as record:
+                items = top_level_items(created_items, created_connections)
+                add_items_to_scene(scene, items)
+                record.counts['items'] = len(items)
+
+            with profile.measure('final_updates') as record:
+                finish_items(created_items, created_connections)
+                scene.update()  # Force a full scene redraw
+                record.counts['items'] = len(created_items) + len(created_connections)
+
+        log.info("Loading completed successfully")
         return True
 
     except Exception as e:
-        print(f"Error loading diagram from {filepath}: {e}")
-        traceback.print_exc()  # Print detailed traceback
+        log.exception("Error loading diagram from %s: %s", filepath, e)
         # Optionally clear the scene again on error to avoid partial loads
         # scene.clear()
         # if view and hasattr(view, '_draw_grid'):
@@ -842,14 +745,24 @@ def load_from_turtle(scene: QGraphicsScene, filepath: str):
 
 class EntityBrowser(QTreeWidget):
 
+    # type URI -> (pixmap, hot spot); rendering the SVG once per type is enough
+    _drag_pixmaps: Dict[rdflib.URIRef, tuple] = {}
+
     def __init__(self, parent: QWidget = None):
         super().__init__(parent)
         self.setHeaderLabel("Entities")
         self.setDragEnabled(True)
+
+        self._entities: List[tuple] = []  # (tree item, type URI, search terms) per entity
+        self._search_index: List[tuple] = None  # (tree item, lower-case search text), built on the first search
+        self._last_query = ""
+
         self._populate_entity_tree()
         self.expandAll()
 
     def _populate_entity_tree(self):
+        entities = []  # (tree item, name, type URI), indexed together once the tree is built
+
         def add_items_recursively(parent_item, items_dict):
             for item_name, item_value in items_dict.items():
                 tree_item = QTreeWidgetItem(parent_item)
@@ -857,6 +770,7 @@ class EntityBrowser(QTreeWidget):
 
                 if not isinstance(item_value, dict):
                     tree_item.setData(0, Qt.UserRole, item_value)
+                    entities.append((tree_item, item_name, item_value))
                 else:
 
                     add_items_recursively(tree_item, item_value)
@@ -870,6 +784,106 @@ class EntityBrowser(QTreeWidget):
             else:
 
                 category_item.setData(0, Qt.UserRole, category_dict)
+                entities.append((category_item, category_name, category_dict))
+
+        labels = to_labels(type_uri for _, _, type_uri in entities)
+        for (tree_item, name, type_uri), label in zip(entities, labels):
+            self._index_entity(tree_item, name, type_uri, label)
+
+    def _index_entity(self, tree_item: QTreeWidgetItem, name: str, type_uri: rdflib.URIRef, label: str):
+        """Make an entity findable by its name, type URI, prefixed name and the categories above it."""
+
+        terms = [name, str(type_uri), label]
+
+        parent = tree_item.parent()
+        while parent:
+            terms.append(parent.text(0))
+            parent = parent.parent()
+
+        tree_item.setToolTip(0, label)
+        self._entities.append((tree_item, type_uri, " ".join(terms)))
+
+    def _search_texts(self) -> List[tuple]:
+        """(tree item, search text) per entity, with the rdfs:label of its class.
+
+        Built on the first search, so the vocabulary is not read at startup.
+        """
+
+        if self._search_index is None:
+            labels = vocabulary.labels
+            self._search_index = [
+                (tree_item, f"{terms} {labels.get(type_uri, '')}".lower()) for tree_item, type_uri, terms in self._entities
+            ]
+        return self._search_index
+
+    def filter_entities(self, text: str):
+        """Show only entities matching every word of `text`, together with their categories."""
+
+        query = text.strip().lower()
+        words = query.split()
+
+        # Typing on narrows the previous result, so only the entities still shown need checking
+        narrowing = bool(self._last_query) and query.startswith(self._last_query)
+        self._last_query = query
+
+        self.setUpdatesEnabled(False)
+
+        visible = set()
+        for tree_item, search_text in self._search_texts():
+            if narrowing and tree_item.isHidden():
+                continue
+
+            matches = all(word in search_text for word in words)
+            tree_item.setHidden(not matches)
+            if matches:
+                visible.add(id(tree_item))
+                parent = tree_item.parent()
+                while parent and id(parent) not in visible:
+                    visible.add(id(parent))
+                    parent = parent.parent()
+
+        iterator = QTreeWidgetItemIterator(self)
+        while iterator.value():
+            tree_item = iterator.value()
+            if tree_item.childCount():
+                tree_item.setHidden(id(tree_item) not in visible)
+            iterator += 1
+
+        self.setUpdatesEnabled(True)
+
+    @classmethod
+    def _drag_pixmap(cls, entity: rdflib.URIRef) -> tuple:
+        """Pixmap and hot spot shown while dragging `entity`, rendered on first use."""
+
+        cached = cls._drag_pixmaps.get(entity)
+        if cached is not None:
+            return cached
+
+        if entity == S223.PhysicalSpace or entity == S223.DomainSpace:
+
+            pixmap = QPixmap(100, 80)
+            pixmap.fill(Qt.transparent)
+            painter = QPainter(pixmap)
+            painter.setPen(QPen(Qt.black, 2))
+            painter.setBrush(QBrush(QColor(240, 240, 240, 100)))
+            painter.drawRect(10, 10, 80, 60)
+            painter.drawText(QRect(10, 10, 80, 60), Qt.AlignCenter, split_uri(entity)[1])
+            painter.end()
+            cached = pixmap, QPoint(50, 40)
+
+        else:
+
+            svg_data = svg_library[entity].encode()
+            renderer = QSvgRenderer(QByteArray(svg_data))
+            pixmap = QPixmap(renderer.defaultSize())
+            pixmap.fill(Qt.transparent)
+            painter = QPainter(pixmap)
+            renderer.render(painter)
+            painter.end()
+            cached = pixmap, QPoint(25, 25)
+
+        cls._drag_pixmaps[entity] = cached
+        return cached
 
     def mouseMoveEvent(self, event):
         if event.buttons() != Qt.LeftButton:
@@ -893,30 +907,9 @@ class EntityBrowser(QTreeWidget):
         drag.setMimeData(mime_data)
 
         try:
-            if entity == S223.PhysicalSpace or entity == S223.DomainSpace:
-
-                pixmap = QPixmap(100, 80)
-                pixmap.fill(Qt.transparent)
-                painter = QPainter(pixmap)
-                painter.setPen(QPen(Qt.black, 2))
-                painter.setBrush(QBrush(QColor(240, 240, 240, 100)))
-                painter.drawRect(10, 10, 80, 60)
-                painter.drawText(QRect(10, 10, 80, 60), Qt.AlignCenter, "PhysicalSpace")
-                painter.end()
-                drag.setPixmap(pixmap)
-                drag.setHotSpot(QPoint(50, 40))
-
-            else:
-
-                svg_data = svg_library[entity].encode()
-                renderer = QSvgRenderer(QByteArray(svg_data))
-                pixmap = QPixmap(renderer.defaultSize())
-                pixmap.fill(Qt.transparent)
-                painter = QPainter(pixmap)
-                renderer.render(painter)
-                painter.end()
-                drag.setPixmap(pixmap)
-                drag.setHotSpot(QPoint(25, 25))
+            pixmap, hot_spot = self._drag_pixmap(entity)
+            drag.setPixmap(pixmap)
+            drag.setHotSpot(hot_spot)
 
             drag.exec_(Qt.CopyAction)
         except KeyError:
@@ -926,10 +919,20 @@ class EntityBrowser(QTreeWidget):
 class DiagramScene(QGraphicsScene):
     """Custom scene to draw location indicator lines in the foreground."""
 
-    def __init__(self, parent=None):  # Add __init__
+    def __init__(self, parent=None, uri_allocator: UriAllocator = None):
         super().__init__(parent)
         self.show_location_lines = True  # Add state variable, default to True
 
+        # Items are created before they are added to a scene, so by default the scene shares
+        # the process-wide allocator that item constructors draw from.
+        self.uri_allocator = uri_allocator or default_allocator
+
+        # Typed index of the model items, maintained by the items themselves (see track_scene_membership)
+        self.item_index = SceneIndex()
+
+        # Where the connection points are, for hit-testing and snapping new connections
+        self.connection_point_grid = ConnectionPointGrid()
+
     def drawForeground(self, painter: QPainter, rect):
         # Call the base class method first (optional, but good practice)
         super().drawForeground(painter, rect)
@@ -943,34 +946,13 @@ class DiagramScene(QGraphicsScene):
         painter.setPen(line_pen)
         painter.setBrush(Qt.NoBrush)  # Ensure no fill
 
-        items_to_check = self.items()  # Get all items in the scene once
-
-        # Optional: Pre-build a lookup for faster physical space finding
-        physical_spaces_by_uri: Dict[rdflib.URIRef, PhysicalSpace] = {
-            item.inst_uri: item
-            for item in items_to_check
-            if isinstance(item, PhysicalSpace) and hasattr(item, 'inst_uri')
-        }
-
-        # Iterate through items to find equipment with locations
-        for item in items_to_check:
-            # Check if it's an Equipment item (Connectable, not Domain)
-            # and has a physical location set
-            if isinstance(item, ConnectableItem) and \
-                    not isinstance(item, DomainSpace) and \
-                    hasattr(item, 'physical_location_uri') and \
-                    item.physical_location_uri:
-
-                # Find the target PhysicalSpace using the pre-built lookup or by iterating again
-                target_space = physical_spaces_by_uri.get(item.physical_location_uri)
-                # Fallback search if lookup wasn't built or failed (less efficient)
-                # if not target_space:
-                #     for potential_target in items_to_check:
-                #         if isinstance(potential_target, PhysicalSpace) and \
-                #            hasattr(potential_target, 'inst_uri') and \
-                #            potential_target.inst_uri == item.physical_location_uri:
-                #             target_space = potential_target
-                #             break
+        # Iterate through the indexed equipment and draw a line to its physical location
+        for item in self.item_index.of('equipment'):
+            if item.physical_location_uri:
+
+                target_space = self.item_index.by_uri(item.physical_location_uri)
+                if not isinstance(target_space, PhysicalSpace):
+                    target_space = None
 
                 # If the target space exists in the scene
                 if target_space:
@@ -1021,10 +1003,7 @@ class Canvas(QGraphicsView):
         select_all_action.setShortcut("Ctrl+A")
         select_all_action.triggered.connect(self._select_all_items)
 
-        equipment = Selection([
-            item for item in selected.getConnectable
-            if not isinstance(item, (DomainSpace, PhysicalSpace))
-        ])
+        equipment = selected.getEquipment
         if equipment:
             menu.addSeparator()
             rotate_action = menu.addAction("Rotate 90°")
@@ -1032,11 +1011,7 @@ class Canvas(QGraphicsView):
             rotate_action.triggered.connect(self._rotate_selected_items_90)
             menu.addSeparator()
 
-        equipment_for_system = Selection([
-            item for item in selected.getConnectable
-            if not isinstance(item, (DomainSpace, PhysicalSpace))
-        ])
-        if len(equipment_for_system) >= 1:
+        if len(equipment) >= 1:
             create_sys_action = menu.addAction("Create System from Selection")
             create_sys_action.setShortcut("Ctrl+G")
             create_sys_action.triggered.connect(self._create_system_from_selection)
@@ -1045,11 +1020,6 @@ class Canvas(QGraphicsView):
         physical_spaces = selected.getPhysicalSpace
         domain_spaces = selected.getDomainSpace
 
-        equipment = Selection([
-            item for item in selected.getConnectable
-            if not isinstance(item, (DomainSpace, PhysicalSpace))
-        ])
-
         if len(physical_spaces) == 1 and len(selected) == 1:
             manage_action = menu.addAction("Manage Relationships...")
             manage_action.triggered.connect(lambda: self._show_relationship_dialog(physical_spaces[0]))
@@ -1200,6 +1170,7 @@ class Canvas(QGraphicsView):
         self.setAcceptDrops(True)
 
         self.property_panel = property_panel
+        property_panel.command_history = self.command_history
         self.scene.selectionChanged.connect(self._handle_selection_changed)
 
         self.update_timer = QTimer(self)
@@ -1208,12 +1179,10 @@ class Canvas(QGraphicsView):
         self.update_timer.timeout.connect(self._update_property_panel)
         self.update_timer.start()
 
-        self._draw_grid()
+        # Frame-time/paint-cost overlay, off until toggled from the View menu
+        self.hud = CanvasHud(self)
 
-        self.clipboard = {
-            'items': [],
-            'connections': []
-        }
+        self._draw_grid()
 
     def toggle_grid(self, enable: bool):
         CanvasProperties.enable_grid = enable
@@ -1284,12 +1253,6 @@ class Canvas(QGraphicsView):
         if event.mimeData().hasFormat("application/entity-svg"):
             event.acceptProposedAction()
 
-    def mouseMoveEvent(self, event):
-        super().mouseMoveEvent(event)
-        for item in self.scene.items():
-            if isinstance(item, Connection):
-                item.update_path()
-
     def wheelEvent(self, event):
         if event.modifiers() & Qt.ControlModifier:
             zoom_factor = 1.1
@@ -1307,14 +1270,6 @@ class Canvas(QGraphicsView):
     def _update_property_panel(self):
         self.property_panel.update_properties(Selection(self.scene.selectedItems()))
 
-    def _find_connection_point_index(self, cp):
-        for i, item_data in enumerate(self.clipboard['items']):
-            if hasattr(cp, 'connectable') and cp.connectable == item_data.get('original'):
-                for j, cp_data in enumerate(item_data['connection_points']):
-                    if cp_data.get('original') == cp:
-                        return (i, j)
-        return None
-
     def _create_system_from_selection(self):
         selection = Selection(self.scene.selectedItems())
         selected_connectable = selection.getConnectable
@@ -1340,323 +1295,151 @@ class Canvas(QGraphicsView):
         self.update()
 
     def _copy_selected_items(self):
-        selected_items = self.scene.selectedItems()
-        self.clipboard = {'items': [], 'connections': []}
-
-        original_item_to_clipboard_index = {}
-
-        original_cp_to_clipboard_index = {}
-
-        original_prop_to_clipboard_info = {}
-
-        clipboard_item_index = 0
-
-        for item in selected_items:
-            item_data = None
-            is_copyable_item = False
-
-            if isinstance(item, ConnectableItem):
-
-                current_item_clipboard_idx = clipboard_item_index
-
-                item_data = {
-                    'type': 'ConnectableItem', 'type_uri': item.type_uri,
-                    'pos_x': item.x(), 'pos_y': item.y(), 'rotation': item.rotation(),
-                    'label': item.label, 'comment': item.comment, 'role': item.role,
-                    'connection_points': [], 'properties': [],
-                    'original': item
-                }
-                if isinstance(item, DomainSpace):
-                    item_data['width'] = item.width
-                    item_data['height'] = item.height
-
-                for j, cp in enumerate(item.connection_points):
-                    cp_data = {
-                        'medium': cp.medium, 'type_uri': cp.type_uri,
-                        'relative_x': cp.relative_x, 'relative_y': cp.relative_y,
-                        'label': cp.label, 'comment': cp.comment, 'original': cp,
-                        'properties': []
-                    }
-
-                    original_cp_to_clipboard_index[cp] = (current_item_clipboard_idx, j)
-
-                    for p_idx, prop in enumerate(cp.properties):
-                        prop_data_copy = self._copy_property_data(prop)
-                        cp_data['properties'].append(prop_data_copy)
-                        original_prop_to_clipboard_info[prop] = {
-                            'parent_type': 'cp',
-                            'parent_idx': (current_item_clipboard_idx, j),
-                            'prop_idx': p_idx
-                        }
-                    item_data['connection_points'].append(cp_data)
-
-                for p_idx, prop in enumerate(item.properties):
-                    prop_data_copy = self._copy_property_data(prop)
-                    item_data['properties'].append(prop_data_copy)
-                    original_prop_to_clipboard_info[prop] = {
-                        'parent_type': 'connectable',
-                        'parent_idx': current_item_clipboard_idx,
-                        'prop_idx': p_idx
-                    }
-
-                is_copyable_item = True
-
-            elif isinstance(item, PhysicalSpace):
-
-                current_item_clipboard_idx = clipboard_item_index
-
-                item_data = {
-                    'type': 'PhysicalSpace',
-                    'pos_x': item.x(), 'pos_y': item.y(),
-                    'width': item.width, 'height': item.height,
-                    'label': item.label, 'comment': item.comment, 'role': item.role,
-                    'original': item
-                }
-                is_copyable_item = True
-
-            if is_copyable_item and item_data:
-                original_item_to_clipboard_index[item] = clipboard_item_index
-                self.clipboard['items'].append(item_data)
-                clipboard_item_index += 1
+        selection = Selection(self.scene.selectedItems())
+        copyable = selection.getConnectable + selection.getPhysicalSpace + selection.getConnection
 
-        for item in selected_items:
-            if isinstance(item, Connection):
-                source_cp = item.source
-                target_cp = item.target
+        g = items_to_graph(copyable)
+        copied_items_count = len(selection.getConnectable) + len(selection.getPhysicalSpace)
+        copied_connections_count = len(set(g.subjects(S223.connectsAt, None)))
 
-                if source_cp in original_cp_to_clipboard_index and target_cp in original_cp_to_clipboard_index:
-                    connection_data = {
-                        'type': 'Connection',
+        if not copied_items_count:
+            find_status_bar(self).showMessage("Nothing copyable selected")
+            return
 
-                        'source_index': original_cp_to_clipboard_index[source_cp],
-                        'target_index': original_cp_to_clipboard_index[target_cp],
-                        'type_uri': item.type_uri,
-                        'label': item.label, 'comment': item.comment
+        payload = g.serialize(format="turtle", encoding="utf-8")
 
-                    }
-                    self.clipboard['connections'].append(connection_data)
-
-        if self.clipboard['items']:
-            copied_items_count = len(self.clipboard['items'])
-            copied_connections_count = len(self.clipboard['connections'])
-            msg = f"Copied {copied_items_count} item(s)"
-            if copied_connections_count > 0:
-                msg += f" and {copied_connections_count} connection(s)"
-            msg += "..."
-            find_status_bar(self).showMessage(msg)
-        else:
-            find_status_bar(self).showMessage("Nothing copyable selected")
+        mime_data = QMimeData()
+        mime_data.setData(CLIPBOARD_MIME_TYPE, QByteArray(payload))
+        mime_data.setText(payload.decode("utf-8"))
+        QApplication.clipboard().setMimeData(mime_data)
 
-    def _copy_property_data(self, prop: Property) -> dict:
-        return {
-            'property_type': prop.property_type, 'identifier': prop.identifier,
-            'position_x': prop.x(),
-            'position_y': prop.y(),
-            'label': prop.label, 'comment': prop.comment, 'aspect': prop.aspect,
-            'external_reference': prop.external_reference,
-            'internal_reference': prop.internal_reference, 'value': prop.value,
-            'medium': prop.medium,
-            'unit': prop.unit,
-            'quantity_kind': prop.quantity_kind,
-            'original': prop
-        }
+        msg = f"Copied {copied_items_count} item(s)"
+        if copied_connections_count > 0:
+            msg += f" and {copied_connections_count} connection(s)"
+        msg += "..."
+        find_status_bar(self).showMessage(msg)
 
     def _paste_items(self):
-        if not self.clipboard['items']:
+        mime_data = QApplication.clipboard().mimeData()
+        if mime_data is None or not mime_data.hasFormat(CLIPBOARD_MIME_TYPE):
             find_status_bar(self).showMessage("Clipboard is empty")
             return
 
-        self.scene.clearSelection()
-        paste_offset = CanvasProperties.grid_size
-        compound_command = CompoundCommand("Paste Items")
-        new_items_map = {}
-        new_cps_map = {}
-
-        for i, item_data in enumerate(self.clipboard['items']):
-            original_item = item_data['original']
-            new_item = None
-            item_type = item_data.get('type')
-
-            if item_type == 'ConnectableItem':
-                if isinstance(original_item, DomainSpace):
-                    new_item = DomainSpace(type_uri=item_data['type_uri'])
-                    new_item.width = item_data.get('width', 150)
-                    new_item.height = item_data.get('height', 100)
-                else:
-
-                    try:
-                        new_item = ConnectableItem(type_uri=item_data['type_uri'])
-                    except KeyError:
-                        print(f"Paste Warning: SVG not found for {item_data['type_uri']}. Skipping item.")
-                        continue
-
-                new_item.setPos(item_data['pos_x'] + paste_offset, item_data['pos_y'] + paste_offset)
-                new_item.setRotation(item_data['rotation'])
-
-            elif item_type == 'PhysicalSpace':
-                new_item = PhysicalSpace()
-                new_item.width = item_data.get('width', 200)
-                new_item.height = item_data.get('height', 150)
-                new_item.setPos(item_data['pos_x'] + paste_offset, item_data['pos_y'] + paste_offset)
+        with Instrumentation.profile('paste', 'clipboard') as profile:
+            g = rdflib.Graph()
+            try:
+                with profile.measure('parse') as record:
+                    g.parse(data=bytes(mime_data.data(CLIPBOARD_MIME_TYPE)).decode("utf-8"), format="turtle")
+                    record.counts['triples'] = len(g)
+            except Exception as e:
+                log.error("Paste Error: Could not read clipboard contents: %s", e)
+                find_status_bar(self).showMessage("Paste failed")
+                return
 
-            else:
-                print(f"Paste Warning: Unknown item type '{item_type}' in clipboard.")
-                continue
+            # Fresh instance URIs for everything in the payload, drawn in one block
+            with profile.measure('uri_remap'):
+                g = replace_uris_in_namespace(g, BLDG, self.scene.uri_allocator)
 
-            new_item.label = item_data.get('label', '')
-            new_item.comment = item_data.get('comment', '')
-            new_item.role = item_data.get('role', None)
+            # Build the whole block off-scene and offset it there, so no item reacts to its own placement
+            created_items, _, created_connections = graph_to_items(g, profile)
+            block = top_level_items(created_items, created_connections)
 
-            add_item_command = AddItemCommand(self.scene, new_item)
+            paste_offset = CanvasProperties.grid_size
+            for item in block:
+                if not isinstance(item, Connection):
+                    item.moveBy(paste_offset, paste_offset)
 
-            if add_item_command.execute():
-                compound_command.add_command(add_item_command)
-                new_items_map[original_item] = new_item
+            self.scene.clearSelection()
+            with profile.measure('add_to_scene') as record:
+                command = AddItemsCommand(self.scene, block, "Paste Items")
+                pasted = self.command_history.push(command)
+                record.counts['items'] = len(block)
+
+            if pasted:
+                with profile.measure('final_updates'):
+                    finish_items(created_items, created_connections)
+                with profile.measure('select'):
+                    self.select_items(item for item in block if not isinstance(item, Connection))
+                find_status_bar(self).showMessage(f"Pasted {len(created_items)} items.")
             else:
-                print(f"Error adding pasted item {new_item.label} to scene.")
-
-        for i, item_data in enumerate(self.clipboard['items']):
-            original_item = item_data['original']
-            new_item = new_items_map.get(original_item)
-            if not new_item or not isinstance(new_item, ConnectableItem):
-                continue
-
-            default_cps_map = {}
-            if hasattr(new_item, 'connection_points'):
-                for cp in new_item.connection_points:
-                    key = (cp.relative_x, cp.relative_y, str(cp.medium), str(cp.type_uri))
-                    default_cps_map[key] = cp
-
-            for j, cp_data in enumerate(item_data.get('connection_points', [])):
-                original_cp = cp_data['original']
-                key = (cp_data['relative_x'], cp_data['relative_y'],
-                       str(cp_data['medium']), str(cp_data['type_uri']))
-                new_cp = None
-
-                if key in default_cps_map:
-                    new_cp = default_cps_map[key]
-
-                    new_cp.label = cp_data.get('label', '')
-                    new_cp.comment = cp_data.get('comment', '')
-
-                    del default_cps_map[key]
-                else:
-                    connection_point = ConnectionPoint(
-                        connectable=new_item,
-                        medium=cp_data['medium'],
-                        type_uri=cp_data['type_uri'],
-                        position=(cp_data['relative_x'], cp_data['relative_y']),
-                    )
-                    add_cp_cmd = AddConnectionPointCommand(connection_point=connection_point)
-
-                    if add_cp_cmd.execute():
-                        new_cp = add_cp_cmd.connection_point
-                        new_cp.label = cp_data.get('label', '')
-                        new_cp.comment = cp_data.get('comment', '')
-                        compound_command.add_command(add_cp_cmd)
-                    else:
-                        print(f"Error creating pasted CP for {new_item.label}")
-
-                if new_cp:
-                    new_cps_map[original_cp] = new_cp
+                find_status_bar(self).showMessage("Paste failed")
 
-                    for prop_data in cp_data.get('properties', []):
+    def select_items(self, items, message: str = None) -> int:
+        """Replace the selection with `items` in one shot.
 
-                        property = Property.new(prop_data=prop_data, parent=new_cp)
-                        add_prop_cmd = AddPropertyCommand(parent_item=new_cp, property=property)
-
-                        if add_prop_cmd.execute():
-                            compound_command.add_command(add_prop_cmd)
-                        else:
-                            print(f"Error creating pasted property for CP {new_cp.inst_uri}")
-
-            for prop_data in item_data.get('properties', []):
-
-                property = Property.new(prop_data=prop_data, parent=new_cp)
-                add_prop_cmd = AddPropertyCommand(parent_item=new_cp, property=property)
-
-                if add_prop_cmd.execute():
-                    compound_command.add_command(add_prop_cmd)
-                else:
-                    print(f"Error creating pasted property for {new_item.label}")
-
-        for conn_data in self.clipboard['connections']:
-            if conn_data['type'] == 'Connection':
-                source_item_idx, source_cp_idx = conn_data['source_index']
-                target_item_idx, target_cp_idx = conn_data['target_index']
-
-                original_source_cp = None
-                original_target_cp = None
-
-                try:
+        selectionChanged is held back while the items are flagged and emitted once at the end;
+        the property panel is refreshed right away instead of once per item.
+        """
+        selected = 0
+        self.scene.blockSignals(True)
+        try:
+            self.scene.clearSelection()
+            for item in items:
+                if item.flags() & QGraphicsItem.ItemIsSelectable:
+                    item.setSelected(True)
+                    selected += 1
+        finally:
+            self.scene.blockSignals(False)
 
-                    original_source_cp = self.clipboard['items'][source_item_idx]['connection_points'][source_cp_idx][
-                        'original']
-                    original_target_cp = self.clipboard['items'][target_item_idx]['connection_points'][target_cp_idx][
-                        'original']
-                except (IndexError, KeyError, TypeError) as e:
+        self.scene.selectionChanged.emit()
+        self.update_timer.stop()
+        self._update_property_panel()
 
-                    print(
-                        f"Paste Error: Could not find original CP data object in clipboard structure for connection. Indices: src({source_item_idx},{source_cp_idx}), tgt({target_item_idx},{target_cp_idx}). Error: {e}")
-                    continue
+        if message:
+            find_status_bar(self).showMessage(message.format(count=selected))
+        return selected
 
-                new_source_cp = new_cps_map.get(original_source_cp)
-                new_target_cp = new_cps_map.get(original_target_cp)
+    def _select_all_items(self):
+        """Selects all selectable items in the scene."""
+        self.select_items(self.scene.items(), "Selected all items")
 
-                if new_source_cp and new_target_cp:
+    def _select_kind(self, kind: str, name: str):
+        """Selects every item of a Selection bucket kind, e.g. 'equipment' or 'connection'."""
+        self.select_items(self.scene.item_index.of(kind), f"Selected {{count}} {name}")
 
-                    if not new_source_cp.connected_to and not new_target_cp.connected_to:
-                        connection = Connection(
-                            source=new_source_cp,
-                            target=new_target_cp,
-                            type_uri=conn_data['type_uri'],
-                        )
+    def _select_same_type(self):
+        """Selects all equipment, spaces and connections sharing a type with the current selection."""
+        selected = Selection(self.scene.selectedItems())
+        type_uris = {item.type_uri for item in selected.getConnectable + selected.getConnection}
 
-                        add_conn_cmd = AddConnectionCommand(
-                            scene=self.scene, connection=connection,
-                        )
+        index = self.scene.item_index
+        items = [item for item in index.of('connectable') + index.of('connection') if item.type_uri in type_uris]
+        self.select_items(items, "Selected {count} item(s) of the same type")
 
-                        if add_conn_cmd.execute():
-                            new_conn = add_conn_cmd.connection
-                            new_conn.label = conn_data.get('label', '')
-                            new_conn.comment = conn_data.get('comment', '')
-                            compound_command.add_command(add_conn_cmd)
-                        else:
-                            print(
-                                f"Error creating pasted connection command between {new_source_cp.inst_uri} and {new_target_cp.inst_uri}")
-                    else:
-                        print(
-                            f"Skipping pasted connection: Points {new_source_cp.inst_uri} or {new_target_cp.inst_uri} already connected.")
-                else:
+    def _select_same_medium(self):
+        """Selects all connections carrying a medium of the selected connections or connection points."""
+        selected = Selection(self.scene.selectedItems())
+        media = {item.medium for item in selected.getConnection + selected.getConnectionPoint}
+        for item in selected.getConnectable:
+            media.update(cp.medium for cp in item.connection_points)
 
-                    missing = []
-                    if not new_source_cp: missing.append(f"source (original: {original_source_cp})")
-                    if not new_target_cp: missing.append(f"target (original: {original_target_cp})")
-                    print(
-                        f"Paste Error: Could not find new {' and '.join(missing)} CP(s) in new_cps_map. Skipping connection.")
-
-        if self.command_history.push(compound_command):
-
-            for original_item, new_item in new_items_map.items():
-                is_child_of_pasted = False
-                if new_item.parentItem():
-                    for _, pasted_parent in new_items_map.items():
-                        if new_item.parentItem() == pasted_parent:
-                            is_child_of_pasted = True;
-                            break
-                if not is_child_of_pasted:
-                    new_item.setSelected(True)
-            find_status_bar(self).showMessage(f"Pasted {len(new_items_map)} items.")
-        else:
-            find_status_bar(self).showMessage("Paste failed")
+        items = [item for item in self.scene.item_index.of('connection') if item.medium in media]
+        self.select_items(items, "Selected {count} connection(s) with the same medium")
 
-    def _select_all_items(self):
-        """Selects all selectable items in the scene."""
-        self.scene.clearSelection()
-        for item in self.scene.items():
-            if item.flags() & QGraphicsItem.ItemIsSelectable:
-                item.setSelected(True)
-        find_status_bar(self).showMessage("Selected all items")
+    def _select_system_members(self):
+        """Selects the members of the selected systems, or of the systems the selected equipment is in."""
+        selected = Selection(self.scene.selectedItems())
+        systems = selected.getSystem
+        if not systems:
+            equipment = set(selected.getEquipment)
+            systems = [system for system in self.scene.item_index.of('system') if system.members & equipment]
+
+        items = {member for system in systems for member in system.members}
+        self.select_items(items, f"Selected {{count}} member(s) of {len(systems)} system(s)")
+
+    def _select_physical_space_contents(self):
+        """Selects what the selected physical spaces contain, enclose or are the location of."""
+        spaces = Selection(self.scene.selectedItems()).getPhysicalSpace
+        space_uris = {space.inst_uri for space in spaces}
+        enclosed_uris = set().union(*(space.enclosed_domain_spaces for space in spaces))
+
+        items = set()
+        for space in spaces:
+            items.update(space.contained_items)
+        for item in self.scene.item_index.of('connectable'):
+            if item.inst_uri in enclosed_uris or item.physical_location_uri in space_uris:
+                items.add(item)
+        self.select_items(items, f"Selected {{count}} item(s) in {len(spaces)} physical space(s)")
 
     def _rotate_selected_items_90(self):
         """Rotates selected ConnectableItems by 90 degrees."""
@@ -1680,148 +1463,162 @@ class PropertyPanel(QWidget):
         super().__init__(parent)
         self._setup_ui()
 
+    # Panel class, attribute name, tab title and the Selection bucket that decides whether the tab is shown
+    panel_types = [
+        (properties.ConnectableProperties, 'connectable_properties', "s223.Connectable", 'getEquipment'),
+        (properties.ConnectionPointProperties, 'connection_point_properties', "s223.ConnectionPoint",
+         'getConnectionPoint'),
+        (properties.ConnectionProperties, 'connection_properties', "s223.Connection", 'getConnection'),
+        (properties.SystemProperties, 'system_properties', "s223.System", 'getSystem'),
+        (properties.PhysicalSpaceProperties, 'physical_space_properties', "s223.PhysicalSpace", 'getPhysicalSpace'),
+        (properties.DomainSpaceProperties, 'domain_space_properties', "s223.DomainSpace", 'getDomainSpace'),
+        (properties.PropertyProperties, 'property_properties', "s223.Property", 'getProperty'),
+    ]
+
     def _setup_ui(self):
         layout = QVBoxLayout(self)
 
         self.tabs = QTabWidget()
 
-        self.connectable_widget = QWidget()
-        self.connection_point_widget = QWidget()
-        self.connection_widget = QWidget()
-        self.system_widget = QWidget()
-        self.physical_space_widget = QWidget()
-        self.domain_space_widget = QWidget()
-        self.property_widget = QWidget()
-
-        self.connectable_layout = QVBoxLayout(self.connectable_widget)
-        self.connection_point_layout = QVBoxLayout(self.connection_point_widget)
-        self.connection_layout = QVBoxLayout(self.connection_widget)
-        self.system_layout = QVBoxLayout(self.system_widget)
-        self.physical_space_layout = QVBoxLayout(self.physical_space_widget)
-        self.domain_space_layout = QVBoxLayout(self.domain_space_widget)
-        self.property_layout = QVBoxLayout(self.property_widget)
-
-        self.connectable_properties = properties.ConnectableProperties()
-        self.connection_properties = properties.ConnectionProperties()
-        self.connection_point_properties = properties.ConnectionPointProperties()
-        self.system_properties = properties.SystemProperties()
-        self.physical_space_properties = properties.PhysicalSpaceProperties()
-        self.domain_space_properties = properties.DomainSpaceProperties()
-        self.property_properties = properties.PropertyProperties()
-
-        self.connectable_layout.addLayout(self.connectable_properties)
-        self.connectable_layout.addStretch(1)
-        self.connection_point_layout.addLayout(self.connection_point_properties)
-        self.connection_point_layout.addStretch(1)
-        self.connection_layout.addLayout(self.connection_properties)
-        self.connection_layout.addStretch(1)
-        self.system_layout.addLayout(self.system_properties)
-        self.system_layout.addStretch(1)
-        self.physical_space_layout.addLayout(self.physical_space_properties)
-        self.physical_space_layout.addStretch(1)
-        self.domain_space_layout.addLayout(self.domain_space_properties)
-        self.domain_space_layout.addStretch(1)
-        self.property_layout.addLayout(self.property_properties)
-        self.property_layout.addStretch(1)
-
-        self.tabs.addTab(self.connectable_widget, "s223.Connectable")
-        self.tabs.addTab(self.connection_point_widget, "s223.ConnectionPoint")
-        self.tabs.addTab(self.connection_widget, "s223.Connection")
-        self.tabs.addTab(self.system_widget, "s223.System")
-        self.tabs.addTab(self.physical_space_widget, "s223.PhysicalSpace")
-        self.tabs.addTab(self.domain_space_widget, "s223.DomainSpace")
-        self.tabs.addTab(self.property_widget, "s223.Property")
+        # The tabs start out empty; each panel is built the first time its tab has something to show
+        self._panels = [None] * len(self.panel_types)
+        for _, _, title, _ in self.panel_types:
+            tab = QWidget()
+            QVBoxLayout(tab)
+            self.tabs.addTab(tab, title)
+
+        self._buckets = [Selection() for _ in self.panel_types]  # the part of the selection each panel shows
+        self._dirty = set()
+        self.command_history = None  # set by the Canvas; commands may change what the panels show
+        self._revision = None
+        self.tabs.currentChanged.connect(self._refresh_panel)
 
         layout.addWidget(self.tabs)
 
         self.setMinimumWidth(250)
         self.setLayout(layout)
 
+    def _panel(self, index: int):
+        """The panel of tab `index`, built on first use."""
+
+        panel = self._panels[index]
+        if panel is None:
+            panel_type, attribute, _, _ = self.panel_types[index]
+            with Instrumentation.profile('panel', panel_type.__name__) as profile, profile.measure('construct'):
+                panel = self._panels[index] = panel_type()
+                setattr(self, attribute, panel)
+
+                tab_layout = self.tabs.widget(index).layout()
+                tab_layout.addLayout(panel)
+                tab_layout.addStretch(1)
+        return panel
+
     def update_properties(self, selected_items: Selection):
 
-        connectables = selected_items.getConnectable
-        connections = selected_items.getConnection
-        connection_points = selected_items.getConnectionPoint
-        systems = selected_items.getSystem
-        physical_spaces = selected_items.getPhysicalSpace
-        domain_spaces = selected_items.getDomainSpace
-        properties = selected_items.getProperty
-
-        equipment = Selection([item for item in connectables if not isinstance(item, (DomainSpace, PhysicalSpace))])
-
-        has_equipment = len(equipment) >= 1
-        has_connections = len(connections) >= 1
-        has_connection_points = len(connection_points) >= 1
-        has_systems = len(systems) >= 1
-        has_physical_spaces = len(physical_spaces) >= 1
-        has_domain_spaces = len(domain_spaces) >= 1
-        has_properties = len(properties) >= 1
-
-        self.connectable_properties.update_properties(equipment)
-        # self.tabs.setTabEnabled(0, has_equipment)
-        self.tabs.setTabVisible(0, has_equipment)
-
-        self.connection_point_properties.update_properties(connection_points)
-        self.tabs.setTabVisible(1, has_connection_points)
-
-        self.connection_properties.update_properties(connections)
-        self.tabs.setTabVisible(2, has_connections)
-
-        self.system_properties.update_properties(systems)
-        self.tabs.setTabVisible(3, has_systems)
-
-        self.physical_space_properties.update_properties(physical_spaces)
-        self.tabs.setTabVisible(4, has_physical_spaces)
-
-        self.domain_space_properties.update_properties(domain_spaces)
-        self.tabs.setTabVisible(5, has_domain_spaces)
-
-        self.property_properties.update_properties(properties)
-        self.tabs.setTabVisible(6, has_properties)
-
-        if has_properties:
-            self.tabs.setCurrentIndex(6)
-        elif has_domain_spaces:
-            self.tabs.setCurrentIndex(5)
-        elif has_equipment:
-            self.tabs.setCurrentIndex(0)
-        elif has_connection_points:
-            self.tabs.setCurrentIndex(1)
-        elif has_connections:
-            self.tabs.setCurrentIndex(2)
-        elif has_systems:
-            self.tabs.setCurrentIndex(3)
-        elif has_physical_spaces:
-            self.tabs.setCurrentIndex(4)
-        else:
-            pass
+        self._buckets = [getattr(selected_items, bucket) for _, _, _, bucket in self.panel_types]
+        self._dirty = set(range(self.tabs.count()))
+        self._revision = self.command_history.revision if self.command_history is not None else None
+
+        visible = [len(bucket) >= 1 for bucket in self._buckets]
+
+        # Hiding tabs moves the current tab across the others; only the final one is refreshed below
+        self.tabs.blockSignals(True)
+        for index, panel in enumerate(self._panels):
+            self.tabs.setTabVisible(index, visible[index])
+
+            # Hidden panels are refreshed once their tab is shown again; just let go of the old items.
+            if not visible[index] and panel is not None and panel.selected_items:
+                panel.update_properties(self._buckets[index])
+                self._dirty.discard(index)
+
+        # Same priority as before: property, domain space, equipment, connection point, ...
+        for index in (6, 5, 0, 1, 2, 3, 4):
+            if visible[index]:
+                self.tabs.setCurrentIndex(index)
+                break
+        self.tabs.blockSignals(False)
+
+        self._refresh_panel(self.tabs.currentIndex())
+
+    def _refresh_panel(self, index: int):
+        """Bring the panel of tab `index` up to date, if the selection or model changed since it was last shown."""
+
+        # An undo/redo or edit since the last refresh may have changed the selected items' values
+        revision = self.command_history.revision if self.command_history is not None else None
+        if revision != self._revision:
+            self._revision = revision
+            self._dirty = set(range(self.tabs.count()))
+
+        if index not in self._dirty or not self.tabs.isTabVisible(index):
+            return
+
+        self._dirty.discard(index)
+        self._panel(index).update_properties(self._buckets[index])
+
+    def refresh(self):
+        """Show the current values of the selected items, e.g. after an undo."""
+        self._refresh_panel(self.tabs.currentIndex())
 
 
 class DiagramApplication(QMainWindow):
-    def __init__(self):
+    def __init__(self, startup: Profile = None):
         super().__init__()
         self.setWindowTitle("Building Systems Design with Brick and REC Ontologies")
 
+        # Published once the canvas has painted its first frame, see eventFilter
+        self.startup = startup or Profile('startup', 'application')
+
         self._setup_ui()
-        self.showMaximized()
+        with self.startup.measure('show window'):
+            self.showMaximized()
         self.setAcceptDrops(True)
 
+        self._shown = time.perf_counter()
+        self.canvas.viewport().installEventFilter(self)
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Paint and watched is self.canvas.viewport():
+            watched.removeEventFilter(self)
+            # The filter runs before the paint; finish once the event loop is idle again
+            QTimer.singleShot(0, self._finish_startup)
+        return super().eventFilter(watched, event)
+
+    def _finish_startup(self):
+        self.startup.add('first paint', time.perf_counter() - self._shown)
+        Instrumentation.publish(self.startup)
+
     def _output_to_status_bar(self, text: str):
         self.statusBar().showMessage(text)
 
     def _setup_ui(self):
-        self._setup_entity_browser()
-        self._setup_property_panel()
-        self._setup_canvas()
-        self._setup_menu_bar()
-        self._setup_toolbar()
+        for name, setup in (
+                ('entity browser', self._setup_entity_browser),
+                ('property panel', self._setup_property_panel),
+                ('canvas', self._setup_canvas),
+                ('menu bar', self._setup_menu_bar),
+                ('toolbar', self._setup_toolbar),
+        ):
+            with self.startup.measure(f"setup {name}"):
+                setup()
         self._output_to_status_bar("Ready")
 
     def _setup_entity_browser(self):
         entity_tree = EntityBrowser()
+
+        entity_search = QLineEdit()
+        entity_search.setPlaceholderText("Search entities...")
+        entity_search.setClearButtonEnabled(True)
+        entity_search.textChanged.connect(entity_tree.filter_entities)
+
+        entity_widget = QWidget()
+        entity_layout = QVBoxLayout(entity_widget)
+        entity_layout.setContentsMargins(0, 0, 0, 0)
+        entity_layout.addWidget(entity_search)
+        entity_layout.addWidget(entity_tree)
+
         entity_dock = QDockWidget("Entities", self)
         entity_dock.setAllowedAreas(Qt.LeftDockWidgetArea | Qt.RightDockWidgetArea)
-        entity_dock.setWidget(entity_tree)
+        entity_dock.setWidget(entity_widget)
         self.addDockWidget(Qt.LeftDockWidgetArea, entity_dock)
 
     def _setup_property_panel(self):
@@ -1889,11 +1686,120 @@ class DiagramApplication(QMainWindow):
         delete_action.setShortcut("Delete")
         delete_action.triggered.connect(self.canvas._delete_selected_items)
 
+        edit_menu.addSeparator()
+
+        select_menu = edit_menu.addMenu("Select")
+
+        select_all_action = select_menu.addAction("All")
+        select_all_action.setShortcut("Ctrl+A")
+        select_all_action.triggered.connect(self.canvas._select_all_items)
+
+        select_menu.addSeparator()
+
+        for kind, name in (
+                ('equipment', "Equipment"),
+                ('domain_space', "Domain Spaces"),
+                ('physical_space', "Physical Spaces"),
+                ('connection', "Connections"),
+                ('system', "Systems"),
+        ):
+            action = select_menu.addAction(f"All {name}")
+            action.triggered.connect(lambda checked, kind=kind, name=name: self.canvas._select_kind(kind, name.lower()))
+
+        select_menu.addSeparator()
+
+        same_type_action = select_menu.addAction("Same Type")
+        same_type_action.triggered.connect(self.canvas._select_same_type)
+
+        same_medium_action = select_menu.addAction("Same Medium")
+        same_medium_action.triggered.connect(self.canvas._select_same_medium)
+
+        system_members_action = select_menu.addAction("System Members")
+        system_members_action.triggered.connect(self.canvas._select_system_members)
+
+        space_contents_action = select_menu.addAction("Physical Space Contents")
+        space_contents_action.triggered.connect(self.canvas._select_physical_space_contents)
+
+        view_menu = menu_bar.addMenu("View")
+
+        self.hud_action = view_menu.addAction("Performance Overlay")
+        self.hud_action.setShortcut("Ctrl+Shift+H")
+        self.hud_action.setCheckable(True)
+        self.hud_action.triggered.connect(self._toggle_hud)
+
+        view_menu.addSeparator()
+
+        for kind, name in (('load', "Load"), ('save', "Save"), ('paste', "Paste"), ('startup', "Startup")):
+            action = view_menu.addAction(f"Last {name} Profile...")
+            action.triggered.connect(lambda checked, kind=kind, name=name: self._show_profile(kind, name))
+
+        view_menu.addSeparator()
+
+        self.command_profile_action = view_menu.addAction("Record Command Timings")
+        self.command_profile_action.setCheckable(True)
+        self.command_profile_action.triggered.connect(self._toggle_command_profiler)
+
+        export_command_profile_action = view_menu.addAction("Export Command Timings...")
+        export_command_profile_action.triggered.connect(self._export_command_profile)
+
+        view_menu.addSeparator()
+
+        query_console_action = view_menu.addAction("SPARQL Console")
+        query_console_action.setShortcut("Ctrl+Shift+Q")
+        query_console_action.triggered.connect(self._show_query_console)
+
+    def _show_profile(self, kind: str, name: str):
+        dialog = ProfileDialog(Instrumentation.last(kind), f"Last {name} Profile", self)
+        dialog.exec_()
+
     def _toggle_grid(self):
         enable = self.grid_action.isChecked()
         self.canvas.toggle_grid(enable)
         self._output_to_status_bar(f"Grid {'enabled' if enable else 'disabled'}")
 
+    def _toggle_command_profiler(self):
+        history = self.canvas.command_history
+        if self.command_profile_action.isChecked():
+            scene = self.canvas.scene
+            # Carry on with the samples recorded before recording was last stopped
+            history.profiler = history.profiler or getattr(self, 'last_command_profiler', None) or \
+                CommandProfiler(scene_size=lambda: len(scene.item_index))
+            self._output_to_status_bar("Recording command timings")
+        else:
+            # Keep the recorded samples around for export; just stop adding to them
+            self.last_command_profiler, history.profiler = history.profiler, None
+            self._output_to_status_bar("Stopped recording command timings")
+
+    def _export_command_profile(self):
+        profiler = self.canvas.command_history.profiler or getattr(self, 'last_command_profiler', None)
+        if profiler is None:
+            self._output_to_status_bar("No command timings recorded")
+            return
+
+        filepath, _ = QFileDialog.getSaveFileName(
+            self, "Export Command Timings", os.path.join(os.getcwd(), "command_timings.json"),
+            "JSON Files (*.json);;All Files (*)"
+        )
+        if filepath:
+            profiler.export(filepath)
+            self._output_to_status_bar(f"Command timings exported to {filepath}")
+
+    def _show_query_console(self):
+        # Built on first use, like the property panels
+        if getattr(self, 'query_dock', None) is None:
+            self.query_dock = QDockWidget("SPARQL Console", self)
+            self.query_dock.setWidget(QueryConsole(self.canvas))
+            self.addDockWidget(Qt.BottomDockWidgetArea, self.query_dock)
+
+        self.query_dock.show()
+        self.query_dock.raise_()
+        self.query_dock.widget().editor.setFocus()
+
+    def _toggle_hud(self):
+        enable = self.hud_action.isChecked()
+        self.canvas.hud.set_enabled(enable)
+        self._output_to_status_bar(f"Performance overlay {'shown' if enable else 'hidden'}")
+
     def _toggle_location_lines(self):
         # Ensure the scene is the correct type and the action exists
         if isinstance(self.canvas.scene, DiagramScene) and hasattr(self, 'location_line_action'):
@@ -1910,11 +1816,13 @@ class DiagramApplication(QMainWindow):
     def _undo(self):
         if self.canvas.command_history.undo():
             self._output_to_status_bar("Undo")
+            self.property_panel.refresh()
             self.canvas.update()
 
     def _redo(self):
         if self.canvas.command_history.redo():
             self._output_to_status_bar("Redo")
+            self.property_panel.refresh()
             self.canvas.update()
 
     def _zoom_in(self):
@@ -0,0 +1,237 @@
+"""Headless performance benchmark of the editor on generated models.
+
+    python -m open223Builder.benchmark --rooms 50 --circuits 100 --properties 300 -o results.json
+
+Each repeat loads a fresh window with the generated model and times loading, saving,
+select-all, copy/paste, undo/redo, delete and a scripted mouse drag. The JSON output holds
+every run plus min/median per step, so results from different commits can be compared.
+"""
+
+import os
+import sys
+import io
+import json
+import time
+import logging
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import contextlib
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import Qt, QEvent, QPoint, QT_VERSION_STR, PYQT_VERSION_STR
+from PyQt5.QtGui import QMouseEvent
+from PyQt5.QtWidgets import QApplication
+
+from open223Builder.generator import generate_model
+
+
+DRAG_STEPS = 30
+DRAG_DISTANCE = 150
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+class Timer:
+    """Collects wall-clock timings per step name over several runs."""
+
+    def __init__(self, app: QApplication, quiet: bool = True):
+        self.app = app
+        self.quiet = quiet
+        self.runs: dict = {}
+
+    # Loggers the editor reports through; "open223Builder.io" is listed as main.py sets its level explicitly
+    loggers = ("open223Builder", "open223Builder.io")
+
+    @contextlib.contextmanager
+    def _silenced(self):
+        """Keep the editor's output out of the timings unless asked for: its stdout, and its log below ERROR."""
+
+        if not self.quiet:
+            yield
+            return
+
+        loggers = [logging.getLogger(name) for name in self.loggers]
+        levels = [logger.level for logger in loggers]
+        for logger in loggers:
+            logger.setLevel(logging.ERROR)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                yield
+        finally:
+            for logger, level in zip(loggers, levels):
+                logger.setLevel(level)
+
+    @contextlib.contextmanager
+    def __call__(self, name: str):
+        with self._silenced():
+            start = time.perf_counter()
+            yield
+            self.app.processEvents()  # let queued updates (timers, repaints) settle inside the step
+            elapsed = time.perf_counter() - start
+        self.runs.setdefault(name, []).append(elapsed)
+
+    def summary(self) -> dict:
+        return {
+            name: {"min": min(runs), "median": statistics.median(runs), "runs": runs}
+            for name, runs in self.runs.items()
+        }
+
+
+def _send_mouse(view, event_type, pos: QPoint, button, buttons):
+    event = QMouseEvent(event_type, pos, view.viewport().mapToGlobal(pos), button, buttons, Qt.NoModifier)
+    QApplication.sendEvent(view.viewport(), event)
+
+
+def scripted_drag(view, item, steps: int = DRAG_STEPS, distance: int = DRAG_DISTANCE):
+    """Press on `item`, move the mouse `distance` pixels right in `steps` steps and release."""
+
+    view.centerOn(item)
+    start = view.mapFromScene(item.sceneBoundingRect().center())
+
+    _send_mouse(view, QEvent.MouseButtonPress, start, Qt.LeftButton, Qt.LeftButton)
+    for step in range(1, steps + 1):
+        pos = start + QPoint(distance * step // steps, 0)
+        _send_mouse(view, QEvent.MouseMove, pos, Qt.NoButton, Qt.LeftButton)
+    _send_mouse(view, QEvent.MouseButtonRelease, start + QPoint(distance, 0), Qt.LeftButton, Qt.NoButton)
+
+
+def run_once(app: QApplication, model_path: str, timer: Timer, profiler=None) -> dict:
+    """One full scenario on a fresh window; returns item counts of the loaded model.
+
+    Commands pushed, undone and redone along the way are recorded into `profiler`.
+    """
+
+    from open223Builder.app.window import DiagramApplication, load_from_turtle, save_to_turtle
+    from open223Builder.app.commands import CommandProfiler
+
+    window = DiagramApplication()
+    window.resize(1600, 1000)
+    window.show()
+    canvas = window.canvas
+    scene = canvas.scene
+    history = canvas.command_history
+    history.profiler = profiler or CommandProfiler()
+    history.profiler.scene_size = lambda: len(scene.item_index)
+
+    with timer("load"):
+        load_from_turtle(scene, model_path)
+
+    counts = {kind: len(scene.item_index.of(kind)) for kind in (
+        'equipment', 'domain_space', 'physical_space', 'connection_point', 'connection', 'property', 'system')}
+    counts['total'] = len(scene.item_index)
+
+    with tempfile.TemporaryDirectory() as directory:
+        with timer("save"):
+            save_to_turtle(scene, os.path.join(directory, "saved.ttl"))
+
+    with timer("select_all"):
+        canvas._select_all_items()
+
+    with timer("copy"):
+        canvas._copy_selected_items()
+
+    with timer("paste"):
+        canvas._paste_items()
+
+    with timer("undo_paste"):
+        history.undo()
+
+    with timer("redo_paste"):
+        history.redo()
+
+    with timer("delete"):
+        canvas._delete_selected_items()
+
+    with timer("undo_delete"):
+        history.undo()
+
+    scene.clearSelection()
+    equipment = scene.item_index.of('equipment')
+    if equipment:
+        with timer("drag"):
+            scripted_drag(canvas, equipment[len(equipment) // 2])
+
+    window.close()
+    window.deleteLater()
+    app.processEvents()
+
+    return counts
+
+
+def run_benchmark(rooms: int, circuits: int, properties: int, repeat: int = 3, seed: int = 0,
+                  quiet: bool = True) -> dict:
+    app = QApplication.instance() or QApplication(sys.argv)
+    timer = Timer(app, quiet)
+
+    with tempfile.TemporaryDirectory() as directory:
+        model_path = os.path.join(directory, "model.ttl")
+
+        start = time.perf_counter()
+        g = generate_model(rooms, circuits, properties, seed=seed)
+        g.serialize(destination=model_path, format="turtle")
+        generate_time = time.perf_counter() - start
+
+        from open223Builder.app.commands import CommandProfiler
+        profiler = CommandProfiler()
+
+        counts = {}
+        for _ in range(repeat):
+            counts = run_once(app, model_path, timer, profiler)
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "qt": QT_VERSION_STR,
+            "pyqt": PYQT_VERSION_STR,
+            "platform": platform.platform(),
+        },
+        "parameters": {
+            "rooms": rooms, "circuits": circuits, "properties": properties, "repeat": repeat, "seed": seed,
+            "triples": len(g), "generate_time": generate_time,
+        },
+        "counts": counts,
+        "timings": timer.summary(),
+        "commands": profiler.summary(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark open223Builder on a generated model (headless).")
+    parser.add_argument("--rooms", type=int, default=20)
+    parser.add_argument("--circuits", type=int, default=40)
+    parser.add_argument("--properties", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="keep the editor's own output")
+    parser.add_argument("-o", "--output", help="write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.rooms, args.circuits, args.properties, args.repeat, args.seed,
+                            quiet=not args.verbose)
+
+    print(f"{results['counts'].get('total', 0)} items, {results['parameters']['triples']} triples")
+    for name, timing in results["timings"].items():
+        print(f"{name:>12}: {timing['median'] * 1000:9.1f} ms (min {timing['min'] * 1000:.1f} ms)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
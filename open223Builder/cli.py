@@ -0,0 +1,321 @@
+"""Headless batch processing of model files.
+
+    python -m open223Builder stats models/
+    python -m open223Builder validate --strict a.ttl b.ttl
+    python -m open223Builder normalize --in-place models/
+    python -m open223Builder convert --to json-ld -o out/ models/
+
+Files are processed in parallel across a process pool (--jobs). Nothing here imports Qt.
+"""
+
+import os
+import sys
+import json
+import argparse
+
+from pathlib import Path
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import rdflib
+from rdflib.compare import to_canonical_graph
+from rdflib.util import guess_format
+
+from open223Builder.ontology.namespaces import S223, VISU, RDF, bind_namespaces, to_label
+from open223Builder.library import connection_point_library, connection_library, property_library
+from open223Builder.ontology.resolver import type_resolver
+
+
+FORMATS = {
+    'turtle': '.ttl',
+    'nt': '.nt',
+    'json-ld': '.jsonld',
+}
+
+SPACE_TYPES = {S223.PhysicalSpace, S223.DomainSpace}
+
+# Categories reported by `stats`, in the same split the editor loads the model in
+CATEGORIES = (
+    ('physical_spaces', lambda t: t == S223.PhysicalSpace),
+    ('domain_spaces', lambda t: t == S223.DomainSpace),
+    ('equipment', lambda t: type_resolver.is_equipment(t)),
+    ('connection_points', lambda t: t in connection_point_library),
+    ('connections', lambda t: t in connection_library),
+    ('properties', lambda t: t in property_library),
+    ('systems', lambda t: t == S223.System),
+)
+
+
+def read_graph(path) -> rdflib.Graph:
+    return rdflib.Graph().parse(str(path), format=guess_format(str(path)) or "turtle")
+
+
+def graph_stats(g: rdflib.Graph) -> dict:
+    """Triple count, instance counts per category and per rdf:type."""
+
+    types = Counter(o for o in g.objects(None, RDF.type))
+    categories = {name: sum(n for t, n in types.items() if accepts(t)) for name, accepts in CATEGORIES}
+
+    return {
+        'triples': len(g),
+        'categories': categories,
+        'types': {to_label(t) or str(t): n for t, n in sorted(types.items(), key=lambda entry: (-entry[1], entry[0]))},
+    }
+
+
+def validate_graph(g: rdflib.Graph) -> list:
+    """Structural problems the editor would skip or warn about while loading, as (severity, subject, message)."""
+
+    problems = []
+
+    def report(severity, subject, message):
+        problems.append((severity, str(subject), message))
+
+    def types_of(uri) -> set:
+        return set(g.objects(uri, RDF.type))
+
+    def is_connectable(uri) -> bool:
+        return any(type_resolver.is_equipment(t) or t == S223.DomainSpace for t in types_of(uri))
+
+    known_types = SPACE_TYPES | {S223.System} | \
+                  set(connection_point_library) | set(connection_library) | set(property_library)
+
+    for subject, item_type in g.subject_objects(RDF.type):
+        equipment = type_resolver.is_equipment(item_type)
+        if not equipment and item_type not in known_types:
+            report('warning', subject, f"unknown type {to_label(item_type)}, not loaded")
+        elif (equipment or item_type in SPACE_TYPES) and \
+                (g.value(subject, VISU.positionX) is None or g.value(subject, VISU.positionY) is None):
+            report('warning', subject, "no position")
+
+    # Connection points need a connectable parent
+    for cp in set(g.subjects(RDF.type, None)):
+        if not types_of(cp) & set(connection_point_library):
+            continue
+        parent = g.value(cp, S223.isConnectionPointOf)
+        if parent is None:
+            report('error', cp, "connection point without s223:isConnectionPointOf")
+        elif not is_connectable(parent):
+            report('error', cp, f"parent {parent} is not a connectable item")
+
+    # Connections need two compatible, otherwise unconnected connection points
+    connections_at = Counter()
+    for conn in set(g.subjects(RDF.type, None)):
+        if not types_of(conn) & set(connection_library):
+            continue
+        points = list(g.objects(conn, S223.connectsAt))
+        if len(points) < 2:
+            report('error', conn, f"connection with {len(points)} s223:connectsAt point(s)")
+            continue
+        for point in points:
+            connections_at[point] += 1
+            if not types_of(point) & set(connection_point_library):
+                report('error', conn, f"connects at {point}, which is not a connection point")
+
+        source, target = points[:2]
+        source_types, target_types = types_of(source), types_of(target)
+        if g.value(source, S223.hasMedium) != g.value(target, S223.hasMedium):
+            report('warning', conn, "connection points have different media")
+        elif source_types == target_types and S223.BidirectionalConnectionPoint not in source_types:
+            report('warning', conn, "connects two connection points of the same direction")
+        elif (S223.BidirectionalConnectionPoint in source_types) != (S223.BidirectionalConnectionPoint in target_types):
+            report('warning', conn, "connects a bidirectional with a directed connection point")
+
+    for point, count in connections_at.items():
+        if count > 1:
+            report('error', point, f"connection point used by {count} connections")
+
+    # Properties need a connectable or connection point parent
+    for prop in set(g.subjects(RDF.type, None)):
+        if not types_of(prop) & set(property_library):
+            continue
+        parents = list(g.subjects(S223.hasProperty, prop))
+        if not parents:
+            report('warning', prop, "property without a parent (s223:hasProperty)")
+        for parent in parents:
+            if not (is_connectable(parent) or types_of(parent) & set(connection_point_library)):
+                report('error', prop, f"parent {parent} is neither a connectable item nor a connection point")
+
+    # Containment, enclosure, location and membership
+    for container, contained in g.subject_objects(S223.contains):
+        container_space = S223.PhysicalSpace in types_of(container)
+        contained_space = S223.PhysicalSpace in types_of(contained)
+        if container_space != contained_space or \
+                (not container_space and not (is_connectable(container) and is_connectable(contained))):
+            report('warning', container, f"invalid s223:contains relationship with {contained}")
+
+    for container, enclosed in g.subject_objects(S223.encloses):
+        if S223.PhysicalSpace not in types_of(container) or S223.DomainSpace not in types_of(enclosed):
+            report('warning', container, f"invalid s223:encloses relationship with {enclosed}")
+
+    for item, location in g.subject_objects(S223.hasPhysicalLocation):
+        if S223.PhysicalSpace not in types_of(location):
+            report('warning', item, f"physical location {location} is not a physical space")
+
+    for system, member in g.subject_objects(S223.hasMember):
+        if not any(type_resolver.is_equipment(t) for t in types_of(member)):
+            report('warning', system, f"member {member} is not equipment")
+
+    return sorted(problems)
+
+
+def normalize_graph(g: rdflib.Graph) -> rdflib.Graph:
+    """The same triples with canonical blank node labels and the editor's prefixes, for stable output."""
+
+    normalized = rdflib.Graph()
+    bind_namespaces(normalized)
+    for triple in (to_canonical_graph(g) if any(isinstance(node, rdflib.BNode) for t in g for node in t) else g):
+        normalized.add(triple)
+    return normalized
+
+
+def output_path(path: Path, output_dir, suffix: str, root: Path = None) -> Path:
+    """Where the result for `path` goes: next to it, or mirrored under `output_dir` relative to `root`."""
+
+    target = path.with_suffix(suffix)
+    if output_dir:
+        relative = path.relative_to(root) if root and root in path.parents else Path(path.name)
+        target = Path(output_dir) / relative.with_suffix(suffix)
+        target.parent.mkdir(parents=True, exist_ok=True)
+    return target
+
+
+def process_file(task: tuple) -> dict:
+    """Run one subcommand on one file; executed in the worker processes."""
+
+    command, path, root, options = task
+    path = Path(path)
+    result = {'path': str(path)}
+
+    try:
+        g = read_graph(path)
+
+        if command == 'stats':
+            result.update(graph_stats(g))
+
+        elif command == 'validate':
+            result['problems'] = validate_graph(g)
+
+        elif command == 'normalize':
+            target = path if options['in_place'] else output_path(path, options['output'], '.ttl', root)
+            normalize_graph(g).serialize(destination=str(target), format='turtle', encoding="utf-8")
+            result['output'] = str(target)
+
+        elif command == 'convert':
+            target = output_path(path, options['output'], FORMATS[options['to']], root)
+            if target == path:
+                raise ValueError("input and output are the same file")
+            normalize_graph(g).serialize(destination=str(target), format=options['to'], encoding="utf-8")
+            result['output'] = str(target)
+
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+
+    return result
+
+
+def collect_files(paths, pattern: str) -> list:
+    """(file, root) pairs for the given files and the files matching `pattern` below the given directories."""
+
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend((file, path) for file in sorted(path.rglob(pattern)) if file.is_file())
+        else:
+            files.append((path, path.parent))
+    return files
+
+
+def run(command: str, files: list, options: dict, jobs: int) -> list:
+    tasks = [(command, str(path), root, options) for path, root in files]
+    if jobs <= 1 or len(tasks) <= 1:
+        return [process_file(task) for task in tasks]
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(process_file, tasks, chunksize=max(1, len(tasks) // (jobs * 4))))
+
+
+def print_results(command: str, results: list):
+    total = Counter()
+    for result in results:
+        path = result['path']
+        if 'error' in result:
+            print(f"{path}: error: {result['error']}")
+            continue
+
+        if command == 'stats':
+            counts = ", ".join(f"{name} {n}" for name, n in result['categories'].items() if n)
+            print(f"{path}: {result['triples']} triples; {counts}")
+            total.update(result['categories'])
+            total['triples'] += result['triples']
+
+        elif command == 'validate':
+            for severity, subject, message in result['problems']:
+                print(f"{path}: {severity}: {subject}: {message}")
+            if not result['problems']:
+                print(f"{path}: ok")
+
+        else:
+            print(f"{path} -> {result['output']}")
+
+    if command == 'stats' and len(results) > 1:
+        print(f"total: {total.pop('triples', 0)} triples; " + ", ".join(f"{name} {n}" for name, n in total.items()))
+
+
+def exit_code(command: str, results: list, strict: bool = False) -> int:
+    if any('error' in result for result in results):
+        return 1
+    if command == 'validate':
+        failing = {'error', 'warning'} if strict else {'error'}
+        if any(severity in failing for result in results for severity, _, _ in result['problems']):
+            return 1
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m open223Builder", description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add_command(name, help):
+        command = commands.add_parser(name, help=help)
+        command.add_argument('paths', nargs='+', help="model files or directories to search")
+        command.add_argument('--pattern', default="*.ttl", help="file pattern inside directories (default: *.ttl)")
+        command.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help="worker processes")
+        command.add_argument('--json', action='store_true', help="print the results as JSON")
+        return command
+
+    add_command('stats', "count the entities by type")
+
+    validate = add_command('validate', "check the model structure")
+    validate.add_argument('--strict', action='store_true', help="fail on warnings too")
+
+    normalize = add_command('normalize', "re-serialize as deterministic Turtle")
+    target = normalize.add_mutually_exclusive_group(required=True)
+    target.add_argument('-o', '--output', help="output directory")
+    target.add_argument('--in-place', action='store_true', help="overwrite the input files")
+
+    convert = add_command('convert', "convert between Turtle, N-Triples and JSON-LD")
+    convert.add_argument('--to', choices=sorted(FORMATS), required=True)
+    convert.add_argument('-o', '--output', help="output directory (default: next to the input)")
+
+    args = parser.parse_args(argv)
+
+    options = {
+        'output': getattr(args, 'output', None),
+        'in_place': getattr(args, 'in_place', False),
+        'to': getattr(args, 'to', None),
+    }
+    files = collect_files(args.paths, args.pattern)
+    if not files:
+        print("No input files found", file=sys.stderr)
+        return 1
+
+    results = run(args.command, files, options, args.jobs)
+    strict = getattr(args, 'strict', False)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_results(args.command, results)
+
+    return exit_code(args.command, results, strict)
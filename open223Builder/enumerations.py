@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Dict
 from rdflib import URIRef
 from open223Builder.ontology.namespaces import S223, QUDT, QUDTQK, QUDTU
 
@@ -9,6 +9,8 @@ __all__ = [
     "aspects",
     "units",
     "quantity_kinds",
+    "legacy_terms",
+    "corrected",
 ]
 
 
@@ -19,9 +21,7 @@ domains: List[URIRef] = [
     S223['Domain-Occupancy'],
     S223['Domain-Plumbing'],
     S223['Domain-Refrigeration'],
-    S223['Domain-Electrical'],
     S223['Domain-FireProtection'],
-    S223['Domain-Plumbing'],
 ]
 
 roles: List[URIRef] = [
@@ -48,24 +48,24 @@ roles: List[URIRef] = [
 ]
 
 aspects: List[URIRef] = [
-    S223['s223.Aspect-Alarm'],
-    S223['s223.Aspect-CatalogNumber'],
-    S223['s223.Aspect-Deadband'],
-    S223['s223.Aspect-Delta'],
-    S223['s223.Aspect-Fault'],
-    S223['s223.Aspect-HighLimit'],
-    S223['s223.Aspect-LowLimit'],
-    S223['s223.Aspect-Manufacturer'],
-    S223['s223.Aspect-Maximum'],
-    S223['s223.Aspect-Minimum'],
-    S223['s223.Aspect-Model'],
-    S223['s223.Aspect-Nominal'],
-    S223['s223.Aspect-OperatingMode'],
-    S223['s223.Aspect-OperatingStatus'],
-    S223['s223.Aspect-Rated'],
-    S223['s223.Aspect-SerialNumber'],
-    S223['s223.Aspect-Setpoint'],
-    S223['s223.Aspect-Threshold'],
+    S223['Aspect-Alarm'],
+    S223['Aspect-CatalogNumber'],
+    S223['Aspect-Deadband'],
+    S223['Aspect-Delta'],
+    S223['Aspect-Fault'],
+    S223['Aspect-HighLimit'],
+    S223['Aspect-LowLimit'],
+    S223['Aspect-Manufacturer'],
+    S223['Aspect-Maximum'],
+    S223['Aspect-Minimum'],
+    S223['Aspect-Model'],
+    S223['Aspect-Nominal'],
+    S223['Aspect-OperatingMode'],
+    S223['Aspect-OperatingStatus'],
+    S223['Aspect-Rated'],
+    S223['Aspect-SerialNumber'],
+    S223['Aspect-Setpoint'],
+    S223['Aspect-Threshold'],
 ]
 
 units: List[URIRef] = [
@@ -77,9 +77,9 @@ units: List[URIRef] = [
     QUDTU.KiloW,         # Kilowatt
     QUDTU.PA,            # Pascal
     QUDTU.V,             # Volt
-    QUDTU.Percent,       # Percent
+    QUDTU.PERCENT,       # Percent
     QUDTU['KiloW-HR'],   # Kilowatt-hour
-    QUDTU.Watt,          # Watt
+    QUDTU.W,             # Watt
 ]
 
 quantity_kinds: List[URIRef] = [
@@ -103,13 +103,27 @@ quantity_kinds: List[URIRef] = [
     QUDTQK.Energy,
     QUDTQK.EnergyPerUnitArea,
 
-    QUDTQK.Lenghth,
+    QUDTQK.Length,
     QUDTQK.Area,
     QUDTQK.Volume,
 ]
 
 
+# Misspelled terms earlier versions wrote to model files, mapped to the correct ones
+legacy_terms: Dict[URIRef, URIRef] = {
+    **{S223[f's223.{aspect[len(S223):]}']: aspect for aspect in aspects},
+    QUDTU.Percent: QUDTU.PERCENT,
+    QUDTU.Watt: QUDTU.W,
+    QUDTQK.Lenghth: QUDTQK.Length,
+}
+
+
+def corrected(uri):
+    """`uri`, or its correct spelling if it is a known legacy term."""
+    return legacy_terms.get(uri, uri)
+
+
 if __name__ == '__main__':
 
-    print(QUDT.DeG_C)
+    print(units)
 
@@ -0,0 +1,181 @@
+"""Compose the Turtle blocks in examples/templates into synthetic models of any size.
+
+    python -m open223Builder.generator --rooms 50 --circuits 200 --properties 500 -o model.ttl
+"""
+
+import math
+import argparse
+
+from pathlib import Path
+
+import rdflib
+from rdflib import Literal
+
+from open223Builder.ontology.namespaces import (
+    S223, VISU, BLDG, RDF, RDFS, XSD, UriAllocator, bind_namespaces,
+)
+
+
+TEMPLATE_DIR = Path(__file__).resolve().parent.parent / "examples" / "templates"
+
+TILE_MARGIN = 100
+ROOM_WIDTH = 200
+ROOM_HEIGHT = 150
+DOMAIN_SPACE_SIZE = 60
+
+_template_cache: dict = {}
+
+
+def load_template(path) -> rdflib.Graph:
+    path = Path(path)
+    if path not in _template_cache:
+        _template_cache[path] = rdflib.Graph().parse(path, format="turtle")
+    return _template_cache[path]
+
+
+def template_paths(template_dir=TEMPLATE_DIR) -> list:
+    return sorted(Path(template_dir).glob("*.ttl"))
+
+
+def _bounds(g: rdflib.Graph) -> tuple:
+    """(min x, min y, max x, max y) of the positioned items of a template."""
+    xs = [float(x) for x in g.objects(None, VISU.positionX)]
+    ys = [float(y) for y in g.objects(None, VISU.positionY)]
+    if not xs or not ys:
+        return 0.0, 0.0, 0.0, 0.0
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _float(value) -> Literal:
+    return Literal(float(value), datatype=XSD.float)
+
+
+def add_template(target: rdflib.Graph, template: rdflib.Graph, origin: tuple, allocator: UriAllocator) -> dict:
+    """Copy `template` into `target` under fresh instance URIs, moved so its top-left corner is at `origin`.
+
+    Returns the mapping of template URIs to the new ones.
+    """
+
+    namespace = str(BLDG)
+    old_uris = sorted({node for triple in template for node in triple
+                       if isinstance(node, rdflib.URIRef) and str(node).startswith(namespace)})
+    uri_map = dict(zip(old_uris, allocator.allocate_block(len(old_uris))))
+
+    min_x, min_y, _, _ = _bounds(template)
+    dx, dy = origin[0] - min_x, origin[1] - min_y
+
+    for s, p, o in template:
+        if p == VISU.positionX:
+            o = _float(float(o) + dx)
+        elif p == VISU.positionY:
+            o = _float(float(o) + dy)
+        target.add((uri_map.get(s, s), uri_map.get(p, p), uri_map.get(o, o)))
+
+    return uri_map
+
+
+def _equipment(g: rdflib.Graph, uris) -> list:
+    """The positioned, non-junction items among `uris`, i.e. what properties and locations attach to."""
+    equipment = []
+    for uri in uris:
+        if g.value(uri, VISU.positionX) is None:
+            continue
+        if (uri, RDF.type, S223.Junction) in g or (uri, RDF.type, S223.System) in g:
+            continue
+        equipment.append(uri)
+    return sorted(equipment)
+
+
+def generate_model(
+        rooms: int = 10,
+        circuits: int = 10,
+        properties: int = 0,
+        templates: list = None,
+        seed: int = 0,
+) -> rdflib.Graph:
+    """Build a model of `circuits` template blocks, `rooms` physical spaces and `properties` properties.
+
+    Circuits cycle through `templates` (all of examples/templates by default) and are laid out
+    on a grid, with the rooms in a row of their own underneath. Each room encloses a domain
+    space, equipment is located round-robin in the rooms and properties are spread round-robin
+    over the equipment. The same arguments always produce the same model.
+    """
+
+    allocator = UriAllocator(seed=seed)
+    templates = [load_template(path) for path in (templates or template_paths())]
+
+    g = rdflib.Graph()
+    bind_namespaces(g)
+
+    tile_width = max(_bounds(t)[2] - _bounds(t)[0] for t in templates) + TILE_MARGIN
+    tile_height = max(_bounds(t)[3] - _bounds(t)[1] for t in templates) + TILE_MARGIN
+    columns = max(1, math.ceil(math.sqrt(circuits)))
+
+    equipment = []
+    for i in range(circuits):
+        template = templates[i % len(templates)]
+        origin = ((i % columns) * tile_width, (i // columns) * tile_height)
+        uri_map = add_template(g, template, origin, allocator)
+        equipment.extend(_equipment(g, uri_map.values()))
+
+    rooms_top = math.ceil(circuits / columns) * tile_height + TILE_MARGIN
+    room_columns = max(1, math.ceil(math.sqrt(rooms)))
+    room_uris = []
+    for i in range(rooms):
+        room, domain_space = allocator.allocate_block(2)
+        x = (i % room_columns) * (ROOM_WIDTH + TILE_MARGIN)
+        y = rooms_top + (i // room_columns) * (ROOM_HEIGHT + TILE_MARGIN)
+
+        g.add((room, RDF.type, S223.PhysicalSpace))
+        g.add((room, RDFS.label, Literal(f"Room {i + 1}")))
+        g.add((room, VISU.positionX, _float(x)))
+        g.add((room, VISU.positionY, _float(y)))
+        g.add((room, VISU.width, _float(ROOM_WIDTH)))
+        g.add((room, VISU.height, _float(ROOM_HEIGHT)))
+
+        g.add((domain_space, RDF.type, S223.DomainSpace))
+        g.add((domain_space, RDFS.label, Literal(f"Zone {i + 1}")))
+        g.add((domain_space, VISU.positionX, _float(x + TILE_MARGIN / 2)))
+        g.add((domain_space, VISU.positionY, _float(y + TILE_MARGIN / 2)))
+        g.add((domain_space, VISU.width, _float(DOMAIN_SPACE_SIZE)))
+        g.add((domain_space, VISU.height, _float(DOMAIN_SPACE_SIZE)))
+        g.add((domain_space, VISU.rotation, _float(0)))
+
+        g.add((room, S223.encloses, domain_space))
+        room_uris.append(room)
+
+    if room_uris:
+        for i, item in enumerate(equipment):
+            g.add((item, S223.hasPhysicalLocation, room_uris[i % len(room_uris)]))
+
+    if equipment:
+        for i, prop in enumerate(allocator.allocate_block(properties)):
+            parent = equipment[i % len(equipment)]
+            g.add((prop, RDF.type, S223.QuantifiableObservableProperty))
+            g.add((prop, RDFS.label, Literal(f"Property {i + 1}")))
+            g.add((prop, VISU.identifier, Literal("T")))
+            g.add((prop, VISU.positionX, _float(-20 * (1 + i // len(equipment) % 4))))
+            g.add((prop, VISU.positionY, _float(-20)))
+            g.add((parent, S223.hasProperty, prop))
+
+    return g
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic open223Builder model from the example templates.")
+    parser.add_argument("--rooms", type=int, default=10, help="physical spaces, each enclosing a domain space")
+    parser.add_argument("--circuits", type=int, default=10, help="template blocks to place")
+    parser.add_argument("--properties", type=int, default=0, help="properties spread over the equipment")
+    parser.add_argument("--template", action="append", dest="templates",
+                        help="template file to use (repeatable; default: all of examples/templates)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default="generated.ttl")
+    args = parser.parse_args(argv)
+
+    g = generate_model(args.rooms, args.circuits, args.properties, args.templates, args.seed)
+    g.serialize(destination=args.output, format="turtle")
+    print(f"Wrote {len(g)} triples to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -467,6 +467,18 @@ connection_point_library: dict = {
     S223.BidirectionalConnectionPoint: {},
 }
 
+property_library: dict = {
+    S223.Property: {},
+    S223.ObservableProperty: {},
+    S223.ActuatableProperty: {},
+    S223.EnumerableProperty: {},
+    S223.QuantifiableProperty: {},
+    S223.QuantifiableObservableProperty: {},
+    S223.QuantifiableActuatableProperty: {},
+    S223.EnumeratedObservableProperty: {},
+    S223.EnumeratedActuatableProperty: {},
+}
+
 connection_library: dict = {
     S223.Connection: {
         'width': 5,
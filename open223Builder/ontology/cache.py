@@ -0,0 +1,99 @@
+"""Small cache for data derived from files, e.g. the class hierarchy parsed from the ontology.
+
+Entries are JSON, or pickles for larger indexes that have to load fast. They live in $OPEN223_CACHE_DIR (default: $XDG_CACHE_HOME/open223Builder or
+~/.cache/open223Builder) and are only returned while their key still matches, so a key built
+from the source file's path, size and mtime invalidates the entry when the file changes.
+"""
+
+import os
+import json
+import logging
+import pickle
+import tempfile
+
+from pathlib import Path
+
+
+CACHE_VERSION = 2  # bump when the format of an entry changes
+
+log = logging.getLogger(__name__)
+
+
+def cache_dir() -> Path:
+    if os.environ.get("OPEN223_CACHE_DIR"):
+        return Path(os.environ["OPEN223_CACHE_DIR"])
+    return Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "open223Builder"
+
+
+def file_key(*paths) -> str:
+    """Identifies the current state of `paths`; changes when any of them is modified."""
+
+    parts = [str(CACHE_VERSION)]
+    for path in map(Path, paths):
+        try:
+            stat = path.stat()
+            parts.append(f"{path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}")
+        except OSError:
+            parts.append(f"{path}:missing")
+    return "|".join(parts)
+
+
+def _path(name: str, pickled: bool) -> Path:
+    return cache_dir() / (f"{name}.pickle" if pickled else f"{name}.json")
+
+
+def read(name: str, key: str, pickled: bool = False):
+    """The value stored under `name` if it was written with `key`, else None."""
+
+    try:
+        with open(_path(name, pickled), 'rb' if pickled else 'r') as f:
+            entry = pickle.load(f) if pickled else json.load(f)
+    except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+        return None
+
+    if not isinstance(entry, dict):
+        return None
+
+    if entry.get('key') != key:
+        return None
+    return entry.get('value')
+
+
+def write(name: str, key: str, value, pickled: bool = False) -> bool:
+    """Store `value` under `name`; failures (read-only home, full disk) only cost the next launch time."""
+
+    directory = cache_dir()
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first so concurrent launches never read half an entry
+        with tempfile.NamedTemporaryFile('wb' if pickled else 'w', dir=directory, suffix='.tmp', delete=False) as f:
+            if pickled:
+                pickle.dump({'key': key, 'value': value}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            else:
+                json.dump({'key': key, 'value': value}, f)
+        os.replace(f.name, _path(name, pickled))
+        return True
+    except OSError as e:
+        log.warning("Could not write cache entry %s: %s", name, e)
+        return False
+
+
+class Lazy:
+    """Stand-in for a module-level singleton that is only built, with `factory`, on first use."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._value = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._value is not None
+
+    def get(self):
+        if self._value is None:
+            self._value = self._factory()
+        return self._value
+
+    def __getattr__(self, name):
+        # Only reached for attributes of the wrapped object
+        return getattr(self.get(), name)
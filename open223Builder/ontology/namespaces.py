@@ -1,6 +1,9 @@
 import random
 import string
 
+from collections import OrderedDict
+from typing import Optional
+
 from rdflib import Namespace, URIRef, Graph
 from rdflib import RDF, RDFS, XSD
 from rdflib.namespace import DefinedNamespace
@@ -23,7 +26,9 @@ __all__ = [
     "QUDT",
     "QUDTQK",
     "QUDTU",
-    "bindings"
+    "bindings",
+    "UriAllocator",
+    "default_allocator",
 ]
 
 bindings = {
@@ -57,17 +62,90 @@ def split_uri(uri):
     return "", uri
 
 
-def find_abbreviation(uri):
+class NamespaceResolver:
 
-    """Find the namespace of a given URI."""
+    """Resolves URIs to abbreviated labels via a prefix trie over the namespace bindings."""
 
-    uri = str(uri)  # in case it's a URIRef
+    _END = None  # Trie key marking the end of a bound namespace
+
+    def __init__(self, bindings: dict, cache_size: int = 8192):
+        self.cache_size = cache_size
+        self._labels: OrderedDict[str, str] = OrderedDict()
+        self._trie: dict = {}
+        self.rebuild(bindings)
+
+    def rebuild(self, bindings: dict):
+        """Rebuild the trie from the bindings and drop all cached labels."""
+
+        self._trie = {}
+        for namespace, prefix in bindings.items():
+            node = self._trie
+            for char in str(namespace):
+                node = node.setdefault(char, {})
+            node[self._END] = prefix
+        self._labels.clear()
+
+    def find_abbreviation(self, uri) -> Optional[str]:
+        """Return the prefix of the longest bound namespace the URI starts with."""
+
+        node = self._trie
+        match = None
+        for char in str(uri):
+            if self._END in node:
+                match = node[self._END]
+            node = node.get(char)
+            if node is None:
+                return match
+
+        return node.get(self._END, match)
+
+    def _to_label(self, uri: str) -> str:
+        ns, term = split_uri(uri)
+
+        abbreviation = self.find_abbreviation(uri)
+
+        if abbreviation is None:
+            abbreviation = ns
+
+        try:
+            return abbreviation + '.' + term
+
+        except TypeError:
+            raise TypeError(f"Invalid URI format: {uri}.")
+
+    def to_label(self, uri) -> str:
+        uri = str(uri)
+        labels = self._labels
+
+        label = labels.get(uri)
+        if label is not None:
+            labels.move_to_end(uri)
+            return label
+
+        label = labels[uri] = self._to_label(uri)
+        if len(labels) > self.cache_size:
+            labels.popitem(last=False)
+        return label
 
-    for ns, short in bindings.items():
-        if uri.startswith(str(ns)):
-            return short
+    def to_labels(self, uris) -> list:
+        """Label many URIs at once, resolving each distinct URI only once."""
 
-    return None
+        resolved = {}
+        for uri in uris:
+            if uri is not None and uri not in resolved:
+                resolved[uri] = self.to_label(uri)
+
+        return [None if uri is None else resolved[uri] for uri in uris]
+
+
+resolver = NamespaceResolver(bindings)
+
+
+def find_abbreviation(uri):
+
+    """Find the namespace of a given URI."""
+
+    return resolver.find_abbreviation(uri)
 
 
 def to_label(uri):
@@ -76,23 +154,63 @@ def to_label(uri):
     if uri is None:
         return None
 
-    ns, term = split_uri(uri)
+    return resolver.to_label(uri)
+
+
+def to_labels(uris) -> list:
+    """Converts many URIs to labels, e.g. to fill list and tree views."""
+
+    return resolver.to_labels(list(uris))
+
+
+class UriAllocator:
+
+    """Hands out instance identifiers that are unique within its known-ID set."""
+
+    def __init__(self, namespace=BLDG, length: int = 8, seed=None):
+        self.namespace = str(namespace)
+        self.length = length
+        self.known: set[str] = set()
+        self._random = random.Random(seed)
+
+    def reset(self, seed=None):
+        """Forget all known IDs and reseed, e.g. for reproducible test output."""
+
+        self.known.clear()
+        self._random.seed(seed)
 
-    abbreviation = find_abbreviation(uri)
+    def _draw(self, count: int, length: int) -> list[str]:
+        letters = self._random.choices(string.ascii_letters, k=count * length)
+        return [''.join(letters[i:i + length]) for i in range(0, count * length, length)]
 
-    if abbreviation is None:
-        abbreviation = ns
+    def allocate_id(self, length: int = None) -> str:
+        return self.allocate_ids(1, length)[0]
 
-    try:
-        return abbreviation + '.' + term
+    def allocate_ids(self, count: int, length: int = None) -> list[str]:
+        """Draw `count` new IDs in one go, redrawing only the ones that collide."""
 
-    except TypeError:
-        raise TypeError(f"Invalid URI format: {uri}.")
+        length = length or self.length
+        ids = []
+        while len(ids) < count:
+            for uid in self._draw(count - len(ids), length):
+                if uid not in self.known:
+                    self.known.add(uid)
+                    ids.append(uid)
+        return ids
+
+    def allocate(self) -> URIRef:
+        return URIRef(self.namespace + self.allocate_id())
+
+    def allocate_block(self, count: int) -> list[URIRef]:
+        return [URIRef(self.namespace + uid) for uid in self.allocate_ids(count)]
+
+
+default_allocator = UriAllocator()
 
 
 def short_uuid(length: int = 8):
 
-    return ''.join(random.choices(string.ascii_letters, k=length))
+    return default_allocator.allocate_id(length)
 
 
 def bind_namespaces(g):
@@ -103,23 +221,94 @@ def bind_namespaces(g):
         g.bind(prefix, namespace)
 
 
+def _rebaser(oldns, newns):
+
+    """Build a function mapping a single node from `oldns` into `newns`."""
+
+    old, new = str(oldns), str(newns)
+    cut = len(old)
+
+    def rebase(node):
+        if isinstance(node, URIRef) and node.startswith(old):
+            return URIRef(new + node[cut:])
+        return node
+
+    return rebase
+
+
+def rewrite_triples(triples, oldns, newns):
+
+    """Lazily yield the triples with every URI in `oldns` moved to `newns`."""
+
+    rebase = _rebaser(oldns, newns)
+
+    for s, p, o in triples:
+        yield rebase(s), rebase(p), rebase(o)
+
+
 def replace_namespace(g, oldns, newns):
 
     new_graph = Graph()
 
-    for s, p, o in g:
-        new_s = URIRef(str(s).replace(str(oldns), str(newns))) if isinstance(s, URIRef) and str(s).startswith(
-            str(oldns)) else s
-        new_p = URIRef(str(p).replace(str(oldns), str(newns))) if isinstance(p, URIRef) and str(p).startswith(
-            str(oldns)) else p
-        new_o = URIRef(str(o).replace(str(oldns), str(newns))) if isinstance(o, URIRef) and str(o).startswith(
-            str(oldns)) else o
-
-        new_graph.add((new_s, new_p, new_o))
+    for triple in rewrite_triples(g, oldns, newns):
+        new_graph.add(triple)
 
     return new_graph
 
 
+class _NTriplesSink:
+
+    """N-Triples parser sink that rebases each triple and writes it out immediately."""
+
+    def __init__(self, out, oldns, newns):
+        self.out = out
+        self.length = 0
+        self._rebase = _rebaser(oldns, newns)
+
+    def triple(self, s, p, o):
+        rebase = self._rebase
+        self.out.write(f"{rebase(s).n3()} {rebase(p).n3()} {rebase(o).n3()} .\n")
+        self.length += 1
+
+
+def replace_namespace_stream(source, out, oldns, newns) -> int:
+
+    """Rebase an N-Triples stream into `out` line by line, in constant memory.
+
+    Returns the number of triples written.
+    """
+
+    from rdflib.plugins.parsers.ntriples import W3CNTriplesParser
+
+    sink = _NTriplesSink(out, oldns, newns)
+    W3CNTriplesParser(sink).parse(source)
+    return sink.length
+
+
+def replace_namespace_file(source_path, target_path, oldns, newns, format: str = "nt") -> int:
+
+    """Rebase the graph in `source_path` into an N-Triples file at `target_path`.
+
+    N-Triples input is streamed; other formats have to be parsed into memory first.
+    """
+
+    with open(target_path, "w", encoding="utf-8") as out:
+
+        if format in ("nt", "ntriples", "nt11"):
+            with open(source_path, "rb") as source:
+                return replace_namespace_stream(source, out, oldns, newns)
+
+        g = Graph()
+        g.parse(source_path, format=format)
+
+        length = 0
+        for s, p, o in rewrite_triples(g, oldns, newns):
+            out.write(f"{s.n3()} {p.n3()} {o.n3()} .\n")
+            length += 1
+
+        return length
+
+
 class VISU(DefinedNamespace):
 
     """ This namespace contains the visualization ontology. """
@@ -0,0 +1,131 @@
+"""Resolve ports and symbols of equipment types along the s223 class hierarchy.
+
+port_library and svg_library only have entries for some classes. TypeResolver walks the
+rdfs:subClassOf hierarchy from a local ontology file, nearest superclass first, so a subclass
+of s223:Coil gets the Coil ports and any other equipment falls back to the s223:Equipment
+entry. The ancestor lists are computed once and cached on disk (see cache.py), so later
+launches do not parse the ontology at all.
+"""
+
+import os
+import logging
+
+from pathlib import Path
+
+import rdflib
+
+from rdflib.util import guess_format
+
+from open223Builder.ontology import cache
+from open223Builder.ontology.namespaces import S223, RDFS
+from open223Builder.library import port_library, svg_library
+
+
+# Bundled subset of the 223P hierarchy; set OPEN223_ONTOLOGY to use a full ontology file instead
+ONTOLOGY_PATH = Path(
+    os.environ.get("OPEN223_ONTOLOGY") or Path(__file__).resolve().parent / "data" / "s223_classes.ttl"
+)
+
+CACHE_NAME = "type_hierarchy"
+
+log = logging.getLogger(__name__)
+
+
+def parse_hierarchy(path) -> dict:
+    """{class: [direct superclasses]} from the rdfs:subClassOf triples of an ontology file."""
+
+    g = rdflib.Graph().parse(str(path), format=guess_format(str(path)) or "turtle")
+    parents = {}
+    for child, parent in g.subject_objects(RDFS.subClassOf):
+        if isinstance(child, rdflib.URIRef) and isinstance(parent, rdflib.URIRef) and child != parent:
+            parents.setdefault(child, []).append(parent)
+    return {child: sorted(direct) for child, direct in parents.items()}
+
+
+class TypeResolver:
+    """Memoized type -> (ports, symbol) lookups over a class hierarchy."""
+
+    def __init__(self, parents: dict, ports: dict = None, symbols: dict = None):
+        self.parents = parents  # class -> direct superclasses
+        self.ports = port_library if ports is None else ports
+        self.symbols = svg_library if symbols is None else symbols
+
+        self._ancestors = {}
+        self._table = {}  # type -> (ports, symbol)
+
+    @classmethod
+    def load(cls, path=ONTOLOGY_PATH, use_cache: bool = True) -> 'TypeResolver':
+        """Resolver for the hierarchy in `path`, using the on-disk cache of its ancestor lists when valid."""
+
+        key = cache.file_key(path)
+        cached = cache.read(CACHE_NAME, key) if use_cache else None
+
+        if cached is not None:
+            resolver = cls({})
+            resolver._ancestors = {
+                rdflib.URIRef(uri): tuple(map(rdflib.URIRef, ancestors)) for uri, ancestors in cached.items()
+            }
+        else:
+            try:
+                resolver = cls(parse_hierarchy(path))
+            except Exception as e:
+                log.warning("Could not read class hierarchy from %s: %s. Using exact type matches only.", path, e)
+                return cls({})
+
+        resolver.precompute()
+
+        if cached is None and use_cache:
+            cache.write(CACHE_NAME, key, {
+                str(uri): [str(ancestor) for ancestor in ancestors] for uri, ancestors in resolver._ancestors.items()
+            })
+        return resolver
+
+    def ancestors(self, type_uri) -> tuple:
+        """`type_uri` followed by its superclasses, nearest first (breadth-first, without repeats)."""
+
+        ancestors = self._ancestors.get(type_uri)
+        if ancestors is None:
+            seen = {type_uri: None}
+            queue = [type_uri]
+            while queue:
+                current = queue.pop(0)
+                for parent in self.parents.get(current, ()):
+                    if parent not in seen:
+                        seen[parent] = None
+                        queue.append(parent)
+            ancestors = self._ancestors[type_uri] = tuple(seen)
+        return ancestors
+
+    def resolve(self, type_uri) -> tuple:
+        """(port configurations, SVG data) of the nearest classes that have them; ([], None) if none does."""
+
+        entry = self._table.get(type_uri)
+        if entry is None:
+            ancestors = self.ancestors(type_uri)
+            ports = next((self.ports[t] for t in ancestors if t in self.ports), [])
+            symbol = next((self.symbols[t] for t in ancestors if t in self.symbols), None)
+            entry = self._table[type_uri] = (ports, symbol)
+        return entry
+
+    def ports_for(self, type_uri) -> list:
+        return self.resolve(type_uri)[0]
+
+    def symbol_for(self, type_uri):
+        return self.resolve(type_uri)[1]
+
+    def is_a(self, type_uri, base) -> bool:
+        return base in self.ancestors(type_uri)
+
+    def is_equipment(self, type_uri) -> bool:
+        """Whether the editor creates an equipment item for `type_uri`."""
+        return type_uri in self.symbols or self.is_a(type_uri, S223.Equipment)
+
+    def precompute(self):
+        """Fill the lookup table for every class in the hierarchy and the libraries."""
+
+        for type_uri in set(self.parents) | set(self._ancestors) | set(self.ports) | set(self.symbols):
+            self.resolve(type_uri)
+
+
+# Parsed or read from the cache on first use, not at import
+type_resolver = cache.Lazy(TypeResolver.load)
@@ -0,0 +1,194 @@
+"""Index of the s223 and QUDT vocabularies offered in the property dropdowns.
+
+The ontology files (the s223 file used by the resolver and the QUDT units and quantity
+kinds, see OPEN223_QUDT) are parsed once into a compact index: the members of the s223
+enumeration kinds, the QUDT units and quantity kinds, their labels and the labels of the
+s223 classes, and which units measure which quantity kinds. The index is pickled to the cache, so later launches only
+unpickle it. The curated lists in enumerations.py are always part of the index.
+"""
+
+import os
+import logging
+
+from pathlib import Path
+
+import rdflib
+
+from rdflib.util import guess_format
+
+import open223Builder.enumerations as enums
+from open223Builder.ontology import cache
+from open223Builder.ontology.namespaces import S223, QUDT, RDF, RDFS, to_label
+from open223Builder.ontology.resolver import ONTOLOGY_PATH
+
+
+# Bundled subset of QUDT; set OPEN223_QUDT to the full vocabulary files, separated by os.pathsep
+QUDT_PATHS = [
+    Path(path) for path in
+    os.environ.get("OPEN223_QUDT", str(Path(__file__).resolve().parent / "data" / "qudt_subset.ttl")).split(os.pathsep)
+    if path
+]
+
+CACHE_NAME = "vocabulary"
+
+log = logging.getLogger(__name__)
+
+ENUMERATION_KINDS = {
+    'roles': S223['EnumerationKind-Role'],
+    'aspects': S223['EnumerationKind-Aspect'],
+    'domains': S223['EnumerationKind-Domain'],
+}
+
+CURATED = {
+    'roles': enums.roles,
+    'aspects': enums.aspects,
+    'domains': enums.domains,
+    'units': enums.units,
+    'quantity_kinds': enums.quantity_kinds,
+}
+
+
+def _english(literals):
+    """The English (or untagged) literal among `literals`, else any of them."""
+
+    literals = list(literals)
+    for literal in literals:
+        if getattr(literal, 'language', None) in (None, 'en', 'en-us', 'en-US'):
+            return str(literal)
+    return str(literals[0]) if literals else None
+
+
+def index_graph(g: rdflib.Graph) -> dict:
+    """The vocabulary index of `g`, as plain strings so it pickles small and fast."""
+
+    def subclasses(base) -> set:
+        found, queue = set(), [base]
+        while queue:
+            for child in g.subjects(RDFS.subClassOf, queue.pop()):
+                if child not in found:
+                    found.add(child)
+                    queue.append(child)
+        return found
+
+    members = {}
+    for name, kind in ENUMERATION_KINDS.items():
+        kinds = subclasses(kind)
+        found = kinds | {member for k in kinds | {kind} for member in g.subjects(RDF.type, k)}
+        members[name] = sorted(str(uri) for uri in found if isinstance(uri, rdflib.URIRef) and uri != kind)
+
+    members['units'] = sorted(str(uri) for uri in g.subjects(RDF.type, QUDT.Unit) if isinstance(uri, rdflib.URIRef))
+    members['quantity_kinds'] = sorted(
+        str(uri) for uri in g.subjects(RDF.type, QUDT.QuantityKind) if isinstance(uri, rdflib.URIRef)
+    )
+
+    # Classes are labelled too, e.g. for the entity search
+    classes = {str(uri) for uri in g.subjects(RDFS.subClassOf, None) if isinstance(uri, rdflib.URIRef)}
+
+    labels, symbols = {}, {}
+    for uris in [*members.values(), classes]:
+        for uri in uris:
+            label = _english(g.objects(rdflib.URIRef(uri), RDFS.label))
+            if label:
+                labels[uri] = label
+
+    unit_kinds = {}
+    for uri in members['units']:
+        unit = rdflib.URIRef(uri)
+        symbol = g.value(unit, QUDT.symbol)
+        if symbol is not None and str(symbol):
+            symbols[uri] = str(symbol)
+        kinds = sorted(str(kind) for kind in g.objects(unit, QUDT.hasQuantityKind))
+        if kinds:
+            unit_kinds[uri] = kinds
+
+    return {'members': members, 'labels': labels, 'symbols': symbols, 'unit_kinds': unit_kinds}
+
+
+class Vocabulary:
+    """Enumeration members, units and quantity kinds with labels and unit/quantity kind compatibility."""
+
+    def __init__(self, index: dict = None):
+        index = index or {}
+        URIRef = rdflib.URIRef
+
+        self.members = {}  # name -> [URIRef], curated entries first
+        for name, curated in CURATED.items():
+            indexed = [URIRef(uri) for uri in index.get('members', {}).get(name, [])]
+            self.members[name] = list(dict.fromkeys(curated + sorted(indexed, key=to_label)))
+
+        self.labels = {URIRef(uri): label for uri, label in index.get('labels', {}).items()}
+        self.symbols = {URIRef(uri): symbol for uri, symbol in index.get('symbols', {}).items()}
+
+        self.unit_kinds = {}  # unit -> [quantity kind]
+        self.kind_units = {}  # quantity kind -> [unit]
+        for unit, kinds in index.get('unit_kinds', {}).items():
+            unit = URIRef(unit)
+            self.unit_kinds[unit] = [URIRef(kind) for kind in kinds]
+            for kind in self.unit_kinds[unit]:
+                self.kind_units.setdefault(kind, []).append(unit)
+
+    @classmethod
+    def load(cls, paths=None, use_cache: bool = True) -> 'Vocabulary':
+        """Vocabulary of the ontology files in `paths`, from the pickled index while it is valid."""
+
+        paths = [ONTOLOGY_PATH, *QUDT_PATHS] if paths is None else list(paths)
+        key = cache.file_key(*paths)
+
+        index = cache.read(CACHE_NAME, key, pickled=True) if use_cache else None
+        if index is None:
+            g = rdflib.Graph()
+            for path in paths:
+                try:
+                    g.parse(str(path), format=guess_format(str(path)) or "turtle")
+                except Exception as e:
+                    log.warning("Could not read vocabulary from %s: %s", path, e)
+            index = index_graph(g)
+            if use_cache:
+                cache.write(CACHE_NAME, key, index, pickled=True)
+
+        return cls(index)
+
+    @property
+    def roles(self) -> list:
+        return self.members['roles']
+
+    @property
+    def aspects(self) -> list:
+        return self.members['aspects']
+
+    @property
+    def domains(self) -> list:
+        return self.members['domains']
+
+    @property
+    def units(self) -> list:
+        return self.members['units']
+
+    @property
+    def quantity_kinds(self) -> list:
+        return self.members['quantity_kinds']
+
+    def display(self, uri) -> str:
+        """Dropdown text: the prefixed name, followed by the label and symbol where known."""
+
+        text = to_label(uri)
+        details = [detail for detail in (self.labels.get(uri), self.symbols.get(uri)) if detail]
+        return f"{text} ({', '.join(details)})" if details else text
+
+    def units_for(self, quantity_kind) -> list:
+        """Units that measure `quantity_kind`; all units if its units are unknown."""
+        return self.kind_units.get(quantity_kind) or self.units
+
+    def quantity_kinds_for(self, unit) -> list:
+        return self.unit_kinds.get(unit, [])
+
+    def is_compatible(self, unit, quantity_kind) -> bool:
+        """False only if both are known and the unit does not measure the quantity kind."""
+
+        if unit not in self.unit_kinds or quantity_kind not in self.kind_units:
+            return True
+        return quantity_kind in self.unit_kinds[unit]
+
+
+# Parsed or read from the cache on first use, not at import
+vocabulary = cache.Lazy(Vocabulary.load)